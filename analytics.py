@@ -0,0 +1,167 @@
+"""Incremental link-quality analytics.
+
+LinkAnalytics watches the packet counter and arrival times of the ingested
+stream: gaps (missing pkt_no), duplicates, packets that arrive after their
+gap was counted, inter-arrival jitter, receive rate and the parse-failure
+rate. Every update is O(1): windowed figures come from a ring of one-second
+buckets whose running sums are adjusted as buckets expire, and jitter is a
+smoothed estimate in the style of RFC 3550 (|change in inter-arrival time|,
+gain 1/16).
+
+packet() and parse_failed() are called from the ingest threads, the
+figures are read from the UI; a lock keeps the buckets consistent.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from telemetry import counter_restarted
+
+# Sliding window for the live figures
+DEFAULT_WINDOW = 30
+# pkt_no values remembered to tell a duplicate from a late packet
+RECENT_PACKETS = 256
+
+_COUNTERS = ('packets', 'missing', 'duplicates', 'late', 'failures')
+_SLOT = {name: i for i, name in enumerate(_COUNTERS, 1)}
+
+
+class LinkAnalytics:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.totals = dict.fromkeys(_COUNTERS, 0)
+        self.totals['restarts'] = 0
+        self.largest_gap = 0
+        self.jitter = 0.0
+        self.interval = 0.0
+        self.started_at = None
+        self.last_arrival = None
+        self._last_interval = None
+        self._expected = None
+        self._recent = set()
+        self._recent_order = deque()
+        self._buckets = deque()
+        self._sums = dict.fromkeys(_COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def _bucket(self, now):
+        second = int(now)
+        buckets = self._buckets
+        if not buckets or buckets[-1][0] != second:
+            buckets.append([second] + [0] * len(_COUNTERS))
+            while second - buckets[0][0] >= self.window:
+                expired = buckets.popleft()
+                for name, i in _SLOT.items():
+                    self._sums[name] -= expired[i]
+        return buckets[-1]
+
+    def _count(self, name, now, n=1):
+        self._bucket(now)[_SLOT[name]] += n
+        self._sums[name] += n
+        self.totals[name] += n
+
+    def _remember(self, pkt_no):
+        self._recent.add(pkt_no)
+        self._recent_order.append(pkt_no)
+        if len(self._recent_order) > RECENT_PACKETS:
+            self._recent.discard(self._recent_order.popleft())
+
+    def packet(self, data, now=None):
+        """Account one parsed packet"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._packet(data['pkt_no'], now)
+
+    def _packet(self, pkt_no, now):
+        if self.started_at is None:
+            self.started_at = now
+
+        expected = self._expected
+        if expected is not None and counter_restarted(pkt_no, expected - 1):
+            # Checked first: the new run's pkt_no may still be in _recent
+            self.totals['restarts'] += 1
+            self._recent.clear()
+            self._recent_order.clear()
+            expected = None
+        if expected is not None and pkt_no < expected:
+            if pkt_no in self._recent:
+                self._count('duplicates', now)
+                return
+            # Counted missing when the gap was seen; it made it after all
+            self._count('late', now)
+            self._count('missing', now, -1)
+        if expected is not None and pkt_no > expected:
+            gap = pkt_no - expected
+            self._count('missing', now, gap)
+            if gap > self.largest_gap:
+                self.largest_gap = gap
+        if expected is None or pkt_no >= expected:
+            self._expected = pkt_no + 1
+        self._remember(pkt_no)
+        self._count('packets', now)
+
+        if self.last_arrival is not None:
+            interval = now - self.last_arrival
+            if self._last_interval is None:
+                self.interval = interval
+            else:
+                self.interval += (interval - self.interval) / 16
+                self.jitter += (abs(interval - self._last_interval) - self.jitter) / 16
+            self._last_interval = interval
+        self.last_arrival = now
+
+    def parse_failed(self, now=None):
+        """Account one line the parser rejected"""
+        with self._lock:
+            self._count('failures', time.monotonic() if now is None else now)
+
+    def windowed(self, now=None):
+        """Figures over the last `window` seconds"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._bucket(now)
+            sums = dict(self._sums)
+        # A late packet can take back a gap whose bucket already expired
+        sums['missing'] = max(sums['missing'], 0)
+        span = min(self.window, now - self.started_at) if self.started_at is not None else 0
+        expected = sums['packets'] + sums['missing']
+        lines = sums['packets'] + sums['duplicates'] + sums['failures']
+        return {
+            'rate': sums['packets'] / span if span > 0 else 0.0,
+            'loss': sums['missing'] / expected if expected > 0 else 0.0,
+            'duplicates': sums['duplicates'],
+            'parse_failure_rate': sums['failures'] / lines if lines else 0.0,
+            'jitter_ms': self.jitter * 1000,
+        }
+
+    def status_line(self):
+        w = self.windowed()
+        return (f"LOSS {w['loss'] * 100:.1f}% | DUP {w['duplicates']} | "
+                f"JITTER {w['jitter_ms']:.0f}ms | {w['rate']:.1f} PKT/s | "
+                f"BAD {w['parse_failure_rate'] * 100:.1f}%")
+
+    def summary(self):
+        """Whole-session totals, for the record next to a flight log"""
+        totals = self.totals
+        expected = totals['packets'] + totals['missing']
+        lines = totals['packets'] + totals['duplicates'] + totals['failures']
+        duration = (self.last_arrival - self.started_at) if self.started_at is not None else 0.0
+        return dict(
+            totals,
+            duration_s=round(duration, 3),
+            mean_rate=totals['packets'] / duration if duration > 0 else 0.0,
+            loss=totals['missing'] / expected if expected else 0.0,
+            largest_gap=self.largest_gap,
+            parse_failure_rate=totals['failures'] / lines if lines else 0.0,
+            mean_interval_ms=self.interval * 1000,
+            jitter_ms=self.jitter * 1000,
+        )
+
+    def write_summary(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
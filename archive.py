@@ -0,0 +1,327 @@
+"""Random access to recorded flights.
+
+    python archive.py FLIGHT.cfr --time 120 180 --keys altitude,pressure
+    python archive.py FLIGHT.csv --packets 500 900
+
+FlightArchive memory-maps a recording (.cfr or the CSV log) and keeps a
+sidecar index next to it (FLIGHT.cfr.idx.npz) holding, for every record,
+its byte offset, receive time, mission time as T+ seconds and pkt_no. The
+index is built in one pass the first time a flight is opened and rebuilt
+whenever the recording has changed since. A query only searches the index
+and touches the records it returns: from a .cfr those are NumPy views onto
+the mapped chunks, from a CSV just their own lines are parsed. That keeps a
+query on a multi-hour flight in the millisecond range, so a time slider can
+scrub through it.
+
+Columns come back keyed like a packet, in the layout of
+TelemetryParser.parse_batch(): numbers as float64, clock fields as seconds
+of day, mode/state as str arrays. 't' is mission T+ seconds (mission time
+since the first record, carried over midnight) and 'recv_time' the ground
+receive time.
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from flight_log import (CFR_MAGIC, CHUNK_HEADER, CSV_FIELDS, CSV_HEADER, MODES, RECORD,
+                        RECORD_FLOATS, STATES, read_chunk_index)
+from telemetry import CLOCK, FIELD_KEYS, FIELD_KINDS, TEXT, clock_seconds
+
+INDEX_SUFFIX = '.idx.npz'
+INDEX_VERSION = 1
+
+# flight_log.RECORD as a packed NumPy record, so chunks can be viewed in place
+RECORD_DTYPE = np.dtype(
+    [('recv_time', '<f8'), ('id', '<u2'), ('hh', 'u1'), ('mm', 'u1'), ('ss', 'u1'),
+     ('pkt_no', '<u4'), ('mode', 'u1'), ('state', 'u1')]
+    + [(key, '<f4') for key in RECORD_FLOATS]
+    + [('rotation_rate', '<i4'), ('gps_hh', 'u1'), ('gps_mm', 'u1'), ('gps_ss', 'u1'),
+       ('gps_altitude', '<f4'), ('latitude', '<f4'), ('longitude', '<f4'), ('gps_stats', 'u1')])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+_CLOCK_FIELDS = {'mission_time': ('hh', 'mm', 'ss'), 'gps_time': ('gps_hh', 'gps_mm', 'gps_ss')}
+_CSV_COLUMNS = {key: i for i, key in enumerate(CSV_FIELDS, 1)}
+_DAY = 24 * 3600
+
+
+def _sorted_view(values):
+    """(sorted values, record order) to search; order is None if already sorted"""
+    if np.all(values[1:] >= values[:-1]):
+        return values, None
+    # A restart or a clock set mid-recording: search a sorted copy instead
+    order = np.argsort(values, kind='stable')
+    return values[order], order
+
+
+def mission_seconds(clock):
+    """Seconds of day -> T+ seconds from the first record, unwrapped at midnight"""
+    if not len(clock):
+        return np.zeros(0)
+    steps = np.diff(clock, prepend=clock[0])
+    days = np.cumsum(steps < -_DAY / 2)
+    return (clock + days * _DAY - clock[0]).astype(np.float64)
+
+
+class FlightArchive:
+    """Indexed, memory-mapped view of one recorded flight"""
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        with open(path, 'rb') as f:
+            self.binary = f.read(len(CFR_MAGIC)) == CFR_MAGIC
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("empty flight recording")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index_built = False
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offset)
+
+    def close(self):
+        self.map.close()
+
+    @property
+    def duration(self):
+        return float(self.t[-1]) if len(self.t) else 0.0
+
+    # Sidecar index
+
+    def _source_stamp(self):
+        stat = os.stat(self.path)
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _load_index(self):
+        stamp = self._source_stamp()
+        try:
+            with np.load(self.index_path) as saved:
+                if np.array_equal(saved['stamp'], stamp):
+                    index = {key: saved[key] for key in saved.files}
+                else:
+                    index = None
+        except (OSError, KeyError, ValueError):
+            index = None
+        if index is None:
+            index = self._build_cfr_index() if self.binary else self._build_csv_index()
+            index['stamp'] = stamp
+            try:
+                np.savez(self.index_path, **index)
+            except OSError as e:
+                # A read-only flight directory still gets queried, just unindexed on disk
+                print(f"Archive index not saved: {e}")
+            self.index_built = True
+
+        self.offset = index['offset']
+        self.recv_time = index['recv_time']
+        self.pkt_no = index['pkt_no']
+        self.t = index['t']
+        # .cfr only: where each chunk starts, in records and in bytes
+        self.chunk_rows = index['chunk_rows']
+        self.chunk_offset = index['chunk_offset']
+        self._sorted = {'t': _sorted_view(self.t), 'pkt_no': _sorted_view(self.pkt_no)}
+
+    def _build_cfr_index(self):
+        chunks = read_chunk_index(self.map)
+        records = [self._chunk(offset, count) for offset, count, *_ in chunks]
+        records = np.concatenate(records) if records else np.zeros(0, RECORD_DTYPE)
+        offsets = [offset + CHUNK_HEADER.size + np.arange(count, dtype=np.int64) * RECORD.size
+                   for offset, count, *_ in chunks]
+        counts = np.array([count for offset, count, *_ in chunks], dtype=np.int64)
+        return {
+            'offset': np.concatenate(offsets) if offsets else np.zeros(0, np.int64),
+            'recv_time': records['recv_time'].astype(np.float64),
+            'pkt_no': records['pkt_no'].astype(np.int64),
+            't': mission_seconds(self._clock(records, 'mission_time')),
+            'chunk_rows': np.concatenate([[0], np.cumsum(counts)])[:-1],
+            'chunk_offset': np.array([offset for offset, *_ in chunks], dtype=np.int64),
+        }
+
+    def _build_csv_index(self):
+        buffer = self.map
+        header_end = buffer.find(b'\n') + 1
+        if buffer[:header_end].decode().strip().split(',') != CSV_HEADER:
+            raise ValueError("not a CanSat flight CSV")
+        mission_column, pkt_column = _CSV_COLUMNS['mission_time'], _CSV_COLUMNS['pkt_no']
+        offsets, recv_times, clocks, pkt_nos = [], [], [], []
+        position = header_end
+        buffer.seek(position)
+        for line in iter(buffer.readline, b''):
+            row = line.decode(errors='replace').split(',')
+            try:
+                if len(row) != len(CSV_HEADER):
+                    raise ValueError
+                recv_time = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S.%f").timestamp()
+                clock = clock_seconds(row[mission_column])
+                pkt_no = int(row[pkt_column])
+            except ValueError:
+                # Same rows replay skips: torn last line, hand edits
+                pass
+            else:
+                offsets.append(position)
+                recv_times.append(recv_time)
+                clocks.append(clock)
+                pkt_nos.append(pkt_no)
+            position += len(line)
+        return {
+            'offset': np.array(offsets, dtype=np.int64),
+            'recv_time': np.array(recv_times, dtype=np.float64),
+            'pkt_no': np.array(pkt_nos, dtype=np.int64),
+            't': mission_seconds(np.array(clocks, dtype=np.int64)),
+            'chunk_rows': np.zeros(0, np.int64),
+            'chunk_offset': np.zeros(0, np.int64),
+        }
+
+    # Queries
+
+    def rows_between(self, start, end):
+        """Record numbers with start <= T+ <= end seconds"""
+        return self._search('t', start, end)
+
+    def rows_for_packets(self, first, last):
+        """Record numbers with first <= pkt_no <= last"""
+        return self._search('pkt_no', first, last)
+
+    def _search(self, key, low, high):
+        # Binary search: O(log N) plus the rows returned, never a scan
+        values, order = self._sorted[key]
+        lo = np.searchsorted(values, low, side='left')
+        hi = np.searchsorted(values, high, side='right')
+        if order is None:
+            return np.arange(lo, hi, dtype=np.int64)
+        return np.sort(order[lo:hi])
+
+    def time_range(self, start, end, keys=None):
+        return self.columns(self.rows_between(start, end), keys)
+
+    def packets(self, first, last, keys=None):
+        return self.columns(self.rows_for_packets(first, last), keys)
+
+    def columns(self, rows, keys=None):
+        """Columns for the given record numbers (ascending)"""
+        if keys is None:
+            keys = ['t', 'recv_time'] + FIELD_KEYS
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {'t': self.t[rows], 'recv_time': self.recv_time[rows]}
+        wanted = [key for key in keys if key not in columns]
+        if self.binary:
+            columns.update(self._cfr_columns(rows, wanted))
+        else:
+            columns.update(self._csv_columns(rows, wanted))
+        return {key: columns[key] for key in keys}
+
+    def _chunk(self, offset, count):
+        return np.frombuffer(self.map, RECORD_DTYPE, count, offset + CHUNK_HEADER.size)
+
+    def _cfr_columns(self, rows, keys):
+        fields = []
+        for key in keys:
+            fields.extend(_CLOCK_FIELDS.get(key, (key,)))
+        pieces = {field: [] for field in fields}
+        if len(rows):
+            # Only the chunks the rows fall in are touched, and only the wanted fields copied
+            first_chunk = np.searchsorted(self.chunk_rows, rows[0], side='right') - 1
+            last_chunk = np.searchsorted(self.chunk_rows, rows[-1], side='right') - 1
+            bounds = np.append(self.chunk_rows, len(self))[first_chunk:last_chunk + 2]
+            cuts = np.searchsorted(rows, bounds)
+            for chunk, lo, hi, start, stop in zip(range(first_chunk, last_chunk + 1), bounds, bounds[1:],
+                                                 cuts, cuts[1:]):
+                if stop > start:
+                    records = self._chunk(int(self.chunk_offset[chunk]), int(hi - lo))
+                    local = rows[start:stop] - lo
+                    for field in fields:
+                        pieces[field].append(records[field][local])
+        records = {field: np.concatenate(parts) if parts else np.zeros(0, RECORD_DTYPE[field])
+                   for field, parts in pieces.items()}
+
+        columns = {}
+        for key in keys:
+            if key in _CLOCK_FIELDS:
+                columns[key] = self._clock(records, key).astype(np.float64)
+            elif key in ('mode', 'state'):
+                names = np.array(MODES if key == 'mode' else STATES)
+                codes = records[key]
+                columns[key] = names[np.where(codes < len(names), codes, 0)]
+            elif RECORD_DTYPE[key] == np.float32:
+                # float32 on disk; back to the 6 decimals the firmware prints
+                columns[key] = np.round(records[key].astype(np.float64), 6)
+            else:
+                columns[key] = records[key].astype(np.float64)
+        return columns
+
+    @staticmethod
+    def _clock(records, key):
+        hh, mm, ss = _CLOCK_FIELDS[key]
+        return (records[hh].astype(np.int64) * 3600 + records[mm].astype(np.int64) * 60
+                + records[ss].astype(np.int64))
+
+    def _csv_columns(self, rows, keys):
+        buffer = self.map
+        lines = []
+        for offset in self.offset[rows]:
+            end = buffer.find(b'\n', offset)
+            lines.append(buffer[offset:end if end >= 0 else len(buffer)].decode().split(','))
+
+        columns = {}
+        for key in keys:
+            values = [row[_CSV_COLUMNS[key]] for row in lines]
+            kind = FIELD_KINDS[key]
+            if kind == TEXT:
+                columns[key] = np.array([value.strip() for value in values], dtype=str)
+            elif kind == CLOCK:
+                columns[key] = np.array([clock_seconds(value) for value in values], dtype=np.float64)
+            else:
+                columns[key] = np.array(values, dtype=np.float64)
+        return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a recorded flight by mission time or packet count")
+    parser.add_argument('flight', help="CanSat_Flight_*.cfr or .csv")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--time', nargs=2, type=float, metavar=('START', 'END'),
+                       help="mission T+ seconds, inclusive")
+    group.add_argument('--packets', nargs=2, type=int, metavar=('FIRST', 'LAST'),
+                       help="pkt_no range, inclusive")
+    parser.add_argument('--keys', default='altitude,pressure',
+                        help="comma separated packet keys (plus t, recv_time)")
+    args = parser.parse_args(argv)
+    keys = args.keys.split(',')
+    unknown = set(keys) - set(FIELD_KEYS) - {'t', 'recv_time'}
+    if unknown:
+        parser.error(f"unknown keys: {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    with FlightArchive(args.flight) as archive:
+        opened = time.perf_counter()
+        if args.time:
+            columns = archive.time_range(*args.time, keys)
+        else:
+            columns = archive.packets(*args.packets, keys)
+        done = time.perf_counter()
+        rows = len(next(iter(columns.values())))
+        print(f"{len(archive)} records, T+0..{archive.duration:.0f}s; index "
+              f"{'built' if archive.index_built else 'loaded'} in {(opened - start) * 1000:.1f} ms")
+        print(f"{rows} rows in {(done - opened) * 1000:.2f} ms")
+        for key, values in columns.items():
+            if rows and values.dtype.kind == 'f':
+                print(f"  {key:<14} min {values.min():.6g}  mean {values.mean():.6g}  max {values.max():.6g}")
+            elif rows:
+                print(f"  {key:<14} {values[0]} .. {values[-1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,595 @@
+"""Ground station benchmarks.
+
+    python bench.py                          run everything, save bench_results.json
+    python bench.py --only parser,render     run some of the stages
+    python bench.py --compare old.json       print changes against an earlier run
+
+Each stage of the ingest path is measured in isolation (parser, flight
+logger, history buffer, graph render path, telemetry labels, derived
+quantities, archive queries, fan-out to network viewers) and end to end: simulated
+firmware -> StationRuntime -> parser -> frame loop -> history -> GraphGrid.
+Packet-to-pixel latency is the time from the simulator writing a line to
+the end of the frame that drew it. Graphs render on an Agg canvas the same
+size as the GUI's, so no display is needed.
+
+Memory per hour is extrapolated from the bytes retained per packet by the
+ingest path at the nominal downlink rate (--nominal-rate), on top of the
+fixed preallocation of the history buffers; disk per hour likewise from the
+recording sizes.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import queue
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from archive import FlightArchive
+from derived import DERIVED_KEYS, DerivedState, derive_columns
+from fanout import FanoutServer
+from flight_log import LOG_FORMATS, open_flight_logger
+from history import DEFAULT_DEPTH, TelemetryHistory
+from panel import LabelPanel
+from plotting import GRAPH_PANELS, GraphGrid
+from runtime import SerialSource, StationRuntime
+from simulator import FirmwareModel, FirmwareSimulator, SimulatedPort
+from telemetry import FIELD_KEYS, TelemetryParser, format_value, packets_to_columns
+
+STAGES = ['parser', 'logger', 'history', 'render', 'panel', 'derived', 'archive', 'fanout',
+          'end_to_end', 'memory']
+
+# Same as PLOT_WINDOW and the figure in test.py
+PLOT_WINDOW = 100
+FIGURE_SIZE = (12, 9)
+FIGURE_DPI = 90
+
+GRAPH_KEYS = ['sample'] + [key for key, title, color in GRAPH_PANELS]
+
+
+def sample_lines(n, seed=0):
+    model = FirmwareModel(seed=seed)
+    lines = []
+    for _ in range(n):
+        model.advance(0.1)
+        lines.append(model.next_line().decode().strip())
+    return lines
+
+
+def sample_packets(n):
+    parser = TelemetryParser()
+    return [parser.parse(line) for line in sample_lines(n)]
+
+
+def percentiles(samples_ms):
+    if not len(samples_ms):
+        return {'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p99 = np.percentile(samples_ms, [50, 99])
+    return {'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(np.max(samples_ms)), 3)}
+
+
+def make_graphs():
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    canvas = FigureCanvasAgg(fig)
+    graphs = GraphGrid(fig, canvas)
+    canvas.draw()
+    return graphs
+
+
+def bench_parser(n=20000, batch=64):
+    lines = sample_lines(n)
+
+    parser = TelemetryParser()
+    start = time.perf_counter()
+    for line in lines:
+        parser.parse(line)
+    single = n / (time.perf_counter() - start)
+
+    parser = TelemetryParser()
+    start = time.perf_counter()
+    for i in range(0, n, batch):
+        parser.parse_batch(lines[i:i + batch])
+    batched = n / (time.perf_counter() - start)
+
+    return {'packets_per_s': round(single), f'batch{batch}_packets_per_s': round(batched)}
+
+
+def bench_logger(n=20000, nominal_rate=10.0):
+    packets = sample_packets(n)
+    results = {}
+    for log_format in LOG_FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            # Queue deep enough for the whole run: this measures the writer, not overflow
+            logger = open_flight_logger(directory, log_format, max_queue=n)
+            start = time.perf_counter()
+            for data in packets:
+                logger.log(data)
+            enqueued = time.perf_counter() - start
+            logger.stop()
+            total = time.perf_counter() - start
+            size = sum(os.path.getsize(path) for path in logger.paths)
+
+        results[log_format] = {
+            'enqueue_us_per_packet': round(enqueued / n * 1e6, 3),
+            'packets_per_s': round(n / total),
+            'max_write_ms': round(logger.max_write_ms, 3),
+            'rows_dropped': logger.rows_dropped,
+            'disk_mb_per_hour': round(size / n * nominal_rate * 3600 / 1e6, 3),
+        }
+    return results
+
+
+def bench_history(n=50000):
+    packets = sample_packets(1000)
+    history = TelemetryHistory(DEFAULT_DEPTH, lod_keys=GRAPH_KEYS[1:])
+
+    start = time.perf_counter()
+    for i in range(n):
+        history.append(packets[i % len(packets)])
+    append_rate = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        history.window(GRAPH_KEYS, PLOT_WINDOW)
+    window_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    start = time.perf_counter()
+    for _ in range(100):
+        history.flight_overview(GRAPH_KEYS)
+    overview_us = (time.perf_counter() - start) / 100 * 1e6
+
+    return {'append_per_s': round(append_rate),
+            'window_us': round(window_us, 2),
+            'flight_overview_us': round(overview_us, 2)}
+
+
+def bench_render(frames=300, packets_per_frame=1):
+    """Graph frames in the live window view and the full-flight view.
+
+    The window view's p99 is a full redraw: every X_HEADROOM * PLOT_WINDOW
+    samples (and when the y range grows) the axes are relimited and drawn
+    whole (around 300 ms); the frames between are blits.
+    """
+    packets = sample_packets(1000)
+    results = {}
+    for view in ('window', 'full_flight'):
+        history = TelemetryHistory(DEFAULT_DEPTH, lod_keys=GRAPH_KEYS[1:])
+        for data in packets:
+            history.append(data)
+        graphs = make_graphs()
+
+        times = []
+        for i in range(frames):
+            for j in range(packets_per_frame):
+                history.append(packets[(i * packets_per_frame + j) % len(packets)])
+            start = time.perf_counter()
+            if view == 'window':
+                window = history.window(GRAPH_KEYS, PLOT_WINDOW)
+            else:
+                window = history.flight_overview(GRAPH_KEYS)
+            graphs.update(window['sample'], window)
+            times.append((time.perf_counter() - start) * 1000)
+
+        results[view] = dict(percentiles(times),
+                             frames_per_s=round(frames / (sum(times) / 1000), 1),
+                             full_draws=graphs.full_draws, blits=graphs.blits)
+    return results
+
+
+class CountingLabel:
+    """Stands in for a Tk label: counts the config calls a renderer makes"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def config(self, **options):
+        self.calls += 1
+
+
+def bench_panel(seconds=600, nominal_rate=10.0, fps=20.0):
+    """Label updates for a simulated flight: every label every frame vs LabelPanel"""
+    packets = sample_packets(int(seconds * nominal_rate))
+    frames = int(seconds * fps)
+    clock = [0.0]
+
+    def frame_packets():
+        # The packet the frame loop would be showing at each frame, None if unchanged
+        shown = -1
+        for frame in range(frames):
+            clock[0] = frame / fps
+            latest = min(int(clock[0] * nominal_rate), len(packets) - 1)
+            yield packets[latest] if latest != shown else None
+            shown = latest
+
+    naive_labels = {key: CountingLabel() for key in FIELD_KEYS}
+    start = time.perf_counter()
+    for data in frame_packets():
+        if data is not None:
+            for key, label in naive_labels.items():
+                label.config(text=format_value(key, data[key]))
+    naive_time = time.perf_counter() - start
+
+    panel_labels = {key: CountingLabel() for key in FIELD_KEYS}
+    panel = LabelPanel(panel_labels, clock=lambda: clock[0])
+    current = None
+    start = time.perf_counter()
+    for data in frame_packets():
+        if data is not None:
+            current = data
+            panel.render(current)
+        elif current is not None:
+            panel.flush(current)
+    panel_time = time.perf_counter() - start
+
+    naive_calls = sum(label.calls for label in naive_labels.values())
+    panel_calls = sum(label.calls for label in panel_labels.values())
+    return {
+        'naive_calls_per_s': round(naive_calls / seconds, 1),
+        'panel_calls_per_s': round(panel_calls / seconds, 1),
+        'reduction': round(1 - panel_calls / naive_calls, 3),
+        'naive_us_per_frame': round(naive_time / frames * 1e6, 2),
+        'panel_us_per_frame': round(panel_time / frames * 1e6, 2),
+        'throttled': panel.throttled,
+    }
+
+
+def bench_derived(n=20000):
+    """Derived quantities per packet (runtime stage) and for a whole flight at once"""
+    packets = sample_packets(n)
+    columns = packets_to_columns(packets)
+
+    state = DerivedState()
+    start = time.perf_counter()
+    for data in packets:
+        state.update(data)
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    derived = derive_columns(columns)
+    batch = time.perf_counter() - start
+
+    difference = max(float(np.max(np.abs(derived[key] - [data[key] for data in packets])))
+                     for key in DERIVED_KEYS)
+    return {
+        'incremental_us_per_packet': round(incremental / n * 1e6, 3),
+        'batch_us_per_packet': round(batch / n * 1e6, 3),
+        'max_difference': difference,
+    }
+
+
+def bench_archive(hours=3.0, nominal_rate=10.0, window=60.0, queries=200):
+    """Index and query a multi-hour recording in both formats"""
+    n = int(hours * 3600 * nominal_rate)
+    packets = sample_packets(1000)
+    rng = np.random.default_rng(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        logger = open_flight_logger(directory, "CSV+BIN", max_queue=n)
+        start_time = time.time()
+        for i in range(n):
+            seconds = int(i / nominal_rate)
+            data = dict(packets[i % len(packets)], pkt_no=i,
+                        mission_time=f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}")
+            logger.log(data, start_time + i / nominal_rate)
+        logger.stop()
+
+        for path in logger.paths:
+            start = time.perf_counter()
+            archive = FlightArchive(path)
+            built = time.perf_counter() - start
+            archive.close()
+            start = time.perf_counter()
+            archive = FlightArchive(path)
+            loaded = time.perf_counter() - start
+
+            by_time, by_packet = [], []
+            for t0 in rng.uniform(0, archive.duration - window, queries):
+                start = time.perf_counter()
+                archive.time_range(t0, t0 + window, ['altitude', 'pressure'])
+                by_time.append((time.perf_counter() - start) * 1000)
+                first = int(t0 * nominal_rate)
+                start = time.perf_counter()
+                archive.packets(first, first + 400, ['altitude', 'pressure'])
+                by_packet.append((time.perf_counter() - start) * 1000)
+            archive.close()
+
+            results[os.path.splitext(path)[1].lstrip('.')] = {
+                'records': n,
+                'index_build_ms': round(built * 1000, 1),
+                'index_load_ms': round(loaded * 1000, 2),
+                f'{window:.0f}s_window': percentiles(by_time),
+                'packets_400': percentiles(by_packet),
+            }
+    return results
+
+
+def _fanout_run(lines, clients, slow_clients=0, batch=64, timeout=30.0):
+    """Publish lines through a runtime to clients on localhost; returns what they saw"""
+    server = FanoutServer('127.0.0.1', 0)
+    runtime = StationRuntime({"PRI": TelemetryParser()})
+    runtime.add_task(server.serve)
+    sink = runtime.add_sink("fanout", server.publish, lossy=True)
+    runtime.start()
+    while server.server is None:
+        time.sleep(0.001)
+
+    n = len(lines)
+    # Every client receives the lines in the order they were submitted
+    sent_at = []
+    received = [[] for _ in range(clients)]
+    done = threading.Event()
+
+    async def subscriber(i):
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        times = received[i]
+        while len(times) < n:
+            line = await reader.readline()
+            if not line:
+                break
+            times.append(time.perf_counter())
+        writer.close()
+
+    async def subscribers():
+        await asyncio.gather(*(subscriber(i) for i in range(clients)), return_exceptions=True)
+        done.set()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_until_complete, args=(subscribers(),), daemon=True).start()
+    # Connected but never reading: the server has to drop these, not wait for them
+    stalled = []
+    for _ in range(slow_clients):
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(('127.0.0.1', server.port))
+        stalled.append(sock)
+    while len(server.clients) < clients + slow_clients:
+        time.sleep(0.001)
+
+    start = time.perf_counter()
+    for i in range(0, n, batch):
+        chunk = lines[i:i + batch]
+        sent_at.extend([time.perf_counter()] * len(chunk))
+        runtime.submit_lines("PRI", chunk)
+    while sink.delivered + sink.dropped < n:
+        time.sleep(0.001)
+    published = time.perf_counter() - start
+    if clients:
+        done.wait(timeout)
+    elapsed = time.perf_counter() - start
+
+    runtime.stop()
+    loop.call_soon_threadsafe(loop.stop)
+    for sock in stalled:
+        sock.close()
+    latencies = [(t - sent) * 1000 for times in received for sent, t in zip(sent_at, times)]
+    return {
+        'published_per_s': round(n / published, 1),
+        'received': [len(times) for times in received],
+        'elapsed': elapsed,
+        'latency': percentiles(latencies) if latencies else None,
+        'sink_dropped': sink.dropped,
+        'clients_dropped': server.dropped,
+    }
+
+
+def bench_fanout(n=20000, clients=12):
+    """Packets pushed to many viewers on localhost, plus one that never reads"""
+    lines = sample_lines(n)
+    alone = _fanout_run(lines, 0)
+    shared = _fanout_run(lines, clients, slow_clients=1)
+    received = shared['received']
+    return {
+        'clients': clients,
+        'packets': n,
+        'ingest_per_s_no_clients': alone['published_per_s'],
+        'ingest_per_s': shared['published_per_s'],
+        'per_client_per_s': round(min(received) / shared['elapsed'], 1),
+        'aggregate_per_s': round(sum(received) / shared['elapsed'], 1),
+        'complete_clients': sum(count == n for count in received),
+        'latency': shared['latency'],
+        'sink_dropped': shared['sink_dropped'],
+        'slow_clients_dropped': shared['clients_dropped'],
+    }
+
+
+def bench_end_to_end(rate=1000.0, seconds=10.0, fps=20.0):
+    """Simulated firmware through the whole live path, frame loop included"""
+    emitted_at = []
+    port = SimulatedPort(baudrate=921600)
+
+    def write(data):
+        # One timestamp per line; with no faults pkt_no indexes this list
+        emitted_at.extend([time.perf_counter()] * data.count(b'\n'))
+        port.feed(data)
+
+    simulator = FirmwareSimulator(write, rate)
+    parser = TelemetryParser()
+    packets = queue.SimpleQueue()
+    runtime = StationRuntime({"PRI": parser})
+    runtime.add_source(SerialSource(port))
+    runtime.add_sink("display", packets.put, lossy=True)
+    history = TelemetryHistory(DEFAULT_DEPTH, lod_keys=GRAPH_KEYS[1:])
+    graphs = make_graphs()
+
+    latencies = []
+    frame_times = []
+    rendered = 0
+    period = 1.0 / fps
+    runtime.start()
+    simulator.start()
+    start = next_frame = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        next_frame += period
+        time.sleep(max(next_frame - time.perf_counter(), 0))
+
+        frame_start = time.perf_counter()
+        drained = []
+        try:
+            while True:
+                drained.append(packets.get_nowait())
+        except queue.Empty:
+            pass
+        if not drained:
+            continue
+        for data in drained:
+            history.append(data)
+        window = history.window(GRAPH_KEYS, PLOT_WINDOW)
+        graphs.update(window['sample'], window)
+        done = time.perf_counter()
+
+        frame_times.append((done - frame_start) * 1000)
+        latencies.extend((done - emitted_at[data['pkt_no']]) * 1000 for data in drained)
+        rendered += len(drained)
+    elapsed = time.perf_counter() - start
+
+    simulator.stop()
+    port.close()
+    runtime.stop()
+    return {
+        'rate': rate,
+        'fps': fps,
+        'packets_emitted': simulator.packets_sent,
+        'packets_rendered': rendered,
+        'packets_per_s': round(rendered / elapsed, 1),
+        'parse_errors': parser.stats.error_total,
+        'full_draws': graphs.full_draws,
+        'blits': graphs.blits,
+        'latency': percentiles(latencies),
+        'frame': percentiles(frame_times),
+    }
+
+
+def bench_memory(n=20000, nominal_rate=10.0):
+    """Bytes retained per packet by parse -> history -> logger, scaled to an hour"""
+    lines = sample_lines(n)
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        history = TelemetryHistory(DEFAULT_DEPTH, lod_keys=GRAPH_KEYS[1:])
+        parser = TelemetryParser()
+        logger = open_flight_logger(directory, "CSV")
+        fixed = tracemalloc.get_traced_memory()[0]
+
+        warmup = n // 10
+        for line in lines[:warmup]:
+            history.append(parser.parse(line))
+        base = tracemalloc.get_traced_memory()[0]
+        for line in lines[warmup:]:
+            data = parser.parse(line)
+            history.append(data)
+            logger.log(data)
+        logger.stop()
+        grown = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+
+    per_packet = max(grown, 0) / (n - warmup)
+    return {
+        'fixed_mb': round(fixed / 1e6, 3),
+        'bytes_per_packet': round(per_packet, 2),
+        'growth_mb_per_hour': round(per_packet * nominal_rate * 3600 / 1e6, 3),
+        'nominal_rate': nominal_rate,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(old, new):
+    """Lines describing every numeric result present in both runs"""
+    before = dict(_flatten(old['results']))
+    lines = [f"{old['environment'].get('commit') or '?'} -> {new['environment'].get('commit') or '?'}"]
+    for name, value in _flatten(new['results']):
+        if name not in before:
+            continue
+        previous = before[name]
+        change = f"{(value - previous) / previous * 100:+.1f}%" if previous else "n/a"
+        lines.append(f"  {name:<48} {previous:>14} -> {value:<14} {change}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--only', help="comma separated stages: " + ', '.join(STAGES))
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', metavar='OLD_JSON')
+    parser.add_argument('--rate', type=float, default=1000.0,
+                        help="simulated packets/s for the end-to-end run")
+    parser.add_argument('--seconds', type=float, default=10.0,
+                        help="length of the end-to-end run")
+    parser.add_argument('--fps', type=float, default=20.0)
+    parser.add_argument('--nominal-rate', type=float, default=10.0,
+                        help="downlink packets/s used for per-hour figures")
+    args = parser.parse_args(argv)
+
+    stages = args.only.split(',') if args.only else STAGES
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    runners = {
+        'parser': bench_parser,
+        'logger': lambda: bench_logger(nominal_rate=args.nominal_rate),
+        'history': bench_history,
+        'render': bench_render,
+        'panel': lambda: bench_panel(nominal_rate=args.nominal_rate, fps=args.fps),
+        'derived': bench_derived,
+        'archive': lambda: bench_archive(nominal_rate=args.nominal_rate),
+        'fanout': bench_fanout,
+        'end_to_end': lambda: bench_end_to_end(args.rate, args.seconds, args.fps),
+        'memory': lambda: bench_memory(nominal_rate=args.nominal_rate),
+    }
+    results = {}
+    for stage in stages:
+        print(f"{stage}...", end=' ', flush=True)
+        results[stage] = runners[stage]()
+        print(json.dumps(results[stage]))
+
+    run = {'environment': environment(), 'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(compare(json.load(f), run)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Derived flight quantities.
+
+DerivedState.update(packet) adds to every packet, in O(1):
+
+    roll, pitch          complementary filter: gyro rates integrated, pulled
+                         towards the accelerometer's gravity direction
+    heading              same for yaw against the tilt-compensated magnetometer,
+                         as a compass heading (0-360, clockwise from north)
+    vertical_speed       smoothed derivative of altitude (m/s, up positive)
+    pressure_altitude    standard-atmosphere altitude from the pressure
+    altitude_error       altitude - pressure_altitude
+    gps_altitude_error   altitude - gps_altitude
+
+derive_columns() computes the same from whole-flight columns (parse_batch(),
+archive.FlightArchive) with NumPy, for replays and post-flight analysis. The
+filters are first-order linear recursions with a fixed gain per packet, so
+the batch variant evaluates them in blocks with a matrix product instead of
+a Python loop and matches the incremental one to rounding.
+
+Packets carry no sub-second time, so the time step is the pkt_no step times
+the packet period, estimated from how far the mission clock has moved since
+the first packet (DEFAULT_PERIOD until MIN_SPAN seconds have passed). A
+CanSat restart (telemetry.counter_restarted) starts the filters over; a late
+or repeated pkt_no is given the filters' current state without a step.
+
+Axes are as the 10-DOF board reports them: z up at rest, gyro in deg/s.
+"""
+
+import math
+import numbers
+
+from telemetry import MAX_REORDER, counter_restarted
+
+# Per-packet weight kept on the gyro prediction (the rest follows accel/mag)
+ATTITUDE_GAIN = 0.98
+# Per-packet weight of a new altitude difference in the vertical speed
+SPEED_GAIN = 0.2
+# Packet period assumed until the mission clock has run MIN_SPAN seconds
+DEFAULT_PERIOD = 0.1
+MIN_SPAN = 2.0
+PERIOD_LIMITS = (0.01, 10.0)
+SEA_LEVEL_PRESSURE = 101.325    # kPa
+
+DERIVED_KEYS = ['roll', 'pitch', 'heading', 'vertical_speed',
+                'pressure_altitude', 'altitude_error', 'gps_altitude_error']
+
+_DAY = 24 * 3600
+# Rows per block when the batch variant evaluates a recursion
+_BLOCK = 256
+
+
+def pressure_altitude(pressure):
+    """Standard-atmosphere altitude (m) for a pressure (kPa), or an array of them.
+
+    A pressure that is not positive is a corrupt reading: ValueError for a
+    single value, NaN in its place in an array.
+    """
+    if isinstance(pressure, numbers.Real):
+        if not pressure > 0:
+            raise ValueError(f"pressure must be positive, got {pressure}")
+        ratio = pressure / SEA_LEVEL_PRESSURE
+    else:
+        ratio = pressure / SEA_LEVEL_PRESSURE
+        ratio[~(pressure > 0)] = float('nan')
+    return 44330.0 * (1 - ratio ** (1 / 5.25588))
+
+
+def _tilt(accel_r, accel_p, accel_y):
+    """Roll and pitch (deg) of the gravity vector"""
+    roll = math.degrees(math.atan2(accel_p, accel_y))
+    pitch = math.degrees(math.atan2(-accel_r, math.hypot(accel_p, accel_y)))
+    return roll, pitch
+
+
+def _magnetic_yaw(mag_r, mag_p, mag_y, roll, pitch):
+    """Yaw (deg, counter-clockwise like the gyro) from the tilt-compensated field"""
+    r, p = math.radians(roll), math.radians(pitch)
+    x = mag_r * math.cos(p) + mag_p * math.sin(r) * math.sin(p) + mag_y * math.cos(r) * math.sin(p)
+    y = mag_p * math.cos(r) - mag_y * math.sin(r)
+    return math.degrees(math.atan2(-y, x))
+
+
+class DerivedState:
+    def __init__(self, attitude_gain=ATTITUDE_GAIN, speed_gain=SPEED_GAIN,
+                 default_period=DEFAULT_PERIOD):
+        self.attitude_gain = attitude_gain
+        self.speed_gain = speed_gain
+        self.default_period = default_period
+        self.reset()
+
+    def reset(self):
+        self._pkt_no = None
+        self._first_pkt = None
+        self._clock = None
+        self._elapsed = 0.0
+        self.roll = self.pitch = self.yaw = 0.0
+        self._mag_yaw = None
+        self._altitude = None
+        self.vertical_speed = 0.0
+        self.period = self.default_period
+
+    def update(self, packet):
+        """Add the derived keys to packet (in place) and return it"""
+        pkt_no = packet['pkt_no']
+        clock = packet['mission_time']
+        if isinstance(clock, str):
+            hh, mm, ss = clock.split(':')
+            clock = int(hh) * 3600 + int(mm) * 60 + int(ss)
+        # Checked first, so a corrupt packet leaves the filters as they were
+        baro = pressure_altitude(packet['pressure'])
+        if counter_restarted(pkt_no, self._pkt_no):
+            self.reset()
+
+        altitude = packet['altitude']
+        if self._pkt_no is None:
+            self._first_pkt = pkt_no
+            self.roll, self.pitch = _tilt(packet['accel_r'], packet['accel_p'], packet['accel_y'])
+            self.yaw = self._mag_yaw = _magnetic_yaw(packet['mag_r'], packet['mag_p'], packet['mag_y'],
+                                                     self.roll, self.pitch)
+        elif pkt_no > self._pkt_no:
+            self._step(packet, pkt_no, clock, altitude)
+        if self._pkt_no is None or pkt_no > self._pkt_no:
+            self._pkt_no = pkt_no
+            self._clock = clock
+            self._altitude = altitude
+        # A late or repeated packet leaves the filters alone and gets their current state
+
+        packet['roll'] = self.roll
+        packet['pitch'] = self.pitch
+        packet['heading'] = -self.yaw % 360
+        packet['vertical_speed'] = self.vertical_speed
+        packet['pressure_altitude'] = baro
+        packet['altitude_error'] = altitude - baro
+        packet['gps_altitude_error'] = altitude - packet['gps_altitude']
+        return packet
+
+    def _step(self, packet, pkt_no, clock, altitude):
+        self._elapsed += (clock - self._clock) % _DAY
+        if self._elapsed >= MIN_SPAN:
+            period = self._elapsed / (pkt_no - self._first_pkt)
+            self.period = min(max(period, PERIOD_LIMITS[0]), PERIOD_LIMITS[1])
+        dt = (pkt_no - self._pkt_no) * self.period
+
+        a = self.attitude_gain
+        tilt_roll, tilt_pitch = _tilt(packet['accel_r'], packet['accel_p'], packet['accel_y'])
+        self.roll = a * (self.roll + packet['gyro_r'] * dt) + (1 - a) * tilt_roll
+        self.pitch = a * (self.pitch + packet['gyro_p'] * dt) + (1 - a) * tilt_pitch
+        mag_yaw = _magnetic_yaw(packet['mag_r'], packet['mag_p'], packet['mag_y'],
+                                self.roll, self.pitch)
+        # Follow the magnetometer across +-180 so the blend never jumps a turn
+        self._mag_yaw += (mag_yaw - self._mag_yaw + 180) % 360 - 180
+        self.yaw = a * (self.yaw + packet['gyro_y'] * dt) + (1 - a) * self._mag_yaw
+
+        k = self.speed_gain
+        self.vertical_speed += k * ((altitude - self._altitude) / dt - self.vertical_speed)
+
+
+def _recursion(np, gain, inputs, first):
+    """y[0] = first, y[n] = gain * y[n-1] + inputs[n], evaluated block-wise"""
+    n = len(inputs)
+    out = np.empty(n)
+    if not n:
+        return out
+    lags = np.arange(_BLOCK)
+    # powers[i, j] = gain ** (i - j) below the diagonal: one block of the recursion
+    powers = np.tril(gain ** np.subtract.outer(lags, lags).clip(0))
+    carry_in = gain ** (lags + 1)
+    u = np.array(inputs, dtype=np.float64)
+    u[0] = first
+    previous = 0.0
+    for start in range(0, n, _BLOCK):
+        block = u[start:start + _BLOCK]
+        m = len(block)
+        out[start:start + m] = powers[:m, :m] @ block + carry_in[:m] * previous
+        previous = out[start + m - 1]
+    return out
+
+
+def derive_columns(columns, attitude_gain=ATTITUDE_GAIN, speed_gain=SPEED_GAIN,
+                   default_period=DEFAULT_PERIOD):
+    """Derived columns for a whole flight, as update() would produce them.
+
+    columns is keyed like a packet with clock fields in seconds of day (the
+    parse_batch() layout); returns a dict of float64 arrays keyed by
+    DERIVED_KEYS.
+    """
+    import numpy as np
+
+    pkt_no = np.asarray(columns['pkt_no'], dtype=np.float64)
+    derived = {key: np.empty(len(pkt_no)) for key in DERIVED_KEYS}
+    inputs = {key: np.asarray(columns[key], dtype=np.float64)
+              for key in ('mission_time', 'altitude', 'gyro_r', 'gyro_p', 'gyro_y',
+                          'accel_r', 'accel_p', 'accel_y', 'mag_r', 'mag_p', 'mag_y')}
+    # Every run between restarts is filtered on its own
+    for lo, hi in _runs(np, pkt_no):
+        run = pkt_no[lo:hi]
+        # Late or repeated rows take the state of the newest row before them
+        advancing = np.ones(len(run), dtype=bool)
+        advancing[1:] = run[1:] > np.maximum.accumulate(run)[:-1]
+        rows = lo + np.flatnonzero(advancing)
+        part = {key: values[rows] for key, values in inputs.items()}
+        part['pkt_no'] = pkt_no[rows]
+        latest = np.cumsum(advancing) - 1
+        for key, values in _derive_run(np, part, attitude_gain, speed_gain, default_period).items():
+            derived[key][lo:hi] = values[latest]
+
+    altitude = inputs['altitude']
+    derived['pressure_altitude'] = pressure_altitude(np.asarray(columns['pressure'], dtype=np.float64))
+    derived['altitude_error'] = altitude - derived['pressure_altitude']
+    derived['gps_altitude_error'] = altitude - np.asarray(columns['gps_altitude'], dtype=np.float64)
+    return derived
+
+
+def _runs(np, pkt_no):
+    """(lo, hi) of each stretch between CanSat restarts, by counter_restarted()"""
+    lo, n = 0, len(pkt_no)
+    while lo < n:
+        newest = np.maximum.accumulate(pkt_no[lo:])[:-1]
+        following = pkt_no[lo + 1:]
+        restarts = np.flatnonzero((following < newest)
+                                  & ((following == 0) | (following < newest - MAX_REORDER)))
+        hi = lo + 1 + int(restarts[0]) if len(restarts) else n
+        yield lo, hi
+        lo = hi
+
+
+def _derive_run(np, c, a, k, default_period):
+    pkt_no = c['pkt_no']
+    elapsed = np.concatenate([[0.0], np.cumsum(np.diff(c['mission_time']) % _DAY)])
+    packets = np.maximum(pkt_no - pkt_no[0], 1)
+    period = np.where(elapsed >= MIN_SPAN, np.clip(elapsed / packets, *PERIOD_LIMITS), default_period)
+    dt = np.empty(len(pkt_no))
+    dt[0] = 0.0
+    dt[1:] = np.diff(pkt_no) * period[1:]
+
+    tilt_roll = np.degrees(np.arctan2(c['accel_p'], c['accel_y']))
+    tilt_pitch = np.degrees(np.arctan2(-c['accel_r'], np.hypot(c['accel_p'], c['accel_y'])))
+    roll = _recursion(np, a, a * c['gyro_r'] * dt + (1 - a) * tilt_roll, tilt_roll[0])
+    pitch = _recursion(np, a, a * c['gyro_p'] * dt + (1 - a) * tilt_pitch, tilt_pitch[0])
+
+    r, p = np.radians(roll), np.radians(pitch)
+    x = c['mag_r'] * np.cos(p) + c['mag_p'] * np.sin(r) * np.sin(p) + c['mag_y'] * np.cos(r) * np.sin(p)
+    y = c['mag_p'] * np.cos(r) - c['mag_y'] * np.sin(r)
+    mag_yaw = np.degrees(np.arctan2(-y, x))
+    mag_yaw = mag_yaw[0] + np.concatenate([[0.0], np.cumsum((np.diff(mag_yaw) + 180) % 360 - 180)])
+    yaw = _recursion(np, a, a * c['gyro_y'] * dt + (1 - a) * mag_yaw, mag_yaw[0])
+
+    rate = np.zeros(len(pkt_no))
+    rate[1:] = np.diff(c['altitude']) / dt[1:]
+    vertical_speed = _recursion(np, 1 - k, k * rate, 0.0)
+
+    return {
+        'roll': roll,
+        'pitch': pitch,
+        'heading': -yaw % 360,
+        'vertical_speed': vertical_speed,
+    }
@@ -0,0 +1,203 @@
+"""Online flight-event detection.
+
+EventDetector.update(packet) runs as a runtime stage after
+DerivedState.update (it reads vertical_speed) and looks at every packet
+once, in pkt_no order, so an event fires on the packet that meets its
+condition:
+
+    APOGEE              vertical speed turns negative after the climb
+    PAYLOAD RELEASE     altitude down to 80% of the peak, where main.c's
+                        descending_task releases payload and parafoil
+    CONTAINER RELEASE   down to 64% of the peak (80% of 80%)
+    STATE               the CanSat reports a new state
+    VOLTAGE SAG         voltage SAG_DROP below its smoothed level, or under
+                        MIN_VOLTAGE; fires again only after it recovers
+    COUNTER STALLED     a different packet arrives with the same pkt_no, as
+                        when xBee_send's counter stops advancing
+
+Events are handed to on_event(event) and listed under 'events' in the
+packet they fired on, so the display sink can mark them on the graphs;
+detector.events holds those of the current flight only.
+A CanSat restart (telemetry.counter_restarted) starts a new flight; a late
+packet, behind the newest pkt_no, fires nothing. With two receivers the
+merger already drops repeated pkt_no, so a stalled counter shows up there
+as duplicates instead.
+"""
+
+import csv
+import os
+import time
+
+from flight_log import FlightLogger, format_timestamp
+from telemetry import counter_restarted
+
+APOGEE = 'APOGEE'
+PAYLOAD_RELEASE = 'PAYLOAD RELEASE'
+CONTAINER_RELEASE = 'CONTAINER RELEASE'
+STATE = 'STATE'
+VOLTAGE_SAG = 'VOLTAGE SAG'
+COUNTER_STALLED = 'COUNTER STALLED'
+
+# Climb (m above the first packet) and climb rate (m/s) that arm apogee detection
+ARM_CLIMB = 10.0
+ARM_SPEED = 1.0
+# Fractions of the peak altitude at which main.c releases payload, then container
+RELEASE_FRACTIONS = [(PAYLOAD_RELEASE, 0.8), (CONTAINER_RELEASE, 0.8 * 0.8)]
+# Volts below the smoothed voltage that count as a sag, and the absolute floor
+SAG_DROP = 0.3
+MIN_VOLTAGE = 3.3
+VOLTAGE_GAIN = 1 / 32
+
+EVENT_LOG_HEADER = ["Timestamp", "Packet_Count", "Mission_Time", "Event", "Altitude_m", "Detail"]
+
+
+class FlightEvent:
+    def __init__(self, kind, packet, detail="", altitude=None):
+        self.kind = kind
+        self.time = time.time()
+        self.pkt_no = packet['pkt_no']
+        self.mission_time = packet['mission_time']
+        self.altitude = packet['altitude'] if altitude is None else altitude
+        self.detail = detail
+
+    def __str__(self):
+        text = f"{self.kind} at #{self.pkt_no} ({self.mission_time}, {self.altitude:.1f} m)"
+        return f"{text}: {self.detail}" if self.detail else text
+
+
+class EventDetector:
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.reset()
+
+    def reset(self):
+        """Forget the flight so far (new session, CanSat restart)"""
+        self.events = []
+        self._last = None
+        self._start_altitude = None
+        self._peak = None
+        self._armed = False
+        self.apogee = None
+        self._releases = list(RELEASE_FRACTIONS)
+        self._state = None
+        self._voltage = None
+        self._sagging = False
+        self._stalled = False
+
+    def update(self, packet):
+        """Check one packet; returns the events it fired (usually none)"""
+        last = self._last
+        pkt_no = packet['pkt_no']
+        if last is not None and counter_restarted(pkt_no, last['pkt_no']):
+            self.reset()
+            last = None
+        elif last is not None and pkt_no < last['pkt_no']:
+            # Late: what it could have shown was decided by the packets after it
+            return []
+        fired = []
+        altitude = packet['altitude']
+
+        if last is not None and pkt_no == last['pkt_no']:
+            # A radio duplicate is the same packet again; a stalled counter is not
+            if not self._stalled and (packet['mission_time'], altitude, packet['pressure']) != \
+                    (last['mission_time'], last['altitude'], last['pressure']):
+                self._stalled = True
+                fired.append(FlightEvent(COUNTER_STALLED, packet, f"pkt_no stuck at {pkt_no}"))
+        else:
+            self._stalled = False
+
+        if self._start_altitude is None:
+            self._start_altitude = altitude
+        if self._peak is None or altitude > self._peak[1]:
+            self._peak = (pkt_no, altitude)
+        vertical_speed = packet.get('vertical_speed', 0.0)
+        if self.apogee is None:
+            if not self._armed:
+                self._armed = (altitude - self._start_altitude >= ARM_CLIMB
+                               and vertical_speed > ARM_SPEED)
+            elif vertical_speed < 0:
+                peak_pkt, peak_altitude = self._peak
+                self.apogee = FlightEvent(APOGEE, packet, f"peak at #{peak_pkt}", peak_altitude)
+                fired.append(self.apogee)
+        elif self._releases:
+            kind, fraction = self._releases[0]
+            threshold = self.apogee.altitude * fraction
+            if altitude <= threshold:
+                self._releases.pop(0)
+                fired.append(FlightEvent(kind, packet, f"{fraction:.0%} of peak ({threshold:.1f} m)"))
+
+        state = packet['state']
+        if state != self._state:
+            if self._state is not None:
+                fired.append(FlightEvent(STATE, packet, f"{self._state} -> {state}"))
+            self._state = state
+
+        voltage = packet['voltage']
+        if self._voltage is None:
+            self._voltage = voltage
+        low = voltage < self._voltage - SAG_DROP or voltage < MIN_VOLTAGE
+        if low and not self._sagging:
+            self._sagging = True
+            fired.append(FlightEvent(VOLTAGE_SAG, packet,
+                                     f"{voltage:.2f} V against {self._voltage:.2f} V"))
+        elif self._sagging and voltage >= self._voltage - SAG_DROP / 2 and voltage >= MIN_VOLTAGE:
+            self._sagging = False
+        if not self._sagging:
+            # The reference only follows the battery while it is healthy
+            self._voltage += (voltage - self._voltage) * VOLTAGE_GAIN
+
+        self._last = packet
+        if fired:
+            packet['events'] = fired
+            self.events.extend(fired)
+            if self.on_event:
+                for event in fired:
+                    self.on_event(event)
+        return fired
+
+
+class EventCsvSink:
+    """FlightLogger sink writing (time, FlightEvent) records as CSV rows"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EVENT_LOG_HEADER)
+        self.file.flush()
+
+    def write_batch(self, records):
+        self.writer.writerows([format_timestamp(t), event.pkt_no, event.mission_time,
+                               event.kind, f"{event.altitude:.2f}", event.detail]
+                              for t, event in records)
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+class EventLog:
+    """Events of one recording, kept next to the flight log as <recording>_events.csv.
+
+    write() is called on the runtime loop, so the rows go through a
+    FlightLogger writer thread of their own like the packets do; each event
+    is flushed as soon as that thread gets to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.logger = FlightLogger(EventCsvSink(path), batch_size=1)
+        self.logger.start()
+
+    def write(self, event):
+        self.logger.log(event, event.time)
+
+    def close(self):
+        self.logger.stop()
@@ -0,0 +1,107 @@
+"""Telemetry fan-out to other machines on the local network.
+
+    python test.py --serve 5760                          publish what this station receives
+    python test.py --headless --connect 192.168.1.20:5760    record from a publishing station
+
+FanoutServer runs on the StationRuntime loop (a task for the listening
+socket, a lossy sink for the packets) and sends every packet to every
+connected client over TCP, as the line xBee_send would have printed, so a
+subscriber reads it with the same framer and parser as a serial port
+(runtime.NetworkSource).
+
+Publishing never waits for a client. The lines of one runtime batch are
+joined and encoded once and go to every client's transport as a single
+write when the batch is done, so the cost is one send per client per batch
+rather than per packet. A client whose unsent backlog passes max_buffer
+bytes is too slow to keep up and is disconnected: one stalled laptop costs
+the station nothing beyond that bounded buffer and the others are
+unaffected. Clients are not expected to send anything.
+"""
+
+import asyncio
+
+from telemetry import format_line
+
+DEFAULT_PORT = 5760
+# Unsent bytes per client before it is dropped (about 2000 packets)
+MAX_CLIENT_BUFFER = 512 * 1024
+
+
+def parse_address(text, default_host='0.0.0.0'):
+    """'5760' -> (default_host, 5760), 'host:5760' -> ('host', 5760)"""
+    host, _, port = str(text).rpartition(':')
+    return host or default_host, int(port)
+
+
+class FanoutServer:
+    def __init__(self, host='0.0.0.0', port=DEFAULT_PORT, max_buffer=MAX_CLIENT_BUFFER):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.clients = {}
+        self.server = None
+        self.loop = None
+        self._pending = []
+        self.connections = 0
+        self.dropped = 0
+        self.packets = 0
+        self.bytes_sent = 0
+
+    async def serve(self):
+        """Runtime task: accept clients until the runtime stops"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.server = await asyncio.start_server(self._client, self.host, self.port)
+        except OSError as e:
+            # The station carries on without fan-out rather than failing
+            print(f"Fan-out server on {self.host}:{self.port} not started: {e}")
+            return
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            self.clients.clear()
+
+    async def _client(self, reader, writer):
+        self.clients[writer] = writer.get_extra_info('peername')
+        self.connections += 1
+        try:
+            # Anything a client sends is ignored; EOF or an error means it left
+            while await reader.read(4096):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def publish(self, packet):
+        """Sink: queue one packet for every client, never blocking"""
+        if not self.clients:
+            return
+        if not self._pending:
+            # Runs once the sink has handed over the rest of its batch
+            self.loop.call_soon(self._send)
+        self._pending.append(format_line(packet) + '\r\n')
+        self.packets += 1
+
+    def _send(self):
+        data = ''.join(self._pending).encode()
+        self._pending.clear()
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                print(f"Fan-out client {self.clients[writer]} too slow, dropped")
+                self.clients.pop(writer)
+                self.dropped += 1
+                writer.transport.abort()
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    def status_line(self):
+        return (f"FANOUT :{self.port} | {len(self.clients)} CLIENTS | "
+                f"{self.packets} PKT | {self.dropped} DROPPED")
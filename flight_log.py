@@ -0,0 +1,439 @@
+"""Flight recording.
+
+Packets are queued by the ingest path and written by a dedicated thread so
+slow storage (USB sticks in particular) never stalls the serial reader.
+Rows are flushed in batches, either when batch_size rows are pending or when
+the oldest pending row is flush_interval seconds old, and the file is
+fsync'ed at least every fsync_interval seconds and always on stop.
+
+Worst-case loss window: flush_interval for a crash of this process,
+fsync_interval for a power cut or a yanked drive.
+
+Two formats are available: the CSV the team has always used, and a compact
+append-only binary recording (.cfr) that can be exported to the same CSV
+later with `python flight_log.py export FLIGHT.cfr [OUT.csv]`.
+"""
+
+import csv
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+import telemetry
+
+CSV_HEADER = ["Timestamp", "Team_ID", "Mission_Time", "Packet_Count", "Mode", "State",
+              "Altitude_m", "Temperature_C", "Pressure_kPa", "Voltage_V",
+              "Gyro_Roll", "Gyro_Pitch", "Gyro_Yaw", "Accel_Roll", "Accel_Pitch", "Accel_Yaw",
+              "Mag_Roll", "Mag_Pitch", "Mag_Yaw", "Rotation_Rate", "GPS_Time",
+              "GPS_Altitude", "GPS_Latitude", "GPS_Longitude", "GPS_Sats"]
+
+# Packet keys for every column after Timestamp
+CSV_FIELDS = ['id', 'mission_time', 'pkt_no', 'mode', 'state',
+              'altitude', 'temperature', 'pressure', 'voltage',
+              'gyro_r', 'gyro_p', 'gyro_y', 'accel_r', 'accel_p', 'accel_y',
+              'mag_r', 'mag_p', 'mag_y', 'rotation_rate', 'gps_time',
+              'gps_altitude', 'latitude', 'longitude', 'gps_stats']
+
+
+def format_timestamp(t):
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_HEADER)
+
+    def write_batch(self, records):
+        rows = []
+        for recv_time, data in records:
+            row = [format_timestamp(recv_time)]
+            row.extend(data[key] for key in CSV_FIELDS)
+            rows.append(row)
+        self.writer.writerows(rows)
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+# Binary flight recording (.cfr)
+#
+#   file header   magic b'CSFR', version, record size
+#   chunk*        chunk header + `count` fixed-size records, one per batch
+#   index         b'CIDX', count, one entry per chunk    (written on close)
+#   footer        index offset, b'CEND'                   (written on close)
+#
+# A record is the 28-field packet sent by xBee_send in main/xBee.c plus the
+# ground receive time. If the file was not closed cleanly the footer is
+# missing and readers rebuild the index by walking the chunk headers.
+
+CFR_MAGIC = b'CSFR'
+CFR_VERSION = 1
+CFR_HEADER = struct.Struct('<4sHH')
+CHUNK_MAGIC = b'CHNK'
+# magic, record count, first/last receive time, first/last packet count
+CHUNK_HEADER = struct.Struct('<4sIddII')
+INDEX_MAGIC = b'CIDX'
+INDEX_COUNT = struct.Struct('<4sI')
+# chunk offset, record count, first/last receive time, first/last packet count
+INDEX_ENTRY = struct.Struct('<QIddII')
+FOOTER_MAGIC = b'CEND'
+FOOTER = struct.Struct('<Q4s')
+
+# recv_time, id, hh, mm, ss, pkt_no, mode, state, altitude .. mag_y (13 floats),
+# rotation_rate, gps_hh, gps_mm, gps_ss, gps_altitude, latitude, longitude, gps_stats
+RECORD = struct.Struct('<dHBBBIBB13fiBBBfffB')
+RECORD_FLOATS = ['altitude', 'temperature', 'pressure', 'voltage',
+                 'gyro_r', 'gyro_p', 'gyro_y', 'accel_r', 'accel_p', 'accel_y',
+                 'mag_r', 'mag_p', 'mag_y']
+
+# Mode/state codes index the firmware vocabulary; code 0 is kept for anything unexpected
+MODES = [''] + telemetry.MODES
+STATES = [''] + telemetry.STATES
+_MODE_CODES = {name: code for code, name in enumerate(MODES)}
+_STATE_CODES = {name: code for code, name in enumerate(STATES)}
+
+
+def _split_time(text):
+    hh, mm, ss = str(text).split(':')
+    return int(hh), int(mm), int(ss)
+
+
+def pack_record(recv_time, data):
+    hh, mm, ss = _split_time(data['mission_time'])
+    gps_hh, gps_mm, gps_ss = _split_time(data['gps_time'])
+    return RECORD.pack(
+        recv_time, int(data['id']), hh, mm, ss, int(data['pkt_no']),
+        _MODE_CODES.get(data['mode'], 0), _STATE_CODES.get(data['state'], 0),
+        *[float(data[key]) for key in RECORD_FLOATS],
+        int(data['rotation_rate']), gps_hh, gps_mm, gps_ss,
+        float(data['gps_altitude']), float(data['latitude']), float(data['longitude']),
+        int(data['gps_stats']))
+
+
+def unpack_record(buffer, offset=0):
+    values = RECORD.unpack_from(buffer, offset)
+    # float32 on disk like the firmware's floats; round back to the 6 decimals %f prints
+    floats = [round(v, 6) for v in values[8:21]]
+    data = {
+        'id': values[1],
+        'mission_time': f"{values[2]:02d}:{values[3]:02d}:{values[4]:02d}",
+        'pkt_no': values[5],
+        'mode': MODES[values[6]] if values[6] < len(MODES) else '',
+        'state': STATES[values[7]] if values[7] < len(STATES) else '',
+        'rotation_rate': values[21],
+        'gps_time': f"{values[22]:02d}:{values[23]:02d}:{values[24]:02d}",
+        'gps_altitude': round(values[25], 6),
+        'latitude': round(values[26], 6),
+        'longitude': round(values[27], 6),
+        'gps_stats': values[28],
+    }
+    data.update(zip(RECORD_FLOATS, floats))
+    return values[0], data
+
+
+class BinarySink:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(CFR_HEADER.pack(CFR_MAGIC, CFR_VERSION, RECORD.size))
+        self.index = []
+        self.rows_skipped = 0
+
+    def write_batch(self, records):
+        packed = []
+        first = last = None
+        for recv_time, data in records:
+            try:
+                packed.append(pack_record(recv_time, data))
+            except (ValueError, KeyError, struct.error):
+                self.rows_skipped += 1
+                continue
+            if first is None:
+                first = (recv_time, int(data['pkt_no']))
+            last = (recv_time, int(data['pkt_no']))
+        if not packed:
+            return
+
+        offset = self.file.tell()
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, len(packed), first[0], last[0],
+                                   first[1], last[1])
+        self.file.write(header + b''.join(packed))
+        self.index.append((offset, len(packed), first[0], last[0], first[1], last[1]))
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        index_offset = self.file.tell()
+        parts = [INDEX_COUNT.pack(INDEX_MAGIC, len(self.index))]
+        parts.extend(INDEX_ENTRY.pack(*entry) for entry in self.index)
+        parts.append(FOOTER.pack(index_offset, FOOTER_MAGIC))
+        self.file.write(b''.join(parts))
+        self.sync()
+        self.file.close()
+
+
+class TeeSink:
+    """Feeds the same batches to several sinks (e.g. CSV and binary)"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write_batch(self, records):
+        for sink in self.sinks:
+            sink.write_batch(records)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def sync(self):
+        for sink in self.sinks:
+            sink.sync()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+_STOP = object()
+
+
+class FlightLogger:
+    """Batched background writer in front of a sink.
+
+    A sink provides write_batch(records), flush(), sync() and close(), where
+    records is a list of (receive_time, packet) tuples.
+    """
+
+    def __init__(self, sink, batch_size=50, flush_interval=0.5, fsync_interval=5.0,
+                 max_queue=10000):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+
+        # Stats, written by the writer thread and read from anywhere
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self.error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run_guarded, name="flight-logger", daemon=True)
+        self.thread.start()
+
+    def _run_guarded(self):
+        try:
+            self.run()
+        except Exception as e:
+            # Anything _guard did not expect ends the writer: report it like a storage error
+            self.error = e
+            print(f"Logging error: writer stopped: {e!r}")
+            try:
+                self.sink.close()
+            except Exception:
+                pass
+
+    def log(self, data, recv_time=None):
+        if recv_time is None:
+            recv_time = time.time()
+        try:
+            self.queue.put_nowait((recv_time, data))
+        except queue.Full:
+            # Never block ingestion on storage; count what we had to shed
+            self.rows_dropped += 1
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def stop(self, timeout=10):
+        """Drain the queue, flush and fsync the file, then close it"""
+        if self.thread:
+            if self.thread.is_alive():
+                try:
+                    # A full queue drains as the writer runs; a wedged writer must not wedge us
+                    self.queue.put(_STOP, timeout=timeout)
+                except queue.Full:
+                    print("Logging error: writer did not drain its queue, stopped without it")
+                else:
+                    self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def run(self):
+        batch = []
+        deadline = None
+        last_sync = time.monotonic()
+        unsynced = False
+
+        while True:
+            if batch:
+                timeout = max(deadline - time.monotonic(), 0)
+            elif unsynced:
+                # The downlink may have gone quiet: still sync within fsync_interval
+                timeout = max(last_sync + self.fsync_interval - time.monotonic(), 0)
+            else:
+                timeout = None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+
+            if item is not None:
+                batch.append(item)
+                if len(batch) == 1:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                self._write(batch)
+                batch = []
+                unsynced = True
+
+            if unsynced and time.monotonic() - last_sync >= self.fsync_interval:
+                self._guard(self.sink.sync)
+                last_sync = time.monotonic()
+                unsynced = False
+
+        if batch:
+            self._write(batch)
+        self._guard(self.sink.close)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        if self._guard(self.sink.write_batch, batch) and self._guard(self.sink.flush):
+            self.rows_written += len(batch)
+            self.batches_written += 1
+        else:
+            self.rows_dropped += len(batch)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.last_write_ms = elapsed
+        self.max_write_ms = max(self.max_write_ms, elapsed)
+
+    def _guard(self, func, *args):
+        # No error may kill the writer thread (a bad row costs its batch, not
+        # the recording); keep the last one for the UI
+        try:
+            func(*args)
+            return True
+        except Exception as e:
+            self.error = e
+            print(f"Logging error: {e}")
+            return False
+
+
+LOG_FORMATS = ["CSV", "BIN", "CSV+BIN"]
+
+
+def open_flight_logger(directory, log_format="CSV", **options):
+    """Create and start a logger for a new CanSat_Flight_<timestamp> recording.
+
+    Extra keyword options are passed on to FlightLogger.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    basename = os.path.join(directory, f"CanSat_Flight_{timestamp}")
+
+    sinks = []
+    if "CSV" in log_format:
+        sinks.append(CsvSink(basename + ".csv"))
+    if "BIN" in log_format:
+        sinks.append(BinarySink(basename + ".cfr"))
+    if not sinks:
+        raise ValueError(f"unknown log format {log_format!r}")
+
+    logger = FlightLogger(sinks[0] if len(sinks) == 1 else TeeSink(*sinks), **options)
+    logger.paths = [sink.path for sink in sinks]
+    logger.start()
+    return logger
+
+
+def read_chunk_index(buffer):
+    """Return the chunk index of a .cfr recording held in a bytes-like buffer.
+
+    Entries are (offset, count, first_time, last_time, first_pkt, last_pkt).
+    """
+    magic, version, record_size = CFR_HEADER.unpack_from(buffer, 0)
+    if magic != CFR_MAGIC or record_size != RECORD.size:
+        raise ValueError("not a CanSat flight recording")
+
+    if len(buffer) >= CFR_HEADER.size + FOOTER.size:
+        index_offset, footer_magic = FOOTER.unpack_from(buffer, len(buffer) - FOOTER.size)
+        if footer_magic == FOOTER_MAGIC:
+            index_magic, count = INDEX_COUNT.unpack_from(buffer, index_offset)
+            if index_magic == INDEX_MAGIC:
+                start = index_offset + INDEX_COUNT.size
+                return [INDEX_ENTRY.unpack_from(buffer, start + i * INDEX_ENTRY.size)
+                        for i in range(count)]
+
+    # Unclean shutdown: walk the chunk headers, stopping at the first torn chunk
+    index = []
+    offset = CFR_HEADER.size
+    while offset + CHUNK_HEADER.size <= len(buffer):
+        magic, count, t_first, t_last, pkt_first, pkt_last = CHUNK_HEADER.unpack_from(buffer, offset)
+        end = offset + CHUNK_HEADER.size + count * RECORD.size
+        if magic != CHUNK_MAGIC or end > len(buffer):
+            break
+        index.append((offset, count, t_first, t_last, pkt_first, pkt_last))
+        offset = end
+    return index
+
+
+def read_records(path):
+    """Yield (receive_time, packet) for every record in a .cfr recording"""
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    for offset, count, *_ in read_chunk_index(buffer):
+        start = offset + CHUNK_HEADER.size
+        for i in range(count):
+            yield unpack_record(buffer, start + i * RECORD.size)
+
+
+def export_csv(path, csv_path=None):
+    """Convert a .cfr recording into the ground station's CSV format"""
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + '.csv'
+    sink = CsvSink(csv_path)
+    batch = []
+    for record in read_records(path):
+        batch.append(record)
+        if len(batch) >= 1000:
+            sink.write_batch(batch)
+            batch = []
+    sink.write_batch(batch)
+    sink.close()
+    return csv_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != 'export':
+        print("usage: python flight_log.py export FLIGHT.cfr [OUT.csv]")
+        sys.exit(2)
+    print(export_csv(*sys.argv[2:]))
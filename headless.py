@@ -0,0 +1,201 @@
+"""Headless capture for recovery laptops and the Raspberry Pi relay.
+
+    python test.py --headless --port /dev/ttyUSB0 --baud 115200 --out /media/usb
+    python test.py --headless --replay CanSat_Flight_x.cfr --speed max
+    python test.py --headless --port /dev/ttyUSB0 --backup-port /dev/ttyUSB1
+    python test.py --headless --port /dev/ttyUSB0 --serve 5760
+    python test.py --headless --connect 192.168.1.20:5760
+
+Runs the station runtime (serial sources, parser, analytics and flight
+logger) without importing tkinter, matplotlib or NumPy, and prints a stats line every few seconds. With
+--replay a recorded flight stands in for the serial port, which at
+--speed max measures the capture pipeline's sustained packet rate. With
+--backup-port a second receiver is merged in and every packet is logged once.
+--serve publishes the packets to other stations on the network (fanout.py);
+--connect records what such a station publishes instead of a serial port.
+Flight events (events.py) are printed as they fire and written to
+<recording>_events.csv.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from functools import partial
+
+import serial
+
+from analytics import LinkAnalytics
+from derived import DerivedState
+from events import EventDetector, EventLog
+from fanout import FanoutServer, parse_address
+from flight_log import LOG_FORMATS, open_flight_logger
+from replay import ReplaySource, load_flight, parse_speed
+from runtime import NetworkSource, SerialSource, StationRuntime
+from serial_link import link_utilisation
+from telemetry import DEFAULT_TEAM_ID, TelemetryParser
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="test.py", description="TINPOT CanSat ground station")
+    parser.add_argument('--headless', action='store_true',
+                        help="capture and record without the GUI")
+    parser.add_argument('--port', help="serial port of the XBee receiver")
+    parser.add_argument('--backup-port',
+                        help="serial port of a second receiver, merged with --port (headless)")
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--out', default='.',
+                        help="directory for CanSat_Flight_* recordings (headless)")
+    parser.add_argument('--format', default="CSV", choices=LOG_FORMATS, type=str.upper,
+                        help="recording format (headless)")
+    parser.add_argument('--stats-interval', type=float, default=5.0,
+                        help="seconds between stats lines (headless)")
+    parser.add_argument('--history-depth', type=int, default=None,
+                        help="samples of telemetry history kept for the graphs (GUI)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print startup milestones and deferred import times (GUI)")
+    parser.add_argument('--probes', action='store_true',
+                        help="start with the hot-path timing probes enabled (GUI)")
+    parser.add_argument('--team-id', type=int, default=DEFAULT_TEAM_ID,
+                        help="team id sent in uplink commands (GUI)")
+    parser.add_argument('--render-process', action='store_true',
+                        help="draw the graphs in a separate process fed through shared memory (GUI)")
+    parser.add_argument('--replay', metavar='FLIGHT',
+                        help="play a recorded .csv/.cfr flight instead of reading --port")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="replay speed: a multiple of real time (e.g. 10x) or 'max'")
+    parser.add_argument('--serve', metavar='[HOST:]PORT', type=parse_address,
+                        help="publish received packets to other stations over TCP")
+    parser.add_argument('--connect', metavar='HOST:PORT',
+                        help="record (or, in the GUI, show) another station's --serve feed instead of --port")
+    return parser
+
+
+class HeadlessStation:
+    def __init__(self, port, baud, out_dir, log_format="CSV", replay=None, speed=1.0,
+                 backup_port=None, serve=None, connect=None):
+        self.parser = TelemetryParser()
+        self.analytics = LinkAnalytics()
+        self.baud = baud
+        self.stop_event = threading.Event()
+        self.serial_port = None
+        self.backup_port = None
+        self.replay = None
+        self.fanout = None
+        parsers = {"PRI": self.parser}
+        if backup_port and not (replay or connect):
+            parsers["BAK"] = TelemetryParser()
+        self.runtime = StationRuntime(parsers, on_reject=self.reject_line)
+
+        if replay:
+            self.replay = ReplaySource(load_flight(replay), partial(self.runtime.submit_lines, "PRI"),
+                                       speed, on_finished=self.stop_event.set)
+            self.reader = self.replay
+        elif connect:
+            self.reader = self.runtime.add_source(NetworkSource(*parse_address(connect, 'localhost')))
+        else:
+            self.serial_port = serial.Serial(port, baud, timeout=1)
+            self.reader = self.runtime.add_source(SerialSource(self.serial_port, "PRI"))
+            if backup_port:
+                self.backup_port = serial.Serial(backup_port, baud, timeout=1)
+                self.runtime.add_source(SerialSource(self.backup_port, "BAK"))
+        self.runtime.add_stage("derived", DerivedState().update)
+        self.runtime.add_stage("events", EventDetector(on_event=self.record_event).update)
+        self.runtime.add_sink("analytics", self.analytics.packet)
+        self.logger = open_flight_logger(out_dir, log_format)
+        self.event_log = EventLog(os.path.splitext(self.logger.paths[0])[0] + "_events.csv")
+        self.runtime.add_sink("log", self.logger.log)
+        if serve:
+            self.fanout = FanoutServer(*serve)
+            self.runtime.add_task(self.fanout.serve)
+            # Lossy: a backed-up network must never hold up the recording
+            self.runtime.add_sink("fanout", self.fanout.publish, lossy=True)
+
+    def reject_line(self, line):
+        self.analytics.parse_failed()
+
+    def record_event(self, event):
+        print(f"[{time.strftime('%H:%M:%S')}] EVENT {event}", flush=True)
+        self.event_log.write(event)
+
+    def stats_line(self):
+        byte_rate, line_rate = self.reader.meter.sample()
+        if self.serial_port:
+            link = f" ({link_utilisation(byte_rate, self.baud) * 100:.0f}% link)"
+        else:
+            link = ""
+        stats = self.parser.stats
+        line = (f"[{time.strftime('%H:%M:%S')}] {line_rate:.1f} pkt/s | {byte_rate:.0f} B/s{link} | "
+                f"packets {stats.packets} | parse errors {stats.error_total} | "
+                f"logged {self.logger.rows_written} (queue {self.logger.queue_depth()}, "
+                f"dropped {self.logger.rows_dropped})\n    {self.analytics.status_line()}")
+        if self.runtime.merger:
+            line += f"\n    {self.runtime.merger.status_line()}"
+        if any(stage.errors for stage in self.runtime.stages):
+            line += f"\n    {self.runtime.status_line()}"
+        if self.fanout:
+            line += f"\n    {self.fanout.status_line()}"
+        if self.logger.error:
+            line += f"\n    log error: {self.logger.error}"
+        return line
+
+    def run(self, stats_interval):
+        stop = self.stop_event
+        # systemd and friends stop services with SIGTERM: finish the file cleanly
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        print(f"Recording to {', '.join(self.logger.paths)}")
+        self.runtime.start()
+        if self.replay:
+            self.replay.start()
+        try:
+            while not stop.wait(stats_interval):
+                print(self.stats_line(), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+            print(self.stats_line())
+            if self.replay:
+                print(f"Replayed {self.replay.position}/{len(self.replay)} lines at "
+                      f"{self.replay.packet_rate():.0f} pkt/s")
+
+    def close(self):
+        if self.replay:
+            self.replay.stop()
+        # Drains the sinks, so every packet read reaches the logger before it stops
+        self.runtime.stop()
+        self.logger.stop()
+        self.event_log.close()
+        try:
+            self.analytics.write_summary(os.path.splitext(self.logger.paths[0])[0] + "_link.json")
+        except OSError as e:
+            print(f"Link summary not written: {e}", file=sys.stderr)
+        for port in (self.serial_port, self.backup_port):
+            if port and port.is_open:
+                port.close()
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if not (args.port or args.replay or args.connect):
+        print("--port, --replay or --connect is required in headless mode", file=sys.stderr)
+        return 2
+
+    try:
+        station = HeadlessStation(args.port, args.baud, args.out, args.format,
+                                  replay=args.replay, speed=args.speed,
+                                  backup_port=args.backup_port, serve=args.serve,
+                                  connect=args.connect)
+    except (serial.SerialException, OSError, ValueError) as e:
+        print(f"Startup failed: {e}", file=sys.stderr)
+        return 1
+
+    station.run(args.stats_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
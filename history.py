@@ -0,0 +1,190 @@
+"""Columnar telemetry history.
+
+One preallocated float64 row per telemetry field, used as a ring buffer.
+Every sample is written twice, at head and head + capacity, so the most
+recent n samples of any field are always one contiguous slice and can be
+handed out as a view without copying. Appends are O(1) and memory is fixed
+at construction, however long the flight runs.
+
+Selected channels additionally feed a MinMaxDecimator, a level-of-detail
+summary of the whole flight (not just what the ring still holds) that can be
+plotted at a constant number of points.
+"""
+
+import math
+
+import numpy as np
+
+from telemetry import CLOCK, FIELDS, MODES, STATES, TEXT, clock_seconds
+
+# Deep enough for an hour of 10 Hz telemetry
+DEFAULT_DEPTH = 36000
+# Roughly the pixel width of a graph panel
+DEFAULT_BUCKETS = 1024
+
+_TEXT_CODES = {
+    'mode': {name: code for code, name in enumerate(MODES)},
+    'state': {name: code for code, name in enumerate(STATES)},
+}
+
+
+def _column_converter(key, kind):
+    # Everything is stored as float64: clocks as seconds of day, mode/state
+    # as their index in the firmware vocabulary (NaN when unknown)
+    if kind == CLOCK:
+        return clock_seconds
+    if kind == TEXT:
+        codes = _TEXT_CODES.get(key, {})
+        return lambda value: codes.get(value, math.nan)
+    return float
+
+
+class MinMaxDecimator:
+    """Min/max buckets over an unbounded stream, maintained incrementally.
+
+    Each bucket summarises bucket_size consecutive samples. When all buckets
+    are full, neighbours are merged pairwise and bucket_size doubles, so
+    between max_buckets / 2 and max_buckets buckets cover the whole stream
+    and appends stay amortised O(1).
+    """
+
+    def __init__(self, max_buckets=DEFAULT_BUCKETS):
+        self.max_buckets = max_buckets - max_buckets % 2
+        self.bucket_size = 1
+        self.x = np.empty(self.max_buckets)
+        self.mins = np.empty(self.max_buckets)
+        self.maxs = np.empty(self.max_buckets)
+        self.n = 0
+        self._reset_current()
+
+    def _reset_current(self):
+        self._count = 0
+        self._x = math.nan
+        self._min = math.inf
+        self._max = -math.inf
+
+    def append(self, x, y):
+        if not self._count:
+            self._x = x
+        self._count += 1
+        # NaN fails both comparisons and is simply left out of the bucket
+        if y < self._min:
+            self._min = y
+        if y > self._max:
+            self._max = y
+        if self._count >= self.bucket_size:
+            self._push()
+
+    def _push(self):
+        if self.n == self.max_buckets:
+            half = self.n // 2
+            self.x[:half] = self.x[0:self.n:2]
+            self.mins[:half] = np.fmin(self.mins[0:self.n:2], self.mins[1:self.n:2])
+            self.maxs[:half] = np.fmax(self.maxs[0:self.n:2], self.maxs[1:self.n:2])
+            self.n = half
+            self.bucket_size *= 2
+
+        empty = self._min > self._max
+        self.x[self.n] = self._x
+        self.mins[self.n] = math.nan if empty else self._min
+        self.maxs[self.n] = math.nan if empty else self._max
+        self.n += 1
+        self._reset_current()
+
+    def points(self):
+        """(x, y) tracing min then max of every bucket, including the open one"""
+        x, mins, maxs = self.x[:self.n], self.mins[:self.n], self.maxs[:self.n]
+        if self._count and self._min <= self._max:
+            x = np.append(x, self._x)
+            mins = np.append(mins, self._min)
+            maxs = np.append(maxs, self._max)
+        return np.repeat(x, 2), np.column_stack((mins, maxs)).ravel()
+
+    def clear(self):
+        self.bucket_size = 1
+        self.n = 0
+        self._reset_current()
+
+
+class TelemetryHistory:
+    def __init__(self, capacity=DEFAULT_DEPTH, lod_keys=(), lod_buckets=DEFAULT_BUCKETS,
+                 extra_keys=()):
+        self.capacity = capacity
+        # 'sample' is the running packet index used as the graphs' x axis;
+        # extra_keys are float channels added to packets after parsing (derived.py)
+        self.keys = ['sample'] + [key for key, kind in FIELDS] + list(extra_keys)
+        self._converters = [_column_converter(key, kind) for key, kind in FIELDS]
+        self._extra_keys = list(extra_keys)
+        self._rows = {key: i for i, key in enumerate(self.keys)}
+        self._data = np.full((len(self.keys), 2 * capacity), math.nan)
+        self.head = 0
+        self.count = 0
+        self.total = 0
+
+        self.lod = {key: MinMaxDecimator(lod_buckets) for key in lod_keys}
+        self._lod_rows = [(self._rows[key], decimator) for key, decimator in self.lod.items()]
+
+    def __len__(self):
+        return self.count
+
+    def append(self, packet):
+        values = [self.total + 1]
+        values.extend(convert(packet[key]) for (key, kind), convert
+                      in zip(FIELDS, self._converters))
+        values.extend(packet.get(key, math.nan) for key in self._extra_keys)
+
+        head = self.head
+        self._data[:, head] = values
+        self._data[:, head + self.capacity] = values
+        for row, decimator in self._lod_rows:
+            decimator.append(values[0], values[row])
+
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def view(self, key, n=None):
+        """Read-only view of the latest n samples (all retained if None), oldest first"""
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity
+        view = self._data[self._rows[key], end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def window(self, keys, n=None):
+        return {key: self.view(key, n) for key in keys}
+
+    def flight_overview(self, keys):
+        """Decimated whole-flight points for LOD channels; 'sample' holds the x axis"""
+        columns = {}
+        for key in keys:
+            if key == 'sample':
+                continue
+            columns['sample'], columns[key] = self.lod[key].points()
+        return columns
+
+    def latest(self, key):
+        if not self.count:
+            return math.nan
+        return self._data[self._rows[key], self.head + self.capacity - 1]
+
+    def resize(self, capacity):
+        """Change the depth, keeping as many of the latest samples as fit"""
+        keep = min(self.count, capacity)
+        end = self.head + self.capacity
+        recent = self._data[:, end - keep:end].copy()
+
+        self.capacity = capacity
+        self._data = np.full((len(self.keys), 2 * capacity), math.nan)
+        self._data[:, :keep] = recent
+        self._data[:, capacity:capacity + keep] = recent
+        self.head = keep % capacity
+        self.count = keep
+
+    def clear(self):
+        self._data.fill(math.nan)
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        for decimator in self.lod.values():
+            decimator.clear()
@@ -0,0 +1,173 @@
+"""Merging redundant receivers into one telemetry stream.
+
+At launches a primary and a backup XBee receive the same downlink. Each
+link is read and parsed separately (see runtime.StationRuntime);
+PacketMerger drops the second copy of every packet (by team id and
+pkt_no), restores pkt_no order, and hands each packet on exactly once, so
+logging and the UI cost the same as with a single receiver.
+
+A packet that arrives ahead of a gap is held for up to `hold` seconds in
+case another link still delivers the missing one; after that the gap is
+given up on. With a single link nothing is ever held.
+
+Per link it reports its own packet loss (gaps in the pkt_no sequence it
+received), how many packets it delivered first, and how far its copies
+lagged behind the first copy from any link.
+"""
+
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+
+from telemetry import counter_restarted
+
+# Keys remembered for de-duplication; far more than any reorder window
+DEDUP_MEMORY = 4096
+
+
+class LinkStats:
+    def __init__(self, name, window=256):
+        self.name = name
+        self.packets = 0
+        self.first_copies = 0
+        self.duplicates = 0
+        self.first_pkt = None
+        self.last_pkt = None
+        self.lags = deque(maxlen=window)
+
+    def received(self, pkt_no):
+        self.packets += 1
+        if self.first_pkt is None or pkt_no < self.first_pkt:
+            self.first_pkt = pkt_no
+        if self.last_pkt is None or pkt_no > self.last_pkt:
+            self.last_pkt = pkt_no
+
+    def loss(self):
+        """Fraction of its own pkt_no span this link never received"""
+        if self.first_pkt is None:
+            return 0.0
+        expected = self.last_pkt - self.first_pkt + 1
+        return max(expected - self.packets, 0) / expected
+
+    def lag_ms(self):
+        """Median delay of this link's duplicate copies behind the first copy"""
+        if not self.lags:
+            return None
+        lags = sorted(self.lags)
+        return lags[len(lags) // 2] * 1000
+
+    def reset_sequence(self):
+        self.first_pkt = None
+        self.last_pkt = None
+        self.packets = 0
+
+
+class PacketMerger:
+    """De-duplicates and orders packets offered by several links.
+
+    emit(packet) is called with the lock held, on whichever thread offered
+    or flushed the packet, in pkt_no order. flush() must be called
+    periodically so held packets are released once their gap is given up.
+    """
+
+    def __init__(self, emit, hold=0.2):
+        self.emit = emit
+        self.hold = hold
+        self.links = {}
+        self.released = 0
+        self.gaps = 0
+        self.late = 0
+        self._seen = OrderedDict()
+        self._held = []
+        self._next = None
+        self._lock = threading.Lock()
+
+    def add_link(self, name):
+        self.links[name] = LinkStats(name)
+        return self.links[name]
+
+    def offer(self, link, packet, now=None):
+        if now is None:
+            now = time.monotonic()
+        pkt_no = packet['pkt_no']
+        key = (packet['id'], pkt_no)
+        with self._lock:
+            stats = self.links[link]
+            if counter_restarted(pkt_no, stats.last_pkt):
+                self._restart()
+            stats.received(pkt_no)
+
+            first_seen = self._seen.get(key)
+            if first_seen is not None:
+                stats.duplicates += 1
+                stats.lags.append(now - first_seen)
+                return
+            self._seen[key] = now
+            if len(self._seen) > DEDUP_MEMORY:
+                self._seen.popitem(last=False)
+            stats.first_copies += 1
+
+            if self._next is None or pkt_no == self._next:
+                self._release(packet)
+            elif pkt_no < self._next:
+                # Its gap was already given up on: deliver it anyway, out of order
+                self.late += 1
+                self.released += 1
+                self.emit(packet)
+            else:
+                wait = self.hold if len(self.links) > 1 else 0.0
+                heapq.heappush(self._held, (pkt_no, now + wait, id(packet), packet))
+            self._drain(now)
+
+    def flush(self, now=None):
+        """Give up on gaps whose hold time is over (call periodically)"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._drain(now)
+
+    def _release(self, packet):
+        self._next = packet['pkt_no'] + 1
+        self.released += 1
+        self.emit(packet)
+
+    def _drain(self, now):
+        held = self._held
+        while held:
+            pkt_no, deadline, _, packet = held[0]
+            if pkt_no < self._next:
+                # Duplicate pkt_no from another team id, or already passed
+                heapq.heappop(held)
+                self.released += 1
+                self.emit(packet)
+            elif pkt_no == self._next or deadline <= now:
+                if pkt_no > self._next:
+                    self.gaps += 1
+                heapq.heappop(held)
+                self._release(packet)
+            else:
+                break
+
+    def _restart(self):
+        # Release whatever was waiting and start the sequence over
+        while self._held:
+            packet = heapq.heappop(self._held)[3]
+            self.released += 1
+            self.emit(packet)
+        self._next = None
+        self._seen.clear()
+        for stats in self.links.values():
+            stats.reset_sequence()
+
+    def held(self):
+        return len(self._held)
+
+    def status_line(self):
+        parts = []
+        for name, stats in self.links.items():
+            lag = stats.lag_ms()
+            lag_text = f" LAG {lag:.0f}ms" if lag is not None else ""
+            parts.append(f"{name}: {stats.loss() * 100:.1f}% LOSS {stats.first_copies} FIRST{lag_text}")
+        parts.append(f"GAPS {self.gaps}")
+        return " | ".join(parts)
@@ -43,11 +43,12 @@ int xBee_command_handler(struct xBee_data *data, char* cmd)
         
         if(strstr(cmd, ",SIMP,") != NULL) {
 
+            int team_id;
             int pressure;
             int n = -1;
-            n = sscanf(cmd, "CMD,9999,SIMP,%d", &pressure);
+            n = sscanf(cmd, "CMD,%d,SIMP,%d", &team_id, &pressure);
 
-            if(n == 1)
+            if(n == 2)
             {
                 data->pressure = pressure;
                 return 0;
@@ -97,11 +98,11 @@ int xBee_command_handler(struct xBee_data *data, char* cmd)
 int xBee_send(struct xBee_data *data)
 {
     int ret = 0;
-    char response[200];
-    snprintf(response, sizeof(response), "%d, %d:%d:%d, %d, %s, %s, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %d, %d:%d:%d, %f, %f, %f, %d", data->id, data->hh, data->mm, data->ss,data->pkt_no,  data->mode, data->state, data->altitude, data->temperature, data->pressure, data->voltage, data->gyro_r, data->gyro_p, data->gyro_y, data->accel_r, data->accel_p, data->accel_y, data->mag_r, data->mag_p, data->mag_y, data->rotation_rate, data->gps_hh, data->gps_mm, data->gps_ss, data->gps_altitude, data->latitude, data->longitude, data->gps_stats);
+    char response[320];
+    snprintf(response, sizeof(response), "%d, %d:%d:%d, %d, %s, %s, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %d, %d:%d:%d, %f, %f, %f, %d\r\n", data->id, data->hh, data->mm, data->ss,data->pkt_no,  data->mode, data->state, data->altitude, data->temperature, data->pressure, data->voltage, data->gyro_r, data->gyro_p, data->gyro_y, data->accel_r, data->accel_p, data->accel_y, data->mag_r, data->mag_p, data->mag_y, data->rotation_rate, data->gps_hh, data->gps_mm, data->gps_ss, data->gps_altitude, data->latitude, data->longitude, data->gps_stats);
     ret = uart_write_bytes(1, response, strlen(response));
 
-    if(ret)
+    if(ret < 0)
     {
         printf("failed to send data\n");
         return ret;
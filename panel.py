@@ -0,0 +1,88 @@
+"""Change-only renderer for the live telemetry labels.
+
+Every label.config() is a round trip into Tcl. LabelPanel remembers the
+value and the text each label last showed: a field whose value is the same
+is not even formatted again, and one whose text comes out the same is not
+sent to Tk. Fields listed in FIELD_INTERVALS are refreshed at most that
+often (GPS only updates at 1 Hz anyway); a change held back by its interval
+is shown by the first render after it is due, which flush() provides when
+no new packets arrive.
+
+config_calls counts the Tcl calls actually made, so the saving can be
+measured (bench.py --only panel) and shown live.
+"""
+
+import time
+
+from telemetry import format_value
+
+# Seconds between refreshes of slow fields; everything else follows the frame rate
+FIELD_INTERVALS = {
+    'gps_time': 1.0,
+    'gps_altitude': 1.0,
+    'latitude': 1.0,
+    'longitude': 1.0,
+    'gps_stats': 1.0,
+}
+
+
+class LabelPanel:
+    def __init__(self, labels, intervals=FIELD_INTERVALS, clock=time.monotonic):
+        self.labels = labels
+        self.intervals = {key: intervals[key] for key in labels if key in intervals}
+        self.clock = clock
+        self._values = {}
+        self._texts = {}
+        self._due = {}
+        self.stale = set()
+        self.renders = 0
+        self.config_calls = 0
+        self.unchanged = 0
+        self.throttled = 0
+        self._last_time = clock()
+        self._last_calls = 0
+
+    def render(self, data):
+        """Bring the labels up to date with data; returns the Tcl calls made"""
+        now = self.clock()
+        values, texts, due, intervals = self._values, self._texts, self._due, self.intervals
+        calls = 0
+        for key, label in self.labels.items():
+            if key not in data:
+                continue
+            value = data[key]
+            if key in values and values[key] == value:
+                self.unchanged += 1
+                continue
+            if key in intervals:
+                if now < due.get(key, 0):
+                    self.throttled += 1
+                    self.stale.add(key)
+                    continue
+                due[key] = now + intervals[key]
+                self.stale.discard(key)
+            values[key] = value
+            text = format_value(key, value)
+            if texts.get(key) == text:
+                self.unchanged += 1
+                continue
+            texts[key] = text
+            label.config(text=text)
+            calls += 1
+        self.renders += 1
+        self.config_calls += calls
+        return calls
+
+    def flush(self, data):
+        """Show throttled changes that have come due without a new packet"""
+        if self.stale and self.clock() >= min(self._due[key] for key in self.stale):
+            return self.render(data)
+        return 0
+
+    def call_rate(self):
+        """Tcl config calls per second since the previous call"""
+        now = self.clock()
+        rate = (self.config_calls - self._last_calls) / max(now - self._last_time, 1e-6)
+        self._last_time = now
+        self._last_calls = self.config_calls
+        return rate
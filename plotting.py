@@ -0,0 +1,179 @@
+"""Persistent-artist graph grid for the ground station.
+
+Each panel owns one Line2D that is created once and updated with set_data.
+Frames are redrawn by restoring a cached background and blitting the lines;
+a full canvas draw only happens when data leaves the current axis limits or
+the canvas itself is redrawn (resize, first show). Event markers (vertical
+lines, labelled on the first panel) are painted into the cached background
+when they are added, so they cost neither a redraw nor anything per frame.
+"""
+
+import numpy as np
+from matplotlib.transforms import blended_transform_factory
+
+PANEL_FACE = '#0d1117'
+
+# (data key, title, line colour) in grid order
+GRAPH_PANELS = [
+    ('altitude', "ALTITUDE (m)", '#ff0055'),
+    ('voltage', "VOLTAGE (V)", '#ffff00'),
+    ('pressure', "PRESSURE (kPa)", '#00ffff'),
+    ('temperature', "TEMPERATURE (°C)", '#ff8800'),
+    ('gyro_r', "GYRO ROLL", '#ff00ff'),
+    ('gyro_p', "GYRO PITCH", '#00ff41'),
+    ('gyro_y', "GYRO YAW", '#00ffff'),
+    ('accel_r', "ACCEL ROLL", '#ff0055'),
+]
+
+# The same grid showing derived.py's channels
+DERIVED_PANELS = [
+    ('roll', "ROLL (°)", '#ff00ff'),
+    ('pitch', "PITCH (°)", '#00ff41'),
+    ('heading', "HEADING (°)", '#00ffff'),
+    ('vertical_speed', "VERTICAL SPEED (m/s)", '#ff8800'),
+    ('altitude', "ALTITUDE (m)", '#ff0055'),
+    ('pressure_altitude', "PRESSURE ALTITUDE (m)", '#ffff00'),
+    ('altitude_error', "ALT - PRESSURE ALT (m)", '#ff8800'),
+    ('gps_altitude_error', "ALT - GPS ALT (m)", '#00ffff'),
+]
+
+# Headroom added when limits have to move, so the next few packets still fit
+X_HEADROOM = 0.25
+Y_HEADROOM = 0.10
+# Rescale when the data only fills this fraction of the current y span
+Y_SHRINK = 0.25
+
+
+class GraphGrid:
+    def __init__(self, fig, canvas, panels=GRAPH_PANELS, rows=4, cols=2,
+                 title_color='#00ffff', tick_color='#00ff41'):
+        self.fig = fig
+        self.canvas = canvas
+        self.axes = {}
+        self.lines = {}
+        self.markers = []
+        self.background = None
+        self.force_rescale = True
+
+        # Counters so the cost of the render path can be observed
+        self.full_draws = 0
+        self.blits = 0
+
+        for i, (key, title, color) in enumerate(panels):
+            ax = fig.add_subplot(rows, cols, i + 1, facecolor=PANEL_FACE)
+            ax.set_title(title, color=title_color, fontsize=9, fontweight='bold', family='monospace')
+            ax.tick_params(colors=tick_color, labelsize=7)
+            ax.spines['bottom'].set_color(title_color)
+            ax.spines['left'].set_color(title_color)
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            ax.grid(True, alpha=0.2, color=title_color, linestyle=':')
+
+            # Animated artists are skipped by canvas.draw() and only painted by blit
+            line, = ax.plot([], [], color=color, linewidth=2, animated=True)
+            self.axes[key] = ax
+            self.lines[key] = line
+
+        fig.tight_layout()
+        self._draw_handler = self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def close(self):
+        """Stop listening to the canvas, before the figure is reused for another grid"""
+        self.canvas.mpl_disconnect(self._draw_handler)
+
+    def _on_draw(self, event):
+        # Any full draw (including resizes) invalidates the cached background
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for key, line in self.lines.items():
+            self.axes[key].draw_artist(line)
+
+    def mark(self, x, label, color='#ffffff'):
+        """Vertical marker at sample x on every panel, labelled on the first.
+
+        Markers are ordinary artists, painted once into the cached background
+        here and by full draws after that, so they cost nothing per frame.
+        """
+        artists = []
+        for ax in self.axes.values():
+            artists.append(ax.axvline(x, color=color, linewidth=1, linestyle='--', alpha=0.8))
+        ax = next(iter(self.axes.values()))
+        artists.append(ax.text(x, 0.97, f" {label}", color=color, fontsize=7, family='monospace',
+                               rotation=90, va='top', ha='left', clip_on=True,
+                               transform=blended_transform_factory(ax.transData, ax.transAxes)))
+        self.markers.extend(artists)
+        if self.background is not None:
+            self.canvas.restore_region(self.background)
+            for artist in artists:
+                artist.axes.draw_artist(artist)
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def clear_marks(self):
+        for artist in self.markers:
+            artist.remove()
+        self.markers = []
+        # The background still shows them
+        self.background = None
+
+    def reset_limits(self):
+        """Fit the axes to the next update from scratch (e.g. after switching views)"""
+        self.force_rescale = True
+
+    def update(self, x, columns):
+        """Push new data into the lines and repaint as cheaply as possible.
+
+        x is the shared sample axis, columns maps panel keys to y arrays of
+        the same length (views from TelemetryHistory work as-is).
+        """
+        if not len(x):
+            return
+
+        x_lo, x_hi = x[0], x[-1]
+        force = self.force_rescale
+        self.force_rescale = False
+        rescale = force or self.background is None
+        if force or self._x_needs_rescale(x_lo, x_hi):
+            self._set_x_limits(x_lo, x_hi)
+            rescale = True
+
+        for key, line in self.lines.items():
+            y = columns[key]
+            line.set_data(x, y)
+            if self._y_needs_rescale(key, y, force):
+                rescale = True
+
+        if rescale:
+            self.canvas.draw()
+            self.full_draws += 1
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_lines()
+            self.canvas.blit(self.fig.bbox)
+            self.blits += 1
+
+    def _x_needs_rescale(self, x_lo, x_hi):
+        lo, hi = next(iter(self.axes.values())).get_xlim()
+        return x_lo < lo or x_hi > hi
+
+    def _set_x_limits(self, x_lo, x_hi):
+        span = max(x_hi - x_lo, 1)
+        for ax in self.axes.values():
+            ax.set_xlim(x_lo, x_hi + span * X_HEADROOM)
+
+    def _y_needs_rescale(self, key, y, force=False):
+        ax = self.axes[key]
+        if np.isnan(y).all():
+            return False
+        y_min, y_max = float(np.nanmin(y)), float(np.nanmax(y))
+        pad = (y_max - y_min) * Y_HEADROOM or max(abs(y_max) * Y_HEADROOM, 0.5)
+        want_lo, want_hi = y_min - pad, y_max + pad
+
+        lo, hi = ax.get_ylim()
+        inside = lo <= y_min and y_max <= hi
+        if not force and inside and (hi - lo) * Y_SHRINK <= want_hi - want_lo:
+            return False
+
+        ax.set_ylim(want_lo, want_hi)
+        return True
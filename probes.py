@@ -0,0 +1,176 @@
+"""Hot-path timing probes.
+
+A probe is attached to a method of a live object (the serial framer, the
+parser entry point, the flight log sink, the display updates). While probes
+are enabled the method is shadowed by a timing wrapper on that instance;
+while disabled the wrapper is removed again, so a disabled probe costs
+nothing at all on the hot path.
+
+Each probe keeps its most recent samples in a ring, from which percentiles
+and a log-spaced histogram are computed on demand, plus lifetime totals.
+"""
+
+import json
+import time
+from collections import deque
+
+# Samples kept per probe for the rolling statistics
+DEFAULT_WINDOW = 2048
+# Upper bucket edges of the histogram in milliseconds; the last bucket is open
+HISTOGRAM_EDGES_MS = [0.01, 0.03, 0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000]
+
+
+class Probe:
+    def __init__(self, name, window=DEFAULT_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def window(self):
+        """Copy of the rolling samples, in seconds.
+
+        record() keeps appending from the runtime and logger threads; a
+        Python loop over the live deque would fail with "deque mutated
+        during iteration", while list() copies it in one step.
+        """
+        return list(self.samples)
+
+    def percentile(self, q):
+        """q-th percentile (0-100) of the rolling window, in seconds"""
+        samples = sorted(self.window())
+        if not samples:
+            return 0.0
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+    def histogram(self):
+        """Sample counts per HISTOGRAM_EDGES_MS bucket over the rolling window"""
+        counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for seconds in self.window():
+            ms = seconds * 1000
+            i = 0
+            while i < len(HISTOGRAM_EDGES_MS) and ms > HISTOGRAM_EDGES_MS[i]:
+                i += 1
+            counts[i] += 1
+        return counts
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+    def reset(self):
+        self.samples.clear()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class ProbeSet:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.probes = {}
+        self._attached = []
+
+    def probe(self, name):
+        if name not in self.probes:
+            self.probes[name] = Probe(name)
+        return self.probes[name]
+
+    def attach(self, name, obj, attr):
+        """Time every call of obj.attr under the probe called name.
+
+        A probe follows one object at a time: attaching it again (a new
+        serial reader, a new recording) releases the previous object.
+        """
+        self.probe(name)
+        for entry in [entry for entry in self._attached if entry[0] == name]:
+            self._unwrap(entry[1], entry[2])
+            self._attached.remove(entry)
+        self._attached.append((name, obj, attr))
+        if self.enabled:
+            self._wrap(name, obj, attr)
+
+    def _wrap(self, name, obj, attr):
+        func = getattr(obj, attr)
+        record = self.probes[name].record
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(clock() - start)
+
+        timed.probed = True
+        setattr(obj, attr, timed)
+
+    @staticmethod
+    def _unwrap(obj, attr):
+        if getattr(getattr(obj, attr, None), 'probed', False):
+            # Drops the instance attribute and uncovers the class's method again
+            delattr(obj, attr)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        for name, obj, attr in self._attached:
+            if enabled:
+                self._wrap(name, obj, attr)
+            else:
+                self._unwrap(obj, attr)
+
+    def reset(self):
+        for probe in self.probes.values():
+            probe.reset()
+
+    def report_lines(self):
+        lines = [f"{'PROBE':<10}{'COUNT':>9}{'MEAN':>9}{'P50':>9}{'P99':>9}{'MAX':>9}  ms"]
+        for name, probe in self.probes.items():
+            s = probe.summary()
+            lines.append(f"{name:<10}{s['count']:>9}{s['mean_ms']:>9.3f}{s['p50_ms']:>9.3f}"
+                         f"{s['p99_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        return lines
+
+    def histogram_lines(self, width=30):
+        labels = [f"<={edge:g}" for edge in HISTOGRAM_EDGES_MS] + [f">{HISTOGRAM_EDGES_MS[-1]:g}"]
+        lines = []
+        for name, probe in self.probes.items():
+            counts = probe.histogram()
+            if not any(counts):
+                continue
+            lines.append(f"{name} (last {len(probe.samples)} calls)")
+            peak = max(counts)
+            for label, count in zip(labels, counts):
+                if count:
+                    lines.append(f"  {label:>7} ms {'#' * max(1, count * width // peak):<{width}} {count}")
+        return lines
+
+    def dump(self, path):
+        """Write summaries, histograms and the raw rolling samples as JSON"""
+        report = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'histogram_edges_ms': HISTOGRAM_EDGES_MS,
+            'probes': {
+                name: dict(probe.summary(), histogram=probe.histogram(),
+                           samples_ms=[round(s * 1000, 4) for s in probe.window()])
+                for name, probe in self.probes.items()
+            },
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return path
@@ -0,0 +1,216 @@
+"""Graph rendering in a separate process.
+
+    python test.py --render-process
+
+matplotlib redraws hold the GIL for tens to hundreds of milliseconds, which
+the runtime's parse stage and the flight logger would otherwise wait out.
+In this mode the station process only copies each packet's graphed channels
+into a SharedRing (multiprocessing.shared_memory) and a worker process,
+started with the spawn method, draws them in a window of its own.
+
+The ring is one float64 row per channel plus a small int64 header. The
+writer publishes `writing` (the total it is about to reach) before it
+writes slots and `total` after, so the reader never locks: any row it
+copied whose slot the writer may have reached since (index < writing -
+capacity) is discarded. The header also carries the selected view, a
+generation counter bumped when the graphs start over (replay), and a stop
+flag.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+from history import DEFAULT_DEPTH
+
+# int64 header slots
+TOTAL, WRITING, VIEW, GENERATION, STOP = range(5)
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+
+VIEW_WINDOW = 0
+VIEW_FLIGHT = 1
+
+
+class SharedRing:
+    """Channels-by-capacity float64 ring in shared memory"""
+
+    def __init__(self, keys, capacity=DEFAULT_DEPTH, name=None):
+        self.keys = list(keys)
+        self.capacity = capacity
+        size = HEADER_BYTES + len(self.keys) * capacity * 8
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.header = self.shm.buf[:HEADER_BYTES].cast('q')
+        self.data = self.shm.buf[HEADER_BYTES:size].cast('d')
+        if self.owner:
+            for slot in range(HEADER_SLOTS):
+                self.header[slot] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def append(self, rows):
+        """Writer side: rows are sequences of values in key order"""
+        header, data, capacity = self.header, self.data, self.capacity
+        total = header[TOTAL]
+        header[WRITING] = total + len(rows)
+        for row in rows:
+            slot = total % capacity
+            for i, value in enumerate(row):
+                data[i * capacity + slot] = value
+            total += 1
+        header[TOTAL] = total
+
+    def reset(self):
+        header = self.header
+        header[WRITING] = 0
+        header[TOTAL] = 0
+        header[GENERATION] += 1
+
+    def set(self, slot, value):
+        self.header[slot] = value
+
+    def get(self, slot):
+        return self.header[slot]
+
+    def read(self, start, np):
+        """Reader side: (first index, array[channels, n]) of rows start..total.
+
+        Rows the writer may already have overwritten are left out, so the
+        first index can be later than start.
+        """
+        total = self.header[TOTAL]
+        start = max(start, total - self.capacity)
+        columns = np.frombuffer(self.shm.buf, dtype=np.float64, offset=HEADER_BYTES,
+                                count=len(self.keys) * self.capacity).reshape(len(self.keys), self.capacity)
+        slots = np.arange(start, total) % self.capacity
+        rows = columns[:, slots]
+        # The writer announces how far it is going before touching any slot
+        safe = self.header[WRITING] - self.capacity
+        if safe > start:
+            rows = rows[:, safe - start:]
+            start = safe
+        return start, rows
+
+    def close(self):
+        self.header.release()
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RenderProcess:
+    """Station side: owns the ring and the worker process"""
+
+    def __init__(self, keys, capacity=DEFAULT_DEPTH, fps=20, window=100, title="CANSAT GRAPHS"):
+        self.keys = list(keys)
+        self.ring = SharedRing(self.keys, capacity)
+        context = multiprocessing.get_context('spawn')
+        self.process = context.Process(target=worker_main, name="render-process", daemon=True,
+                                       args=(self.ring.name, self.keys, capacity, fps, window, title))
+        self.sample = 0
+
+    def start(self):
+        self.process.start()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def append(self, packets):
+        rows = []
+        for data in packets:
+            self.sample += 1
+            rows.append([self.sample] + [float(data[key]) for key in self.keys[1:]])
+        self.ring.append(rows)
+
+    def set_view(self, full_flight):
+        self.ring.set(VIEW, VIEW_FLIGHT if full_flight else VIEW_WINDOW)
+
+    def reset(self):
+        self.sample = 0
+        self.ring.reset()
+
+    def stop(self, timeout=2):
+        self.ring.set(STOP, 1)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+
+
+def worker_main(shm_name, keys, capacity, fps, window, title):
+    """Render process entry point: a Tk window with the graph grid"""
+    import tkinter as tk
+
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import numpy as np
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+
+    from history import MinMaxDecimator
+    from plotting import GraphGrid
+
+    ring = SharedRing(keys, capacity, name=shm_name)
+    parent = multiprocessing.parent_process()
+
+    root = tk.Tk()
+    root.title(title)
+    root.configure(bg='#0d1117')
+    fig = Figure(figsize=(12, 9), dpi=90, facecolor='#0d1117')
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    graphs = GraphGrid(fig, canvas)
+    canvas.draw()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    period = max(int(1000 / fps), 1)
+    lod = {key: MinMaxDecimator() for key in keys[1:]}
+    state = {'seen': 0, 'generation': ring.get(GENERATION), 'view': VIEW_WINDOW}
+
+    def frame():
+        if ring.get(STOP) or (parent is not None and not parent.is_alive()):
+            root.destroy()
+            return
+        changed = False
+        generation = ring.get(GENERATION)
+        if generation != state['generation']:
+            state.update(seen=0, generation=generation)
+            for decimator in lod.values():
+                decimator.clear()
+            graphs.reset_limits()
+        view = ring.get(VIEW)
+        if view != state['view']:
+            state['view'] = view
+            graphs.reset_limits()
+            changed = True
+
+        # Everything new goes into the whole-flight summary, the last
+        # `window` rows into the live view
+        start, rows = ring.read(state['seen'], np)
+        if rows.shape[1]:
+            state['seen'] = start + rows.shape[1]
+            for i, key in enumerate(keys[1:], 1):
+                decimator = lod[key]
+                for x, y in zip(rows[0], rows[i]):
+                    decimator.append(x, y)
+            changed = True
+
+        if changed and state['seen']:
+            if view == VIEW_FLIGHT:
+                columns = {}
+                for key, decimator in lod.items():
+                    columns['sample'], columns[key] = decimator.points()
+            else:
+                recent_start, recent = ring.read(max(state['seen'] - window, 0), np)
+                columns = {key: recent[i] for i, key in enumerate(keys)}
+            graphs.update(columns['sample'], columns)
+        root.after(period, frame)
+
+    root.protocol("WM_DELETE_WINDOW", root.destroy)
+    root.after(period, frame)
+    try:
+        root.mainloop()
+    finally:
+        ring.close()
@@ -0,0 +1,155 @@
+"""Flight replay.
+
+Streams a recorded flight (CanSat_Flight_*.csv or .cfr) into the station
+runtime through on_lines (StationRuntime.submit_lines), with every packet
+rendered as the firmware prints it, so the parser, logger and graphs run
+exactly as they do on a live link. Packets are paced by their recorded
+receive times at 1x, Nx, or with speed=None as fast as the consumer can take
+them, which is how the ground station's maximum sustained packet rate is
+measured.
+"""
+
+import csv
+import os
+import threading
+import time
+from datetime import datetime
+
+from flight_log import CSV_FIELDS, CSV_HEADER, read_records
+from serial_link import ThroughputMeter
+from telemetry import format_line
+
+REPLAY_SPEEDS = ["1x", "2x", "5x", "10x", "50x", "MAX"]
+
+# Lines handed over per call when running flat out, about one serial read's worth
+MAX_BATCH = 64
+# Longest sleep between checks for stop() and speed changes
+MAX_SLEEP = 0.1
+
+
+def parse_speed(text):
+    """'10x' -> 10.0, 'MAX' -> None (no pacing)"""
+    text = str(text).strip().lower()
+    if text == 'max':
+        return None
+    speed = float(text.rstrip('x'))
+    if speed <= 0:
+        raise ValueError("replay speed must be positive")
+    return speed
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        if next(reader, None) != CSV_HEADER:
+            raise ValueError("not a CanSat flight CSV")
+        for row in reader:
+            if len(row) != len(CSV_HEADER):
+                continue
+            try:
+                recv_time = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S.%f").timestamp()
+                line = format_line(dict(zip(CSV_FIELDS, row[1:])))
+            except ValueError:
+                continue
+            yield recv_time, line
+
+
+def load_flight(path):
+    """Return [(receive_time, line)] for a recorded flight, oldest first"""
+    if os.path.splitext(path)[1].lower() == '.cfr':
+        return [(recv_time, format_line(data)) for recv_time, data in read_records(path)]
+    return list(_read_csv(path))
+
+
+class ReplaySource:
+    """Background thread that plays recorded lines into on_lines.
+
+    Stands in for a runtime.SerialSource, with the same meter; on_lines is
+    called from the replay thread with lists of lines. on_finished, if given, is
+    called from that thread once the last line has been delivered.
+    """
+
+    def __init__(self, records, on_lines, speed=1.0, on_finished=None, name="replay"):
+        self.records = records
+        self.on_lines = on_lines
+        self.on_finished = on_finished
+        self.name = name
+        self.meter = ThroughputMeter()
+        self.position = 0
+        self.finished = False
+        self.started_at = None
+        self.finished_at = None
+        self.running = False
+        self.thread = None
+        self._wake = threading.Event()
+        self.set_speed(speed)
+
+    def __len__(self):
+        return len(self.records)
+
+    def set_speed(self, speed):
+        """Change speed mid-replay; pacing continues from the current packet"""
+        self.speed = speed
+        self._anchor = None
+        self._wake.set()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def run(self):
+        records = self.records
+        self.started_at = time.perf_counter()
+        while self.running and self.position < len(records):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            self.position += len(batch)
+            # Account for the CRLF the serial link would have carried
+            self.meter.add(sum(len(line) + 2 for line in batch), len(batch))
+            self.on_lines(batch)
+
+        if self.position >= len(records):
+            self.finished = True
+            self.finished_at = time.perf_counter()
+            if self.on_finished:
+                self.on_finished()
+
+    def _next_batch(self):
+        records, start = self.records, self.position
+        speed = self.speed
+        if speed is None:
+            return [line for recv_time, line in records[start:start + MAX_BATCH]]
+
+        # Deadlines are measured from one anchor rather than packet to packet,
+        # so sleep overshoot never accumulates into drift
+        now = time.perf_counter()
+        if self._anchor is None:
+            self._anchor = (now, records[start][0])
+        anchor_now, anchor_time = self._anchor
+        due = anchor_time + (now - anchor_now) * speed
+
+        end = start
+        while end < len(records) and records[end][0] <= due:
+            end += 1
+        if end == start:
+            wait = (records[start][0] - due) / speed
+            self._wake.clear()
+            self._wake.wait(min(wait, MAX_SLEEP))
+            return []
+        return [line for recv_time, line in records[start:end]]
+
+    def packet_rate(self):
+        """Average packets/s delivered since start"""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return self.position / max(end - self.started_at, 1e-6)
@@ -0,0 +1,368 @@
+"""asyncio ingest core.
+
+One event loop, on its own thread next to Tk's mainloop, runs every stage of
+a live session as a task:
+
+    sources (serial ports)  ->  parse / merge / stages  ->  sinks (analytics, log, uplink, UI)
+
+Every sink has its own bounded queue of packet batches. A sink that must
+see every packet makes the producers wait while its queue is full, so a
+slow sink handler slows reading and the serial driver's buffer takes up the
+burst instead of memory growing. A lossy sink (one that only needs recent
+state) drops its oldest batch instead. The flight log sink only hands rows
+to FlightLogger's own bounded queue, which never blocks: if storage stalls
+long enough to fill that queue the logger drops rows and counts them
+(rows_dropped, shown in the GUI and the headless stats line), so the
+backpressure stops at the logger. Periodic work (merger
+flushes, the command uplink) runs on the same loop, so adding a source or a
+sink is an add_source/add_sink call rather than another thread and lock.
+Stages (add_stage) see every packet in order before any sink does, so what
+they add to a packet (derived quantities) reaches all the sinks. A stage or
+sink that raises is counted and skipped for that packet, never fatal.
+
+pyserial only offers blocking reads, so each port is read on one executor
+thread of its own; parsing, merging and fan-out all happen on the loop
+thread. A NetworkSource (another station's fan-out feed) reads its socket
+on the loop itself. Sources that keep their own thread (a flight replay)
+hand lines in with submit_lines, which blocks while the pipeline is backed up
+and returns once the runtime stops.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from links import PacketMerger
+from serial_link import LineFramer, ThroughputMeter
+
+# Batches queued per sink before backpressure (or dropping) sets in
+DEFAULT_DEPTH = 256
+# Seconds stop() lets the sinks drain what is already queued
+DRAIN_TIMEOUT = 2.0
+# Seconds between checks that the runtime is still up while submit_lines waits
+SUBMIT_POLL = 0.1
+
+
+class Sink:
+    """One consumer stage: handle(packet) is called on the loop thread"""
+
+    def __init__(self, name, handle, maxsize=DEFAULT_DEPTH, lossy=False):
+        self.name = name
+        self.handle = handle
+        self.maxsize = maxsize
+        self.lossy = lossy
+        self.queue = None
+        self.delivered = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.errors = 0
+
+    async def put(self, batch):
+        queue = self.queue
+        if self.lossy and queue.full():
+            self.dropped += len(queue.get_nowait())
+            queue.task_done()
+        await queue.put(batch)
+        depth = queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+
+    async def run(self):
+        queue, handle = self.queue, self.handle
+        while True:
+            batch = await queue.get()
+            for packet in batch:
+                try:
+                    handle(packet)
+                except Exception as e:
+                    # One bad packet or a failing consumer must not stop the stage
+                    self.errors += 1
+                    print(f"{self.name} sink error: {e}")
+            self.delivered += len(batch)
+            queue.task_done()
+
+
+class Stage:
+    """A per-packet step ahead of the sinks: func(packet) on the loop thread"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.errors = 0
+
+    def apply(self, packets):
+        func = self.func
+        for packet in packets:
+            try:
+                func(packet)
+            except Exception as e:
+                # Like a sink: one bad packet must not end the source feeding it
+                self.errors += 1
+                print(f"{self.name} stage error: {e}")
+
+
+class SerialSource:
+    """Reads one pyserial port on its own executor thread and frames lines"""
+
+    def __init__(self, port, link="PRI"):
+        self.port = port
+        self.link = link
+        self.framer = LineFramer()
+        self.meter = ThroughputMeter()
+
+    def _read(self):
+        # Blocks for up to the port timeout when idle, otherwise takes
+        # everything already buffered by the driver in one call
+        return self.port.read(self.port.in_waiting or 1)
+
+    async def run(self, runtime):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(1, thread_name_prefix=f"serial-{self.link}")
+        try:
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(executor, self._read)
+                except (serial.SerialException, OSError) as e:
+                    print(f"Read error on {self.link}: {e}")
+                    await asyncio.sleep(0.1)
+                    continue
+                if not chunk:
+                    continue
+                lines = self.framer.feed(chunk)
+                self.meter.add(len(chunk), len(lines))
+                if lines:
+                    await runtime.ingest(self.link, lines)
+        finally:
+            executor.shutdown(wait=False)
+
+
+class NetworkSource:
+    """Subscribes to another station's fan-out server (fanout.py) and frames
+    its lines like a serial port's; reconnects whenever the feed drops"""
+
+    def __init__(self, host, port, link="PRI", retry=2.0):
+        self.host = host
+        self.port = port
+        self.link = link
+        self.retry = retry
+        self.framer = LineFramer()
+        self.meter = ThroughputMeter()
+        self.connected = False
+
+    async def run(self, runtime):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                print(f"Connect to {self.host}:{self.port} failed: {e}")
+                await asyncio.sleep(self.retry)
+                continue
+            self.connected = True
+            try:
+                while True:
+                    chunk = await reader.read(65536)
+                    if not chunk:
+                        break
+                    lines = self.framer.feed(chunk)
+                    self.meter.add(len(chunk), len(lines))
+                    if lines:
+                        await runtime.ingest(self.link, lines)
+            except (ConnectionError, OSError) as e:
+                print(f"Feed from {self.host}:{self.port} lost: {e}")
+            finally:
+                self.connected = False
+                writer.close()
+                # A line cut off by the disconnect must not prefix the next feed
+                self.framer.reset()
+            await asyncio.sleep(self.retry)
+
+
+class StationRuntime:
+    """Event loop thread running the sources, parse stage and sinks.
+
+    parsers maps link name -> TelemetryParser. With more than one link the
+    packets go through a PacketMerger, so each reaches the sinks once.
+    on_reject(line) is called on the loop thread for lines that fail to parse.
+    """
+
+    def __init__(self, parsers, on_reject=None, hold=0.2, name="station-runtime"):
+        self.parsers = parsers
+        self.on_reject = on_reject
+        self.name = name
+        self.sources = []
+        self.sinks = []
+        self.stages = []
+        self.tasks = []
+        self.merger = None
+        self._submits = set()
+        self._released = []
+        if len(parsers) > 1:
+            self.merger = PacketMerger(self._released.append, hold)
+            for link in parsers:
+                self.merger.add_link(link)
+            self.every(max(hold / 4, 0.01), self._flush)
+        self.loop = None
+        self.thread = None
+        self._stopping = None
+        self._ready = threading.Event()
+
+    def add_source(self, source):
+        self.sources.append(source)
+        return source
+
+    def add_sink(self, name, handle, maxsize=DEFAULT_DEPTH, lossy=False):
+        sink = Sink(name, handle, maxsize, lossy)
+        self.sinks.append(sink)
+        return sink
+
+    def add_stage(self, name, func):
+        """Run func(packet) on every packet, in pkt_no order, ahead of the sinks"""
+        stage = Stage(name, func)
+        self.stages.append(stage)
+        return stage
+
+    def add_task(self, coroutine_function):
+        """Run coroutine_function() on the loop for the life of the runtime"""
+        self.tasks.append(coroutine_function)
+
+    def every(self, interval, func):
+        async def periodic():
+            while True:
+                await asyncio.sleep(interval)
+                await func() if asyncio.iscoroutinefunction(func) else func()
+        self.tasks.append(periodic)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=DRAIN_TIMEOUT + 1):
+        if self.loop and self.thread and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._stopping.set)
+            self.thread.join(timeout=timeout)
+        self.thread = None
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        self._stopping = asyncio.Event()
+        for sink in self.sinks:
+            sink.queue = asyncio.Queue(sink.maxsize)
+        sink_tasks = [asyncio.create_task(sink.run()) for sink in self.sinks]
+        producers = [asyncio.create_task(source.run(self)) for source in self.sources]
+        producers += [asyncio.create_task(task()) for task in self.tasks]
+        self._ready.set()
+
+        await self._stopping.wait()
+        # Lines still waiting on a full sink are dropped, releasing their threads
+        stopped = producers + list(self._submits)
+        for task in stopped:
+            task.cancel()
+        await asyncio.gather(*stopped, return_exceptions=True)
+        if self.merger:
+            self.merger.flush(float('inf'))
+            await self._dispatch(self._take_released())
+        # Let the sinks finish what was already accepted, then shut them down
+        try:
+            await asyncio.wait_for(asyncio.gather(*(sink.queue.join() for sink in self.sinks)),
+                                   DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("Runtime stopped with packets still queued")
+        for task in sink_tasks:
+            task.cancel()
+        await asyncio.gather(*sink_tasks, return_exceptions=True)
+
+    def parse_lines(self, link, lines):
+        """Parse a batch from one link; returns the packets ready for the sinks"""
+        parse = self.parsers[link].parse
+        reject = self.on_reject
+        merger = self.merger
+        packets = []
+        for line in lines:
+            data = parse(line)
+            if data is None:
+                if reject:
+                    reject(line)
+            elif merger:
+                merger.offer(link, data)
+            else:
+                packets.append(data)
+        return self._take_released() if merger else packets
+
+    async def ingest(self, link, lines):
+        await self._dispatch(self.parse_lines(link, lines))
+
+    async def _dispatch(self, packets):
+        if packets:
+            for stage in self.stages:
+                stage.apply(packets)
+            for sink in self.sinks:
+                await sink.put(packets)
+
+    def _take_released(self):
+        released = self._released[:]
+        del self._released[:]
+        return released
+
+    async def _flush(self):
+        self.merger.flush()
+        await self._dispatch(self._take_released())
+
+    async def _submitted(self, link, lines):
+        if self._stopping.is_set():
+            # Its source was told to stop along with the others
+            return
+        task = asyncio.current_task()
+        self._submits.add(task)
+        try:
+            await self.ingest(link, lines)
+        finally:
+            self._submits.discard(task)
+
+    def submit_lines(self, link, lines):
+        """Feed lines from another thread; blocks while the sinks are backed up.
+
+        Returns without waiting further once the runtime stops, whether or
+        not the lines got through.
+        """
+        thread = self.thread
+        if thread is None:
+            # Stopped: a source thread still winding down has nowhere to go
+            return
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._submitted(link, lines), self.loop)
+        except RuntimeError:
+            # The loop closed after the check above
+            return
+        while True:
+            try:
+                future.result(timeout=SUBMIT_POLL)
+                return
+            except concurrent.futures.CancelledError:
+                return
+            except concurrent.futures.TimeoutError:
+                # Submitted as the loop was finishing: nothing will run it now
+                if not thread.is_alive():
+                    return
+
+    def status_line(self):
+        parts = []
+        for sink in self.sinks:
+            text = f"{sink.name} {sink.queue.qsize() if sink.queue else 0}/{sink.maxsize}"
+            if sink.dropped:
+                text += f" -{sink.dropped}"
+            parts.append(text)
+        line = "QUEUES: " + " | ".join(parts)
+        errors = [f"{stage.name} {stage.errors}" for stage in self.stages if stage.errors]
+        if errors:
+            line += " | STAGE ERRORS: " + ", ".join(errors)
+        return line
@@ -0,0 +1,73 @@
+"""Serial downlink framing and throughput.
+
+The port is read by runtime.SerialSource, which blocks in read() instead of
+polling in_waiting and pulls everything the driver has buffered in one
+call. LineFramer splits newline frames itself so the downstream parser
+receives batches of complete lines.
+"""
+
+import time
+
+
+class LineFramer:
+    """Accumulates raw bytes and yields complete newline-terminated lines"""
+
+    def __init__(self, max_line=1024):
+        self.buffer = bytearray()
+        self.max_line = max_line
+        self.overflows = 0
+
+    def feed(self, chunk):
+        buf = self.buffer
+        buf += chunk
+
+        end = buf.rfind(b'\n')
+        if end < 0:
+            # No terminator in sight: drop runaway garbage rather than grow forever
+            if len(buf) > self.max_line:
+                self.overflows += 1
+                del buf[:]
+            return []
+
+        text = buf[:end].decode('utf-8', errors='ignore')
+        # In-place delete keeps the bytearray's allocation for the next read
+        del buf[:end + 1]
+        return [line for line in map(str.strip, text.split('\n')) if line]
+
+    def reset(self):
+        del self.buffer[:]
+
+
+class ThroughputMeter:
+    """Byte and line counters with rates measured between samples"""
+
+    def __init__(self):
+        self.bytes_total = 0
+        self.lines_total = 0
+        self._last_time = time.monotonic()
+        self._last_bytes = 0
+        self._last_lines = 0
+
+    def add(self, nbytes, nlines):
+        self.bytes_total += nbytes
+        self.lines_total += nlines
+
+    def sample(self):
+        """Return (bytes/s, lines/s) since the previous sample"""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-6)
+        bytes_total, lines_total = self.bytes_total, self.lines_total
+
+        byte_rate = (bytes_total - self._last_bytes) / elapsed
+        line_rate = (lines_total - self._last_lines) / elapsed
+
+        self._last_time = now
+        self._last_bytes = bytes_total
+        self._last_lines = lines_total
+        return byte_rate, line_rate
+
+
+def link_utilisation(byte_rate, baud):
+    # 8N1 framing: 10 bits on the wire per byte
+    return byte_rate * 10 / baud if baud else 0.0
+
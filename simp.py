@@ -0,0 +1,146 @@
+"""SIMP pressure-profile streaming.
+
+In simulation mode the firmware takes its pressure (and so its altitude
+and flight state) from CMD,<id>,SIMP,<pascals> commands, one per reading.
+SimpStreamer feeds a whole profile through the command uplink at a fixed
+rate from its own thread.
+
+Profiles can be
+    - a recorded flight, CanSat_Flight_*.csv or .cfr (Pressure_kPa column)
+    - a plain text/CSV file with one pressure per line, optionally as a
+      full "CMD,<id>,SIMP,<value>" line; '#' starts a comment
+Values that look like kPa (every value below MAX_KPA) are converted to Pa.
+"""
+
+import csv
+import os
+import threading
+import time
+
+from flight_log import CSV_HEADER, read_records
+from telemetry import DEFAULT_TEAM_ID
+
+# No sea-level pressure is this low in Pa, and none this high in kPa
+MAX_KPA = 200.0
+
+
+def _to_pascals(values):
+    if values and max(values) < MAX_KPA:
+        return [round(v * 1000) for v in values]
+    return [round(v) for v in values]
+
+
+def load_pressure_profile(path):
+    """Return the profile in path as a list of integer pascals"""
+    if os.path.splitext(path)[1].lower() == '.cfr':
+        return _to_pascals([data['pressure'] for recv_time, data in read_records(path)])
+
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    if rows and rows[0] == CSV_HEADER:
+        column = CSV_HEADER.index("Pressure_kPa")
+        values = []
+        for row in rows[1:]:
+            try:
+                values.append(float(row[column]))
+            except (IndexError, ValueError):
+                continue
+        return _to_pascals(values)
+
+    values = []
+    for row in rows:
+        fields = [field.strip() for field in row]
+        if not fields or not fields[0] or fields[0].startswith('#'):
+            continue
+        try:
+            values.append(float(fields[-1]))
+        except ValueError:
+            # Header line or anything else that isn't a reading
+            continue
+    return _to_pascals(values)
+
+
+class SimpStreamer:
+    """Sends one SIMP command per period from a background thread.
+
+    Deadlines are start + i / rate, so late wake-ups are caught up on the
+    next tick instead of stretching the whole profile. Commands are queued
+    on the uplink unconfirmed and without holding other commands back.
+    """
+
+    def __init__(self, uplink, pressures, rate=1.0, team_id=DEFAULT_TEAM_ID,
+                 on_finished=None, name="simp-streamer"):
+        self.uplink = uplink
+        self.pressures = pressures
+        self.rate = rate
+        self.team_id = team_id
+        self.on_finished = on_finished
+        self.name = name
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.started_at = None
+        self.stopped_at = None
+        self.running = False
+        self.thread = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self.pressures)
+
+    @property
+    def finished(self):
+        return self.queued >= len(self.pressures)
+
+    def start(self):
+        self.running = True
+        self._stop.clear()
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        period = 1.0 / self.rate
+        while self.running and not self.finished:
+            deadline = self.started_at + self.queued * period
+            wait = deadline - time.perf_counter()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            pressure = self.pressures[self.queued]
+            self.uplink.send(f"CMD,{self.team_id},SIMP,{pressure}", wait=False,
+                             confirm=False, on_done=self._written)
+            self.queued += 1
+
+        self.running = False
+        self.stopped_at = time.perf_counter()
+        if self.finished and self.on_finished:
+            self.on_finished()
+
+    def _written(self, command):
+        if command.error:
+            self.failed += 1
+        else:
+            self.written += 1
+
+    def achieved_rate(self):
+        """Commands actually written per second since start"""
+        if self.started_at is None:
+            return 0.0
+        end = self.stopped_at if self.stopped_at is not None else time.perf_counter()
+        return self.written / max(end - self.started_at, 1e-6)
+
+    def backlog(self):
+        """Commands due but not yet written: queued on the uplink or behind schedule"""
+        if self.started_at is None:
+            return 0
+        if not self.running:
+            return max(self.queued - self.written - self.failed, 0)
+        due = min(int((time.perf_counter() - self.started_at) * self.rate) + 1, len(self.pressures))
+        return max(due - self.written - self.failed, 0)
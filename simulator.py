@@ -0,0 +1,446 @@
+"""Firmware stand-in for load testing without hardware.
+
+    python simulator.py --rate 1000 --corrupt 0.01 --split 0.05 --burst-every 5
+
+opens a pseudo-terminal pair and prints the slave device (/dev/pts/N), which
+the ground station connects to like an XBee receiver. The simulator emits
+packets in exactly the xBee_send format of main/xBee.c, follows a synthetic
+ascent/descent/landing profile, and handles uplink commands the way
+xBee_command_handler does:
+
+    CMD,<id>,CX,ON|OFF                        telemetry on/off
+    CMD,<id>,SIM,ENABLE|ACTIVATE|DISABLE      simulation mode state machine
+    CMD,<id>,SIMP,<pascals>                   simulated pressure (SIM active),
+                                              reported in Pa as given, not kPa
+    CMD,<id>,ST,<hh:mm:ss>|GPS                set the mission clock
+
+Faults can be injected per line (corrupted bytes, lines split across two
+writes, truncated lines) and as bursts (output held back, then released at
+once, like a radio buffering through a fade).
+
+In-process users (benchmarks) can skip the pty and wire a FirmwareSimulator
+to a SimulatedPort, which runtime.SerialSource reads like a pyserial port.
+"""
+
+import argparse
+import os
+import random
+import select
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from serial_link import LineFramer
+from telemetry import DEFAULT_TEAM_ID, format_line
+
+# What xBee_command_handler's sscanf("CMD,%d,SIMP,%d") matches: %d skips
+# leading blanks, the literal text must match exactly
+SIMP_COMMAND = re.compile(r'CMD,\s*[-+]?\d+,SIMP,\s*([-+]?\d+)')
+
+# Synthetic flight profile
+APOGEE = 750.0          # m
+ASCENT_RATE = 15.0      # m/s
+DESCENT_RATE = 6.0      # m/s
+PAD_TIME = 5.0          # s on the pad before launch
+GROUND_PRESSURE = 101.325   # kPa
+
+# Longest sleep of the emit loop; bounds the pacing granularity
+TICK = 0.001
+
+
+def pressure_at(altitude):
+    """Standard atmosphere pressure (kPa) at an altitude (m)"""
+    return GROUND_PRESSURE * (1 - 2.25577e-5 * altitude) ** 5.25588
+
+
+def altitude_at(pressure):
+    """Inverse of pressure_at: altitude (m) for a pressure (kPa)"""
+    return 44330.0 * (1 - (pressure / GROUND_PRESSURE) ** (1 / 5.25588))
+
+
+class FirmwareModel:
+    """Packet state of the CanSat, advanced in simulated seconds.
+
+    Mirrors struct xBee_data and the mode/state transitions of the flight
+    tasks and xBee_command_handler, with sensor readings synthesised from
+    a simple flight profile plus noise.
+    """
+
+    def __init__(self, team_id=DEFAULT_TEAM_ID, seed=None):
+        self.team_id = team_id
+        self.rng = random.Random(seed)
+        self.elapsed = 0.0
+        self.clock_offset = 0.0
+        self.pkt_no = 0
+        self.telemetry_on = True
+        self.simulation_enable = False
+        self.simulation_activate = False
+        self.simp_pressure = None
+        self.commands = Counter()
+        self.state = 'ASCEND'
+        self.altitude = 0.0
+        self.max_altitude = 0.0
+
+    @property
+    def mode(self):
+        return 'SIMULATION' if self.simulation_enable else 'FLIGHT'
+
+    def advance(self, dt):
+        self.elapsed += dt
+        if self.simulation_activate and self.simp_pressure is not None:
+            self.altitude = altitude_at(self.simp_pressure / 1000.0)
+        else:
+            self.altitude = self._profile_altitude(self.elapsed)
+
+        self.max_altitude = max(self.max_altitude, self.altitude)
+        if self.state == 'ASCEND' and self.altitude < self.max_altitude - 1:
+            self.state = 'DESCEND'
+        elif self.state == 'DESCEND' and self.altitude <= 0.5:
+            self.state = 'LANDED'
+
+    def _profile_altitude(self, t):
+        t -= PAD_TIME
+        if t <= 0:
+            return 0.0
+        climb = APOGEE / ASCENT_RATE
+        if t <= climb:
+            return t * ASCENT_RATE
+        return max(APOGEE - (t - climb) * DESCENT_RATE, 0.0)
+
+    def packet(self):
+        rng = self.rng
+        noise = rng.gauss
+        altitude = self.altitude + noise(0, 0.3)
+        if self.simulation_activate and self.simp_pressure is not None:
+            pressure = self.simp_pressure
+        else:
+            pressure = pressure_at(altitude)
+        clock = int(self.elapsed + self.clock_offset) % 86400
+        spin = 0.0 if self.state == 'LANDED' else 40.0
+        return {
+            'id': self.team_id,
+            'mission_time': f"{clock // 3600}:{clock // 60 % 60}:{clock % 60}",
+            'pkt_no': self.pkt_no,
+            'mode': self.mode,
+            'state': self.state,
+            'altitude': altitude,
+            'temperature': 25.0 - 0.0065 * altitude + noise(0, 0.05),
+            'pressure': pressure,
+            'voltage': 4.1 - 0.0002 * self.elapsed + noise(0, 0.01),
+            'gyro_r': noise(0, 2.0), 'gyro_p': noise(0, 2.0), 'gyro_y': spin + noise(0, 2.0),
+            'accel_r': noise(0, 0.1), 'accel_p': noise(0, 0.1), 'accel_y': 9.81 + noise(0, 0.1),
+            'mag_r': 30 + noise(0, 0.5), 'mag_p': -5 + noise(0, 0.5), 'mag_y': 40 + noise(0, 0.5),
+            'rotation_rate': int(spin * 60 / 360),
+            'gps_time': f"{clock // 3600}:{clock // 60 % 60}:{clock % 60}",
+            'gps_altitude': altitude + noise(0, 2.0),
+            'latitude': 23.777176 + self.elapsed * 1e-6,
+            'longitude': 90.399452 + self.elapsed * 2e-6,
+            'gps_stats': 7,
+        }
+
+    def next_line(self):
+        """The next downlink line, CRLF included, or None while CX is off"""
+        if not self.telemetry_on:
+            return None
+        line = format_line(self.packet()) + '\r\n'
+        self.pkt_no += 1
+        return line.encode()
+
+    def handle_command(self, cmd):
+        """Apply one uplink command; returns False if it was not understood"""
+        parts = [part.strip() for part in cmd.split(',')]
+        if len(parts) < 3 or parts[0] != 'CMD':
+            self.commands['invalid'] += 1
+            return False
+        kind, args = parts[2], parts[3:]
+        self.commands[kind] += 1
+        arg = args[0] if args else ''
+
+        if kind == 'CX':
+            self.telemetry_on = arg == 'ON'
+        elif kind == 'SIM':
+            # Same ENABLE -> ACTIVATE -> DISABLE ordering as the firmware
+            if arg == 'ENABLE' and not self.simulation_activate:
+                self.simulation_enable = True
+            elif arg == 'ACTIVATE' and self.simulation_enable:
+                self.simulation_activate = True
+            elif arg == 'DISABLE' and not self.simulation_activate:
+                self.simulation_enable = False
+            elif arg == 'DEACTIVATE':
+                self.simulation_activate = False
+            else:
+                return False
+        elif kind == 'SIMP':
+            # Only what the firmware's sscanf matches is applied, and like
+            # the firmware the pascals go into the packet unconverted
+            match = SIMP_COMMAND.match(cmd)
+            if not self.simulation_activate or not match:
+                return False
+            self.simp_pressure = int(match.group(1))
+        elif kind == 'ST':
+            if arg == 'GPS':
+                now = time.localtime()
+                target = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+            else:
+                try:
+                    hh, mm, ss = (int(v) for v in arg.split(':'))
+                except ValueError:
+                    return False
+                target = hh * 3600 + mm * 60 + ss
+            self.clock_offset = target - self.elapsed
+        elif kind not in ('MX', 'MEC', 'CAL'):
+            self.commands['unknown'] += 1
+            return False
+        return True
+
+
+class FaultInjector:
+    """Per-line and burst faults applied to the downlink byte stream"""
+
+    def __init__(self, corrupt=0.0, split=0.0, truncate=0.0,
+                 burst_every=0.0, burst_hold=0.5, seed=None):
+        self.corrupt = corrupt
+        self.split = split
+        self.truncate = truncate
+        self.burst_every = burst_every
+        self.burst_hold = burst_hold
+        self.rng = random.Random(seed)
+        self.counts = Counter()
+
+    def apply(self, line):
+        """Return the chunks (separate writes) to send for one line"""
+        rng = self.rng
+        if self.truncate and rng.random() < self.truncate:
+            self.counts['truncated'] += 1
+            return [line[:rng.randrange(1, len(line) - 2)]]
+        if self.corrupt and rng.random() < self.corrupt:
+            self.counts['corrupted'] += 1
+            data = bytearray(line)
+            data[rng.randrange(len(data) - 2)] = rng.choice(b'#?~\x00\xff,.:')
+            line = bytes(data)
+        if self.split and rng.random() < self.split:
+            self.counts['split'] += 1
+            cut = rng.randrange(1, len(line) - 1)
+            return [line[:cut], line[cut:]]
+        return [line]
+
+    def holding(self, t):
+        """True while a burst is building up (output held back) at time t"""
+        if not self.burst_every:
+            return False
+        return t % self.burst_every >= self.burst_every - self.burst_hold
+
+
+class FirmwareSimulator:
+    """Emits telemetry at a fixed rate into write(bytes) on a background thread.
+
+    Uplink bytes go to feed_commands(), which frames them into commands for
+    the model. Split lines are written as two calls to write() so framing is
+    exercised across reads.
+    """
+
+    def __init__(self, write, rate=10.0, model=None, faults=None, name="firmware-sim"):
+        self.write = write
+        self.rate = rate
+        self.model = model or FirmwareModel()
+        self.faults = faults or FaultInjector()
+        self.name = name
+        self.framer = LineFramer()
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+        self._held = []
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def feed_commands(self, chunk):
+        lines = self.framer.feed(chunk)
+        with self._lock:
+            for line in lines:
+                self.model.handle_command(line)
+
+    def run(self):
+        start = time.perf_counter()
+        emitted = 0
+        while self.running:
+            now = time.perf_counter() - start
+            # Due count comes from the start time, not the last tick: no drift
+            due = int(now * self.rate) - emitted
+            if due <= 0:
+                time.sleep(min(TICK, (emitted + 1) / self.rate - now))
+                continue
+
+            chunks = []
+            with self._lock:
+                for _ in range(due):
+                    self.model.advance(1.0 / self.rate)
+                    line = self.model.next_line()
+                    if line is not None:
+                        chunks.extend(self.faults.apply(line))
+                        self.packets_sent += 1
+            emitted += due
+
+            if self.faults.holding(now):
+                self._held.extend(chunks)
+                continue
+            if self._held:
+                chunks = self._held + chunks
+                self._held = []
+            self._send(chunks)
+
+    def _send(self, chunks):
+        # Whole lines are coalesced into one write; a split line ends a write
+        pending = bytearray()
+        for chunk in chunks:
+            pending += chunk
+            if not chunk.endswith(b'\n'):
+                self._write(pending)
+                pending = bytearray()
+        if pending:
+            self._write(pending)
+
+    def _write(self, data):
+        try:
+            self.write(bytes(data))
+        except OSError:
+            # Nobody has the other end open yet (pty); the packets are lost
+            # just as they would be over the air
+            return
+        self.bytes_sent += len(data)
+
+
+class SimulatedPort:
+    """In-memory stand-in for a pyserial port, fed by a FirmwareSimulator"""
+
+    def __init__(self, baudrate=115200, timeout=1.0):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self.on_write = None
+        self._buffer = bytearray()
+        self._ready = threading.Condition()
+
+    @property
+    def in_waiting(self):
+        return len(self._buffer)
+
+    def feed(self, data):
+        """Device -> host bytes"""
+        with self._ready:
+            self._buffer += data
+            self._ready.notify()
+
+    def read(self, size=1):
+        with self._ready:
+            if not self._buffer and self.is_open:
+                self._ready.wait(self.timeout)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def write(self, data):
+        """Host -> device bytes"""
+        if self.on_write:
+            self.on_write(data)
+        return len(data)
+
+    def close(self):
+        with self._ready:
+            self.is_open = False
+            self._ready.notify_all()
+
+
+def simulated_port(rate=10.0, model=None, faults=None, baudrate=115200):
+    """A SimulatedPort with a started FirmwareSimulator behind it"""
+    port = SimulatedPort(baudrate)
+    simulator = FirmwareSimulator(port.feed, rate, model, faults)
+    port.on_write = simulator.feed_commands
+    port.simulator = simulator
+    simulator.start()
+    return port
+
+
+def open_pty():
+    """Return (master_fd, slave device path) of a raw pseudo-terminal pair"""
+    import tty
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    # A full pty buffer (nobody reading yet) must drop packets, not stall the emitter
+    os.set_blocking(master, False)
+    return master, os.ttyname(slave)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="CanSat firmware simulator on a pseudo-terminal")
+    parser.add_argument('--rate', type=float, default=1.0, help="packets per second")
+    parser.add_argument('--team-id', type=int, default=DEFAULT_TEAM_ID)
+    parser.add_argument('--corrupt', type=float, default=0.0,
+                        help="fraction of lines with a corrupted byte")
+    parser.add_argument('--split', type=float, default=0.0,
+                        help="fraction of lines written in two pieces")
+    parser.add_argument('--truncate', type=float, default=0.0,
+                        help="fraction of lines cut short without a line ending")
+    parser.add_argument('--burst-every', type=float, default=0.0,
+                        help="seconds between bursts (0 disables)")
+    parser.add_argument('--burst-hold', type=float, default=0.5,
+                        help="seconds of output held back per burst")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--stats-interval', type=float, default=5.0)
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    master, device = open_pty()
+    model = FirmwareModel(args.team_id, seed=args.seed)
+    faults = FaultInjector(args.corrupt, args.split, args.truncate,
+                           args.burst_every, args.burst_hold, seed=args.seed)
+    simulator = FirmwareSimulator(lambda data: os.write(master, data), args.rate, model, faults)
+
+    def read_uplink():
+        while True:
+            select.select([master], [], [], 1.0)
+            try:
+                chunk = os.read(master, 1024)
+            except OSError:
+                # EIO while no process has the slave open
+                time.sleep(0.1)
+                continue
+            simulator.feed_commands(chunk)
+
+    threading.Thread(target=read_uplink, name="sim-uplink", daemon=True).start()
+    print(f"Simulated CanSat on {device} at {args.rate:g} pkt/s", flush=True)
+    simulator.start()
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            faults_seen = ', '.join(f"{k} {v}" for k, v in sorted(faults.counts.items())) or "none"
+            commands = ', '.join(f"{k} {v}" for k, v in sorted(model.commands.items())) or "none"
+            print(f"[{time.strftime('%H:%M:%S')}] sent {simulator.packets_sent} packets "
+                  f"({simulator.bytes_sent} B) | {model.mode} {model.state} "
+                  f"{model.altitude:.1f} m | faults: {faults_seen} | commands: {commands}",
+                  flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        os.close(master)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Telemetry packet schema and parser.
+
+The schema mirrors xBee_send in main/xBee.c, which prints
+
+    id, hh:mm:ss, pkt_no, mode, state, altitude, temperature, pressure,
+    voltage, gyro r/p/y, accel r/p/y, mag r/p/y, rotation_rate,
+    gps hh:mm:ss, gps_altitude, latitude, longitude, gps_stats
+
+as one comma separated line: 24 comma fields, 28 values once the two clock
+fields are split. Keep FIELDS in step with that snprintf.
+"""
+
+import io
+from collections import Counter
+
+INT = 'int'
+FLOAT = 'float'
+TEXT = 'text'
+CLOCK = 'clock'   # "h:m:s", unpadded as printed by %d:%d:%d
+
+# Team id put in uplink commands (CMD,<id>,...); xBee_command_handler takes any
+DEFAULT_TEAM_ID = 1001
+
+# (packet key, kind) in the order the firmware prints them
+FIELDS = [
+    ('id', INT),
+    ('mission_time', CLOCK),
+    ('pkt_no', INT),
+    ('mode', TEXT),
+    ('state', TEXT),
+    ('altitude', FLOAT),
+    ('temperature', FLOAT),
+    ('pressure', FLOAT),
+    ('voltage', FLOAT),
+    ('gyro_r', FLOAT),
+    ('gyro_p', FLOAT),
+    ('gyro_y', FLOAT),
+    ('accel_r', FLOAT),
+    ('accel_p', FLOAT),
+    ('accel_y', FLOAT),
+    ('mag_r', FLOAT),
+    ('mag_p', FLOAT),
+    ('mag_y', FLOAT),
+    ('rotation_rate', INT),
+    ('gps_time', CLOCK),
+    ('gps_altitude', FLOAT),
+    ('latitude', FLOAT),
+    ('longitude', FLOAT),
+    ('gps_stats', INT),
+]
+FIELD_KEYS = [key for key, kind in FIELDS]
+FIELD_KINDS = dict(FIELDS)
+FIELD_COUNT = len(FIELDS)
+
+# The firmware only ever strcpy's these into data->mode / data->state
+MODES = ['FLIGHT', 'SIMULATION']
+STATES = ['ASCEND', 'DESCEND', 'LANDED']
+
+# Furthest a late packet can fall behind the newest pkt_no: the merger gives
+# up on a gap within a fraction of a second, a handful of packets at most
+MAX_REORDER = 64
+
+# Display precision for floats; anything not listed uses two decimals
+FLOAT_FORMATS = {
+    'latitude': '{:.6f}',
+    'longitude': '{:.6f}',
+}
+
+
+def parse_clock(text):
+    hh, mm, ss = text.split(':')
+    return f"{int(hh):02d}:{int(mm):02d}:{int(ss):02d}"
+
+
+def clock_seconds(text):
+    hh, mm, ss = text.split(':')
+    return int(hh) * 3600 + int(mm) * 60 + int(ss)
+
+
+def counter_restarted(pkt_no, newest):
+    """True if pkt_no, after newest (the highest seen so far), means the
+    CanSat restarted.
+
+    xBee_send's counter starts from 0 at boot, so a counter back at 0, or
+    further behind than any late packet can be, starts a new run however
+    early in the session it happens. Anything less far back is a late packet
+    or a duplicate. The one restart rule for the merger, the analytics, the
+    derived quantities and event detection.
+    """
+    return newest is not None and pkt_no < newest and (pkt_no == 0 or pkt_no < newest - MAX_REORDER)
+
+
+def format_value(key, value):
+    if isinstance(value, float):
+        return FLOAT_FORMATS.get(key, '{:.2f}').format(value)
+    return str(value)
+
+
+def format_line(data):
+    """Render a packet exactly as xBee_send prints it, without the CRLF"""
+    parts = []
+    for key, kind in FIELDS:
+        value = data[key]
+        if kind == FLOAT:
+            parts.append(f"{float(value):f}")
+        elif kind == INT:
+            parts.append(str(int(value)))
+        elif kind == CLOCK:
+            parts.append(':'.join(str(int(part)) for part in str(value).split(':')))
+        else:
+            parts.append(str(value))
+    return ', '.join(parts)
+
+
+_CONVERTERS = {INT: int, FLOAT: float, TEXT: str.strip, CLOCK: parse_clock}
+_FIELD_CONVERTERS = [(key, _CONVERTERS[kind]) for key, kind in FIELDS]
+
+# Column layout once the clock fields are split on ':' (the 28-value packet):
+# which split columns are numeric/text, and where each numeric field lands
+_NUMERIC_COLUMNS = []
+_TEXT_COLUMNS = []
+_TEXT_KEYS = []
+_NUMERIC_LAYOUT = {}
+for _key, _kind in FIELDS:
+    _column = len(_NUMERIC_COLUMNS) + len(_TEXT_COLUMNS)
+    if _kind == TEXT:
+        _TEXT_COLUMNS.append(_column)
+        _TEXT_KEYS.append(_key)
+        continue
+    _width = 3 if _kind == CLOCK else 1
+    _NUMERIC_LAYOUT[_key] = (len(_NUMERIC_COLUMNS), _width)
+    _NUMERIC_COLUMNS.extend(range(_column, _column + _width))
+
+
+class ParseStats:
+    """Counts parsed lines and failures, keyed by the field that failed"""
+
+    def __init__(self):
+        self.lines = 0
+        self.packets = 0
+        self.errors = Counter()
+
+    @property
+    def error_total(self):
+        return sum(self.errors.values())
+
+    def worst_field(self):
+        if not self.errors:
+            return None
+        return self.errors.most_common(1)[0]
+
+
+class TelemetryParser:
+    def __init__(self):
+        self.stats = ParseStats()
+
+    def parse(self, line):
+        """Parse one downlink line into a packet dict, or None if malformed"""
+        stats = self.stats
+        stats.lines += 1
+
+        parts = line.split(',')
+        if len(parts) != FIELD_COUNT:
+            stats.errors['field_count'] += 1
+            return None
+
+        try:
+            # int()/float() ignore the space after each comma, no strip needed
+            data = {key: convert(part) for (key, convert), part in zip(_FIELD_CONVERTERS, parts)}
+        except ValueError:
+            self._count_field_errors(parts)
+            return None
+
+        stats.packets += 1
+        return data
+
+    def _count_field_errors(self, parts):
+        for (key, convert), part in zip(_FIELD_CONVERTERS, parts):
+            try:
+                convert(part)
+            except ValueError:
+                self.stats.errors[key] += 1
+
+    def parse_batch(self, lines):
+        """Parse many lines at once into NumPy columns.
+
+        Returns a dict keyed like a packet: numeric fields as float64 arrays,
+        clock fields as seconds of day (float64), mode/state as str arrays.
+        Malformed lines are skipped and counted as in parse().
+        """
+        import numpy as np
+
+        stats = self.stats
+        stats.lines += len(lines)
+        good = [line for line in lines if line.count(',') == FIELD_COUNT - 1]
+        stats.errors['field_count'] += len(lines) - len(good)
+
+        try:
+            columns = self._split_columns(np, good)
+        except ValueError:
+            # At least one bad value somewhere: fall back to the per-line path
+            # to find (and count) the offenders, then rebuild from the survivors
+            stats.lines -= len(good)
+            packets = [packet for packet in map(self.parse, good) if packet is not None]
+            return packets_to_columns(packets)
+
+        stats.packets += len(good)
+        return columns
+
+    def _split_columns(self, np, lines):
+        if not lines:
+            return packets_to_columns([])
+
+        # One pass of NumPy's C text parser over the whole batch, with the
+        # clock fields split into separate h/m/s columns
+        text = io.StringIO('\n'.join(lines).replace(':', ','))
+        numeric = np.loadtxt(text, delimiter=',', usecols=_NUMERIC_COLUMNS,
+                             dtype=np.float64, ndmin=2)
+        text.seek(0)
+        strings = np.loadtxt(text, delimiter=',', usecols=_TEXT_COLUMNS, dtype=str, ndmin=2)
+
+        columns = {}
+        for key, kind in FIELDS:
+            if kind == TEXT:
+                columns[key] = np.char.strip(strings[:, _TEXT_KEYS.index(key)])
+                continue
+            first, width = _NUMERIC_LAYOUT[key]
+            if width == 3:
+                hms = numeric[:, first:first + 3]
+                columns[key] = hms[:, 0] * 3600 + hms[:, 1] * 60 + hms[:, 2]
+            else:
+                columns[key] = numeric[:, first]
+        return columns
+
+
+def packets_to_columns(packets):
+    """Column layout of parse_batch() built from already parsed packets"""
+    import numpy as np
+
+    columns = {}
+    for key, kind in FIELDS:
+        values = [packet[key] for packet in packets]
+        if kind == TEXT:
+            columns[key] = np.array(values, dtype=str)
+        elif kind == CLOCK:
+            columns[key] = np.array([clock_seconds(v) for v in values], dtype=np.float64)
+        else:
+            columns[key] = np.array(values, dtype=np.float64)
+    return columns
+
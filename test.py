@@ -1,21 +1,101 @@
+import sys
+import time
+
+_START_TIME = time.perf_counter()
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Capture-only mode: hand over before tkinter/matplotlib are imported at all
+    import headless
+    sys.exit(headless.main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import serial
-import serial.tools.list_ports
+import importlib
+import queue
 import threading
-import time
-from datetime import datetime
-import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from collections import deque
-import csv
+from functools import partial
+from datetime import datetime
 import os
 import platform
 
+from serial_link import link_utilisation
+from analytics import LinkAnalytics
+from derived import DERIVED_KEYS, DerivedState
+from events import (APOGEE, CONTAINER_RELEASE, COUNTER_STALLED, PAYLOAD_RELEASE, VOLTAGE_SAG,
+                    EventDetector, EventLog)
+from fanout import FanoutServer, parse_address
+from flight_log import LOG_FORMATS, open_flight_logger
+from panel import LabelPanel
+from probes import ProbeSet
+from simp import SimpStreamer, load_pressure_profile
+from uplink import ACKED, DONE, CommandUplink
+from replay import REPLAY_SPEEDS, ReplaySource, load_flight, parse_speed
+from runtime import NetworkSource, SerialSource, StationRuntime
+from telemetry import DEFAULT_TEAM_ID, TelemetryParser
+
+# matplotlib and NumPy dominate cold start; they are imported on a background
+# thread once the window is up (see load_graph_modules)
+GRAPH_MODULES = ['numpy', 'matplotlib', 'matplotlib.figure',
+                 'matplotlib.backends.backend_tkagg', 'history', 'plotting']
+
+# Samples shown in each graph panel
+PLOT_WINDOW = 100
+
+# Backup receiver choice meaning a single link
+NO_BACKUP = "NONE"
+
+# Port prefix that subscribes to another station's fan-out feed (host:port)
+FEED_PREFIX = "tcp://"
+
+# Event markers kept on the graphs; older ones are dropped
+MAX_EVENT_MARKS = 50
+
+# Packets waiting for the next UI frame; beyond this the oldest are dropped
+DISPLAY_QUEUE_DEPTH = 20000
+
+class StartupProfile:
+    """Startup milestones and deferred import times, printed with --profile-startup"""
+    
+    def __init__(self, enabled, milestones=("window shown", "ports listed", "graphs ready")):
+        self.enabled = enabled
+        self.waiting = set(milestones)
+        self.marks = [("init started", time.perf_counter() - _START_TIME)]
+        self.imports = []
+        
+    def import_module(self, name):
+        start = time.perf_counter()
+        importlib.import_module(name)
+        self.imports.append((name, time.perf_counter() - start))
+        
+    def mark(self, name):
+        # Only the first occurrence counts (ports are re-listed on every refresh)
+        if name not in self.waiting:
+            return
+        self.marks.append((name, time.perf_counter() - _START_TIME))
+        self.waiting.discard(name)
+        if self.enabled and not self.waiting:
+            self.report()
+            
+    def report(self):
+        print("Startup profile (seconds since process start):")
+        for name, t in self.marks:
+            print(f"  {name:<20} {t:7.3f}")
+        print("Deferred imports (background thread):")
+        for name, t in self.imports:
+            print(f"  {name:<36} {t:7.3f}")
+
+
+def list_serial_ports():
+    import serial.tools.list_ports
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
 class CanSatGroundStation:
-    def __init__(self, root):
+    def __init__(self, root, history_depth=None, profile_startup=False, probes=False,
+                 render_process=False, serve=None, team_id=DEFAULT_TEAM_ID):
+        self.startup = StartupProfile(profile_startup)
         self.root = root
         self.root.title("TINPOT GROUND STATION CANSAT MISSION CONTROL")
         self.root.geometry("1600x950")
@@ -38,38 +118,118 @@ class CanSatGroundStation:
         # Serial connection
         self.serial_port = None
         self.connected = False
-        self.reading_thread = None
-        self.running = False
+        self.backup_port = None
+        self.uplink = None
+        # Put in every uplink command; the firmware accepts any (--team-id)
+        self.team_id = team_id
+        # asyncio ingest core of the current link or replay, and the primary
+        # port's source (for the throughput figures)
+        self.runtime = None
+        self.reader = None
+        # Gap, duplicate, jitter and parse-failure figures for the live stream
+        # and, while recording, for the recording alone
+        self.analytics = LinkAnalytics()
+        self.recording_analytics = None
+        self.simp_streamer = None
+        # Attitude, vertical speed and altitude cross-checks, added to every
+        # packet by a runtime stage
+        self.derived = DerivedState()
+        # Apogee, releases, voltage sags and a stalled counter, detected by the
+        # stage after it; logged next to the recording and marked on the graphs
+        self.events = EventDetector(on_event=self.record_event)
+        self.event_log = None
+        self.event_marks = deque(maxlen=MAX_EVENT_MARKS)
+        # Every packet republished to other stations on the network, while
+        # a link or replay runs (--serve)
+        self.fanout = FanoutServer(*serve) if serve else None
+        
+        # Recorded flight played through the same ingest path as the serial ports
+        self.replay = None
         
         # Data logging
-        self.csv_file = None
-        self.csv_writer = None
+        self.logger = None
         self.logging_enabled = False
         self.save_path = None
         
-        # Data storage for graphs
-        self.data_points = {
-            'altitude': deque(maxlen=100),
-            'voltage': deque(maxlen=100),
-            'pressure': deque(maxlen=100),
-            'temperature': deque(maxlen=100),
-            'gyro_roll': deque(maxlen=100),
-            'gyro_pitch': deque(maxlen=100),
-            'gyro_yaw': deque(maxlen=100),
-            'accel_roll': deque(maxlen=100),
-        }
-        self.time_points = deque(maxlen=100)
-        self.data_counter = 0
+        # Telemetry history for graphs, every field, fixed memory, plus a
+        # min/max summary of the whole flight for the graphed channels.
+        # Built with the graphs once NumPy is loaded; packets wait until then.
+        self.history = None
+        self.history_depth = history_depth
+        self.pending_history = []
+        self.graphs = None
+        self.full_flight_view = False
+        self.derived_view = False
+        # With render_process the graphs are drawn by a worker process fed
+        # through shared memory, and this process never touches matplotlib
+        self.use_render_process = render_process
+        self.render_process = None
+        
+        # Results of background tasks, handed back to the Tk thread
+        self.background_results = queue.SimpleQueue()
+        self.background_pending = 0
         
         # Current telemetry data
+        self.parser = TelemetryParser()
         self.current_data = {}
         
+        # Packets handed from the runtime to the UI, drained once per frame
+        self.packet_queue = queue.Queue(DISPLAY_QUEUE_DEPTH)
+        self.display_dropped = 0
+        self.next_frame_at = None
+        self.frames_rendered = 0
+        self.packets_coalesced = 0
+        self.frames_dropped = 0
+        self.tcl_rate = 0.0
+        
+        # Timing probes on the hot path, shown in the diagnostics window;
+        # detached (zero cost) unless enabled there or with --probes
+        self.probes = ProbeSet(enabled=probes)
+        for name in ("serial", "parse", "log", "display", "graphs"):
+            self.probes.probe(name)
+        self.probes.attach("display", self, "update_display")
+        self.probes.attach("graphs", self, "update_graphs")
+        self.diagnostics = None
+        
         # Create custom style
         self.setup_styles()
         self.create_ui()
         self.update_ports()
-        self.detect_usb_drives()
+        if self.use_render_process:
+            self.run_in_background(lambda: importlib.import_module('render_process'),
+                                   self.start_render_process)
+            self.root.protocol("WM_DELETE_WINDOW", self.close)
+        else:
+            self.run_in_background(self.load_graph_modules, self.build_graphs)
         self.animate_header()
+        self.render_frame()
+        self.update_stats()
+        self.root.after_idle(lambda: self.startup.mark("window shown"))
+        
+    def run_in_background(self, func, callback):
+        """Run func on a worker thread, then callback(result, error) on the Tk thread"""
+        def work():
+            try:
+                result, error = func(), None
+            except Exception as e:
+                result, error = None, e
+            self.background_results.put((callback, result, error))
+            
+        threading.Thread(target=work, daemon=True).start()
+        self.background_pending += 1
+        if self.background_pending == 1:
+            self.root.after(20, self.poll_background)
+            
+    def poll_background(self):
+        try:
+            while True:
+                callback, result, error = self.background_results.get_nowait()
+                self.background_pending -= 1
+                callback(result, error)
+        except queue.Empty:
+            pass
+        if self.background_pending:
+            self.root.after(20, self.poll_background)
         
     def setup_styles(self):
         style = ttk.Style()
@@ -201,26 +361,84 @@ class CanSatGroundStation:
                                borderwidth=1, relief='solid')
         refresh_btn.pack(side=tk.LEFT, padx=2)
         
+        # Backup receiver, merged with the primary
+        tk.Label(inner, text="BACKUP:", bg=self.bg_panel, fg=self.accent_cyan,
+                font=('Consolas', 9, 'bold')).grid(row=1, column=0, sticky=tk.W, pady=3)
+        
+        self.backup_port_var = tk.StringVar(value=NO_BACKUP)
+        self.backup_port_combo = ttk.Combobox(inner, textvariable=self.backup_port_var, width=18,
+                                              values=[NO_BACKUP], font=('Consolas', 9))
+        self.backup_port_combo.grid(row=1, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=3)
+        
         # Baud
         tk.Label(inner, text="BAUD:", bg=self.bg_panel, fg=self.accent_cyan,
-                font=('Consolas', 9, 'bold')).grid(row=1, column=0, sticky=tk.W, pady=3)
+                font=('Consolas', 9, 'bold')).grid(row=2, column=0, sticky=tk.W, pady=3)
         
         self.baud_var = tk.StringVar(value="9600")
         baud_combo = ttk.Combobox(inner, textvariable=self.baud_var, width=18,
-                                 values=["9600", "19200", "38400", "57600", "115200"],
+                                 values=["9600", "19200", "38400", "57600", "115200", "230400"],
                                  font=('Consolas', 9))
-        baud_combo.grid(row=1, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=3)
+        baud_combo.grid(row=2, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=3)
+        
+        # UI frame rate
+        tk.Label(inner, text="FPS:", bg=self.bg_panel, fg=self.accent_cyan,
+                font=('Consolas', 9, 'bold')).grid(row=3, column=0, sticky=tk.W, pady=3)
+        
+        self.frame_rate_var = tk.StringVar(value="20")
+        fps_combo = ttk.Combobox(inner, textvariable=self.frame_rate_var, width=18,
+                                values=["10", "15", "20", "25", "30"],
+                                font=('Consolas', 9))
+        fps_combo.grid(row=3, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=3)
         
         # Connect button
         self.connect_btn = tk.Button(inner, text="ESTABLISH LINK", command=self.toggle_connection,
                                     bg=self.bg_panel, fg=self.accent_green,
                                     font=('Consolas', 10, 'bold'), borderwidth=2, relief='solid')
-        self.connect_btn.grid(row=2, column=0, columnspan=3, pady=10, sticky=(tk.W, tk.E))
+        self.connect_btn.grid(row=4, column=0, columnspan=3, pady=10, sticky=(tk.W, tk.E))
         
         # Status
         self.conn_status = tk.Label(inner, text="DISCONNECTED", bg=self.bg_panel, 
                                    fg=self.accent_red, font=('Consolas', 10, 'bold'))
-        self.conn_status.grid(row=3, column=0, columnspan=3)
+        self.conn_status.grid(row=5, column=0, columnspan=3)
+        
+        # Downlink throughput
+        self.link_stats = tk.Label(inner, text="RX: -- B/s | -- PKT/s | --% LINK",
+                                  bg=self.bg_panel, fg=self.text_gray, font=('Consolas', 8))
+        self.link_stats.grid(row=6, column=0, columnspan=3)
+        
+        self.parse_stats = tk.Label(inner, text="PARSE ERR: 0", bg=self.bg_panel,
+                                   fg=self.text_gray, font=('Consolas', 8))
+        self.parse_stats.grid(row=7, column=0, columnspan=3)
+        
+        self.quality_stats = tk.Label(inner, text="LOSS --% | DUP 0 | JITTER --ms",
+                                     bg=self.bg_panel, fg=self.text_gray, font=('Consolas', 8))
+        self.quality_stats.grid(row=8, column=0, columnspan=3)
+        
+        # Per-receiver loss and lag, only while a backup is merged in
+        self.merge_stats = tk.Label(inner, text="", bg=self.bg_panel,
+                                   fg=self.text_gray, font=('Consolas', 8))
+        self.merge_stats.grid(row=9, column=0, columnspan=3)
+        
+        # Other stations subscribed to this one, only with --serve
+        self.fanout_stats = tk.Label(inner, text="", bg=self.bg_panel,
+                                    fg=self.text_gray, font=('Consolas', 8))
+        self.fanout_stats.grid(row=10, column=0, columnspan=3)
+        
+        # Replay of a recorded flight
+        replay_frame = tk.Frame(inner, bg=self.bg_panel)
+        replay_frame.grid(row=11, column=0, columnspan=3, pady=(10, 0), sticky=(tk.W, tk.E))
+        
+        self.replay_btn = tk.Button(replay_frame, text="REPLAY FLIGHT", command=self.toggle_replay,
+                                   bg=self.bg_panel, fg=self.accent_purple,
+                                   font=('Consolas', 9, 'bold'), borderwidth=1, relief='solid')
+        self.replay_btn.pack(side=tk.LEFT, padx=2, expand=True, fill=tk.X)
+        
+        self.replay_speed_var = tk.StringVar(value="1x")
+        speed_combo = ttk.Combobox(replay_frame, textvariable=self.replay_speed_var, width=6,
+                                   values=REPLAY_SPEEDS, font=('Consolas', 9))
+        speed_combo.pack(side=tk.LEFT, padx=2)
+        speed_combo.bind('<<ComboboxSelected>>', self.change_replay_speed)
+        speed_combo.bind('<Return>', self.change_replay_speed)
         
     def create_logging_panel(self, parent):
         frame = tk.LabelFrame(parent, text="DATA LOGGING", bg=self.bg_panel,
@@ -251,6 +469,17 @@ class CanSatGroundStation:
                  bg=self.bg_panel, fg=self.accent_purple, font=('Consolas', 9, 'bold'),
                  borderwidth=1, relief='solid').pack(side=tk.LEFT, padx=2, expand=True, fill=tk.X)
         
+        format_frame = tk.Frame(inner, bg=self.bg_panel)
+        format_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(format_frame, text="FORMAT:", bg=self.bg_panel, fg=self.accent_cyan,
+                font=('Consolas', 9, 'bold')).pack(side=tk.LEFT)
+        
+        self.log_format_var = tk.StringVar(value="CSV")
+        ttk.Combobox(format_frame, textvariable=self.log_format_var, width=10, state='readonly',
+                     values=LOG_FORMATS,
+                     font=('Consolas', 9)).pack(side=tk.LEFT, padx=5)
+        
         self.log_btn = tk.Button(inner, text="REC START", command=self.toggle_logging,
                                 bg=self.bg_panel, fg=self.accent_red,
                                 font=('Consolas', 10, 'bold'), borderwidth=2, relief='solid',
@@ -261,6 +490,10 @@ class CanSatGroundStation:
                                   fg=self.text_gray, font=('Consolas', 9, 'bold'))
         self.log_status.pack()
         
+        self.log_stats = tk.Label(inner, text="", bg=self.bg_panel,
+                                 fg=self.text_gray, font=('Consolas', 8))
+        self.log_stats.pack()
+        
     def create_telemetry_panel(self, parent):
         frame = tk.LabelFrame(parent, text="LIVE TELEMETRY", bg=self.bg_panel,
                              fg=self.accent_cyan, font=('Consolas', 11, 'bold'),
@@ -320,6 +553,9 @@ class CanSatGroundStation:
             value_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
             self.telem_labels[key] = value_label
             
+        # Only labels whose text changed are sent to Tk, GPS fields at most 1 Hz
+        self.panel = LabelPanel(self.telem_labels)
+            
     def create_commands_panel(self, parent):
         frame = tk.LabelFrame(parent, text="⚙ MISSION CONTROL", bg=self.bg_panel,
                              fg=self.accent_cyan, font=('Consolas', 11, 'bold'),
@@ -330,14 +566,14 @@ class CanSatGroundStation:
         inner.pack(fill=tk.BOTH, padx=10, pady=10)
         
         commands = [
-            ("TELEM ON", "CMD,1001,CX,ON", self.accent_green),
-            ("TELEM OFF", "CMD,1001,CX,OFF", self.accent_red),
-            ("MECH ON", "CMD,1001,MX,ON", self.accent_green),
-            ("MECH OFF", "CMD,1001,MX,OFF", self.accent_red),
-            ("SIM ACT", "CMD,1001,SIM,ACTIVATE", self.accent_yellow),
-            ("SIM ON", "CMD,1001,SIM,ENABLE", self.accent_green),
-            ("SIM OFF", "CMD,1001,SIM,DISABLE", self.accent_red),
-            ("CALIBRATE", "CMD,1001,CAL", self.accent_purple),
+            ("TELEM ON", f"CMD,{self.team_id},CX,ON", self.accent_green),
+            ("TELEM OFF", f"CMD,{self.team_id},CX,OFF", self.accent_red),
+            ("MECH ON", f"CMD,{self.team_id},MX,ON", self.accent_green),
+            ("MECH OFF", f"CMD,{self.team_id},MX,OFF", self.accent_red),
+            ("SIM ACT", f"CMD,{self.team_id},SIM,ACTIVATE", self.accent_yellow),
+            ("SIM ON", f"CMD,{self.team_id},SIM,ENABLE", self.accent_green),
+            ("SIM OFF", f"CMD,{self.team_id},SIM,DISABLE", self.accent_red),
+            ("CALIBRATE", f"CMD,{self.team_id},CAL", self.accent_purple),
             ("SET TIME", self.send_set_time, self.accent_cyan),
             ("SIMP", self.open_simp_dialog, self.accent_orange)
         ]
@@ -356,6 +592,11 @@ class CanSatGroundStation:
                                borderwidth=2, relief='solid', width=13)
             btn.grid(row=row, column=col, padx=3, pady=3, sticky=(tk.W, tk.E))
             
+        # Uplink queue and round-trip times per command type
+        self.uplink_stats = tk.Label(inner, text="", bg=self.bg_panel, fg=self.text_gray,
+                                    font=('Consolas', 8), wraplength=280)
+        self.uplink_stats.grid(row=len(commands) // 2 + 1, column=0, columnspan=2)
+        
         inner.columnconfigure(0, weight=1)
         inner.columnconfigure(1, weight=1)
         
@@ -365,39 +606,124 @@ class CanSatGroundStation:
                              borderwidth=2, relief='solid')
         frame.pack(fill=tk.BOTH, expand=True)
         
+        top_bar = tk.Frame(frame, bg=self.bg_panel)
+        top_bar.pack(fill=tk.X, padx=5)
+        
+        # History depth in samples (36000 = one hour at 10 Hz)
+        tk.Label(top_bar, text="HISTORY:", bg=self.bg_panel, fg=self.accent_cyan,
+                font=('Consolas', 8, 'bold')).pack(side=tk.LEFT)
+        
+        self.history_depth_var = tk.StringVar(value=str(self.history_depth or ""))
+        depth_combo = ttk.Combobox(top_bar, textvariable=self.history_depth_var, width=8,
+                                   values=["1000", "6000", "36000", "108000"],
+                                   font=('Consolas', 8))
+        depth_combo.pack(side=tk.LEFT, padx=5)
+        depth_combo.bind('<<ComboboxSelected>>', lambda e: self.set_history_depth())
+        depth_combo.bind('<Return>', lambda e: self.set_history_depth())
+        
+        self.view_btn = tk.Button(top_bar, text=f"VIEW: LAST {PLOT_WINDOW}", command=self.toggle_graph_view,
+                                  bg=self.bg_panel, fg=self.accent_cyan, font=('Consolas', 8, 'bold'),
+                                  borderwidth=1, relief='solid')
+        self.view_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.channels_btn = tk.Button(top_bar, text="CHANNELS: RAW", command=self.toggle_graph_channels,
+                                      bg=self.bg_panel, fg=self.accent_cyan, font=('Consolas', 8, 'bold'),
+                                      borderwidth=1, relief='solid')
+        self.channels_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.event_label = tk.Label(top_bar, text="EVENT: --", bg=self.bg_panel, fg=self.text_gray,
+                                    font=('Consolas', 8, 'bold'))
+        self.event_label.pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(top_bar, text="DIAG", command=self.open_diagnostics,
+                  bg=self.bg_panel, fg=self.accent_yellow, font=('Consolas', 8, 'bold'),
+                  borderwidth=1, relief='solid').pack(side=tk.LEFT, padx=5)
+        
+        self.render_stats = tk.Label(top_bar, text="FRAMES: 0 | COALESCED: 0 | DROPPED: 0 | TCL: 0/s",
+                                     bg=self.bg_panel, fg=self.text_gray,
+                                     font=('Consolas', 8), anchor=tk.E)
+        self.render_stats.pack(side=tk.RIGHT)
+        
+        # Placeholder until matplotlib has been loaded in the background
+        self.graph_frame = frame
+        self.graph_loading = tk.Label(frame, text="LOADING GRAPH ENGINE...", bg=self.bg_panel,
+                                      fg=self.accent_yellow, font=('Consolas', 12, 'bold'))
+        self.graph_loading.pack(fill=tk.BOTH, expand=True)
+        
+    def load_graph_modules(self):
+        # Worker thread: imports only, no Tk calls
+        import matplotlib
+        matplotlib.use('TkAgg')
+        for name in GRAPH_MODULES:
+            self.startup.import_module(name)
+            
+    def build_graphs(self, result, error):
+        if error:
+            self.graph_loading.config(text=f"GRAPHS UNAVAILABLE: {error}", fg=self.accent_red)
+            return
+            
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from history import DEFAULT_DEPTH, TelemetryHistory
+        from plotting import DERIVED_PANELS, GRAPH_PANELS
+        
+        lod_keys = dict.fromkeys(key for key, title, color in GRAPH_PANELS + DERIVED_PANELS)
+        self.history = TelemetryHistory(self.history_depth or DEFAULT_DEPTH, lod_keys=lod_keys,
+                                        extra_keys=DERIVED_KEYS)
+        for data in self.pending_history:
+            self.history.append(data)
+        self.pending_history = None
+        self.history_depth_var.set(str(self.history.capacity))
+        
         # Create matplotlib figure with dark theme
+        self.graph_loading.destroy()
         self.fig = Figure(figsize=(12, 9), dpi=90, facecolor=self.bg_panel)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
         
-        # Create 4x2 grid
-        self.ax_altitude = self.fig.add_subplot(4, 2, 1, facecolor='#0d1117')
-        self.ax_voltage = self.fig.add_subplot(4, 2, 2, facecolor='#0d1117')
-        self.ax_pressure = self.fig.add_subplot(4, 2, 3, facecolor='#0d1117')
-        self.ax_temperature = self.fig.add_subplot(4, 2, 4, facecolor='#0d1117')
-        self.ax_gyro_roll = self.fig.add_subplot(4, 2, 5, facecolor='#0d1117')
-        self.ax_gyro_pitch = self.fig.add_subplot(4, 2, 6, facecolor='#0d1117')
-        self.ax_gyro_yaw = self.fig.add_subplot(4, 2, 7, facecolor='#0d1117')
-        self.ax_accel_roll = self.fig.add_subplot(4, 2, 8, facecolor='#0d1117')
-        
-        axes = [self.ax_altitude, self.ax_voltage, self.ax_pressure, self.ax_temperature,
-                self.ax_gyro_roll, self.ax_gyro_pitch, self.ax_gyro_yaw, self.ax_accel_roll]
-        
-        titles = ["ALTITUDE (m)", "VOLTAGE (V)", "PRESSURE (kPa)", "TEMPERATURE (°C)",
-                 "GYRO ROLL", "GYRO PITCH", "GYRO YAW", "ACCEL ROLL"]
-        
-        for ax, title in zip(axes, titles):
-            ax.set_title(title, color=self.accent_cyan, fontsize=9, fontweight='bold', family='monospace')
-            ax.tick_params(colors=self.accent_green, labelsize=7)
-            ax.spines['bottom'].set_color(self.accent_cyan)
-            ax.spines['left'].set_color(self.accent_cyan)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.grid(True, alpha=0.2, color=self.accent_cyan, linestyle=':')
-        
-        self.fig.tight_layout()
-        
-        self.canvas = FigureCanvasTkAgg(self.fig, master=frame)
-        self.canvas.draw()
+        self.build_graph_grid()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.startup.mark("graphs ready")
+        
+    def build_graph_grid(self):
+        from plotting import DERIVED_PANELS, GRAPH_PANELS, GraphGrid
+        
+        # 4x2 grid of persistent lines, repainted by blitting
+        panels = DERIVED_PANELS if self.derived_view else GRAPH_PANELS
+        if self.graphs:
+            self.graphs.close()
+            self.fig.clf()
+        self.graphs = GraphGrid(self.fig, self.canvas, panels, title_color=self.accent_cyan,
+                                tick_color=self.accent_green)
+        self.graph_keys = ['sample'] + [key for key, title, color in panels]
+        for sample, kind, color in self.event_marks:
+            self.graphs.mark(sample, kind, color)
+        self.canvas.draw()
+        
+    def start_render_process(self, module, error):
+        if error:
+            self.graph_loading.config(text=f"GRAPHS UNAVAILABLE: {error}", fg=self.accent_red)
+            return
+            
+        from history import DEFAULT_DEPTH
+        from plotting import GRAPH_PANELS
+        
+        keys = ['sample'] + [key for key, title, color in GRAPH_PANELS]
+        self.render_process = module.RenderProcess(keys, self.history_depth or DEFAULT_DEPTH,
+                                                   fps=1 / self.frame_period(), window=PLOT_WINDOW)
+        self.render_process.start()
+        self.render_process.append(self.pending_history)
+        self.pending_history = None
+        self.render_process.set_view(self.full_flight_view)
+        # The worker draws the raw channels only
+        self.channels_btn.config(state=tk.DISABLED)
+        self.graph_loading.config(text="GRAPHS RENDERED IN A SEPARATE PROCESS", fg=self.text_gray)
+        self.startup.mark("render process started")
+        
+    def close(self):
+        if self.render_process:
+            self.render_process.stop()
+            self.render_process = None
+        self.root.destroy()
         
     def animate_header(self):
         """Animated status bar"""
@@ -418,11 +744,18 @@ class CanSatGroundStation:
         update_animation()
         
     def update_ports(self):
-        ports = serial.tools.list_ports.comports()
-        port_list = [port.device for port in ports]
+        # Port enumeration can take a while (notably on Windows), keep it off the UI
+        self.run_in_background(list_serial_ports, self.fill_ports)
+        
+    def fill_ports(self, port_list, error):
+        if error:
+            print(f"Port scan failed: {error}")
+            port_list = []
         self.port_combo['values'] = port_list
-        if port_list:
+        self.backup_port_combo['values'] = [NO_BACKUP] + port_list
+        if port_list and not self.port_var.get():
             self.port_combo.current(0)
+        self.startup.mark("ports listed")
             
     def browse_save_location(self):
         folder = filedialog.askdirectory(title="Select Storage Location")
@@ -432,8 +765,14 @@ class CanSatGroundStation:
             self.log_btn.config(state=tk.NORMAL)
             
     def select_usb_drive(self):
-        drives = self.detect_usb_drives()
+        # Walking the mount points can stall on slow media, scan in the background
+        self.run_in_background(self.detect_usb_drives, self.show_usb_dialog)
         
+    def show_usb_dialog(self, drives, error):
+        if error:
+            messagebox.showerror("USB Detection", str(error))
+            return
+            
         if not drives:
             messagebox.showinfo("USB Detection", "No removable drives detected")
             return
@@ -489,33 +828,181 @@ class CanSatGroundStation:
         if not port:
             messagebox.showerror("Error", "Select a port first")
             return
+        if self.replay:
+            messagebox.showerror("Error", "Stop the replay before establishing a link")
+            return
+            
+        backup = self.backup_port_var.get()
+        if backup in (NO_BACKUP, port):
+            backup = None
+            
+        if port.startswith(FEED_PREFIX):
+            self.connect_feed(port[len(FEED_PREFIX):])
+            return
             
         try:
             self.serial_port = serial.Serial(port, baud, timeout=1)
+            if backup:
+                self.backup_port = serial.Serial(backup, baud, timeout=1)
             self.connected = True
-            self.running = True
+            self.analytics = LinkAnalytics()
             
-            self.reading_thread = threading.Thread(target=self.read_serial, daemon=True)
-            self.reading_thread.start()
+            # Commands are written by a runtime task, never from Tk
+            self.uplink = CommandUplink(self.serial_port)
+            
+            parsers = {"PRI": self.parser}
+            ports = [("PRI", self.serial_port)]
+            if backup:
+                # Only the first copy of a packet reaches logging, the uplink and the UI
+                parsers["BAK"] = TelemetryParser()
+                ports.append(("BAK", self.backup_port))
+            runtime = self.start_runtime(parsers, ports)
+            self.reader = runtime.sources[0]
+            self.probes.attach("serial", self.reader.framer, "feed")
             
             self.connect_btn.config(text="TERMINATE LINK", fg=self.accent_red)
-            self.conn_status.config(text="CONNECTED", fg=self.accent_green)
+            self.conn_status.config(text="CONNECTED x2" if backup else "CONNECTED", fg=self.accent_green)
             
         except Exception as e:
+            for opened in (self.serial_port, self.backup_port):
+                if opened and opened.is_open:
+                    opened.close()
+            self.serial_port = self.backup_port = None
+            self.connected = False
             messagebox.showerror("Connection Failed", str(e))
             
+    def connect_feed(self, address):
+        """Show another station's fan-out feed; receive only, so no uplink"""
+        try:
+            host, port = parse_address(address, 'localhost')
+        except ValueError:
+            messagebox.showerror("Error", f"Feed address must be {FEED_PREFIX}HOST:PORT")
+            return
+        self.connected = True
+        self.analytics = LinkAnalytics()
+        self.reader = NetworkSource(host, port)
+        self.start_runtime({"PRI": self.parser}, sources=[self.reader])
+        self.probes.attach("serial", self.reader.framer, "feed")
+        
+        self.connect_btn.config(text="TERMINATE LINK", fg=self.accent_red)
+        self.conn_status.config(text="FEED", fg=self.accent_green)
+        
     def disconnect(self):
-        self.running = False
-        if self.reading_thread:
-            self.reading_thread.join(timeout=2)
+        self.stop_simp_stream()
+        if self.uplink:
+            self.uplink.stop()
+            self.uplink = None
             
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        self.stop_runtime()
+        self.reader = None
+            
+        for opened in (self.serial_port, self.backup_port):
+            if opened and opened.is_open:
+                opened.close()
+        self.serial_port = self.backup_port = None
             
         self.connected = False
         self.connect_btn.config(text="ESTABLISH LINK", fg=self.accent_green)
         self.conn_status.config(text="DISCONNECTED", fg=self.accent_red)
         
+    def start_runtime(self, parsers, ports=(), sources=()):
+        """Start the ingest core for a session: one source per port (or the
+        given sources), then the parse stage and the analytics, log, uplink,
+        display and fan-out sinks"""
+        runtime = StationRuntime(parsers, on_reject=self.reject_line)
+        for link, port in ports:
+            runtime.add_source(SerialSource(port, link))
+        for source in sources:
+            runtime.add_source(source)
+        runtime.add_sink("analytics", self.account_packet)
+        runtime.add_sink("log", self.log_packet)
+        runtime.add_sink("uplink", self.confirm_commands)
+        # The UI only shows the latest state: drop rather than stall ingestion
+        runtime.add_sink("display", self.queue_for_display, lossy=True)
+        if self.uplink:
+            runtime.add_task(self.uplink.serve)
+        if self.fanout:
+            runtime.add_task(self.fanout.serve)
+            # Lossy like the display: slow subscribers never hold up the station
+            runtime.add_sink("fanout", self.fanout.publish, lossy=True)
+        self.derived.reset()
+        runtime.add_stage("derived", self.derived.update)
+        self.events.reset()
+        runtime.add_stage("events", self.events.update)
+        self.probes.attach("parse", runtime, "parse_lines")
+        runtime.start()
+        self.runtime = runtime
+        return runtime
+        
+    def stop_runtime(self):
+        if self.runtime:
+            # Drains whatever the sinks have already accepted
+            self.runtime.stop()
+            self.runtime = None
+            
+    def toggle_replay(self):
+        if self.replay:
+            self.stop_replay()
+            return
+        path = filedialog.askopenfilename(title="Select Flight Recording",
+                                          filetypes=[("Flight recordings", "*.csv *.cfr"),
+                                                     ("All files", "*.*")])
+        if path:
+            self.open_replay(path)
+            
+    def open_replay(self, path):
+        if self.connected:
+            messagebox.showerror("Error", "Terminate the link before replaying a flight")
+            return
+        self.replay_btn.config(text="LOADING...", state=tk.DISABLED)
+        self.run_in_background(lambda: load_flight(path), self.start_replay)
+        
+    def start_replay(self, records, error):
+        self.replay_btn.config(state=tk.NORMAL)
+        if error or not records:
+            self.replay_btn.config(text="REPLAY FLIGHT")
+            messagebox.showerror("Replay Failed", str(error or "No packets in recording"))
+            return
+        try:
+            speed = parse_speed(self.replay_speed_var.get())
+        except ValueError:
+            speed = 1.0
+            self.replay_speed_var.set("1x")
+            
+        # Start the graphs over so they show only the replayed flight
+        if self.render_process:
+            self.render_process.reset()
+        elif self.history is None:
+            self.pending_history.clear()
+        else:
+            self.history.clear()
+            self.graphs.reset_limits()
+            self.graphs.clear_marks()
+        self.event_marks.clear()
+            
+        self.analytics = LinkAnalytics()
+        runtime = self.start_runtime({"PRI": self.parser})
+        self.replay = ReplaySource(records, partial(runtime.submit_lines, "PRI"), speed)
+        self.replay.start()
+        self.replay_btn.config(text="STOP REPLAY", fg=self.accent_red)
+        self.conn_status.config(text="REPLAYING", fg=self.accent_purple)
+        
+    def stop_replay(self):
+        if self.replay:
+            self.replay.stop()
+            self.replay = None
+            self.stop_runtime()
+        self.replay_btn.config(text="REPLAY FLIGHT", fg=self.accent_purple)
+        self.conn_status.config(text="DISCONNECTED", fg=self.accent_red)
+        
+    def change_replay_speed(self, event=None):
+        if not self.replay:
+            return
+        try:
+            self.replay.set_speed(parse_speed(self.replay_speed_var.get()))
+        except ValueError:
+            pass
+            
     def toggle_logging(self):
         if not self.logging_enabled:
             self.start_logging()
@@ -528,19 +1015,11 @@ class CanSatGroundStation:
             return
             
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"CanSat_Flight_{timestamp}.csv"
-            filepath = os.path.join(self.save_path, filename)
-            
-            self.csv_file = open(filepath, 'w', newline='')
-            self.csv_writer = csv.writer(self.csv_file)
-            
-            header = ["Timestamp", "Team_ID", "Mission_Time", "Packet_Count", "Mode", "State",
-                     "Altitude_m", "Temperature_C", "Pressure_kPa", "Voltage_V",
-                     "Gyro_Roll", "Gyro_Pitch", "Gyro_Yaw", "Accel_Roll", "Accel_Pitch", "Accel_Yaw",
-                     "Mag_Roll", "Mag_Pitch", "Mag_Yaw", "Rotation_Rate", "GPS_Time",
-                     "GPS_Altitude", "GPS_Latitude", "GPS_Longitude", "GPS_Sats"]
-            self.csv_writer.writerow(header)
+            self.logger = open_flight_logger(self.save_path, self.log_format_var.get())
+            self.probes.attach("log", self.logger.sink, "write_batch")
+            self.recording_analytics = LinkAnalytics()
+            self.event_log = EventLog(os.path.splitext(self.logger.paths[0])[0] + "_events.csv")
+            filename = " + ".join(os.path.basename(path) for path in self.logger.paths)
             
             self.logging_enabled = True
             self.log_btn.config(text="REC STOP", fg=self.accent_red)
@@ -550,161 +1029,339 @@ class CanSatGroundStation:
             messagebox.showerror("Logging Error", str(e))
             
     def stop_logging(self):
-        if self.csv_file:
-            self.csv_file.close()
-            self.csv_file = None
-            self.csv_writer = None
-            
         self.logging_enabled = False
+        if self.logger:
+            # Drains the queue and fsyncs before the file is closed
+            self.logger.stop()
+            self.write_link_summary(self.logger.paths[0])
+            self.logger = None
+        if self.event_log:
+            self.event_log.close()
+            self.event_log = None
+            
         self.log_btn.config(text="REC START", fg=self.accent_green)
         self.log_status.config(text="NOT RECORDING", fg=self.text_gray)
+        self.log_stats.config(text="")
         
-    def read_serial(self):
-        while self.running:
-            try:
-                if self.serial_port and self.serial_port.in_waiting:
-                    line = self.serial_port.readline().decode('utf-8', errors='ignore').strip()
-                    if line:
-                        self.parse_telemetry(line)
-            except Exception as e:
-                print(f"Read error: {e}")
-                time.sleep(0.1)
-                
-    def parse_telemetry(self, line):
+    def write_link_summary(self, log_path):
+        analytics = self.recording_analytics
+        self.recording_analytics = None
+        if analytics is None:
+            return
+        path = os.path.splitext(log_path)[0] + "_link.json"
         try:
-            parts = [p.strip() for p in line.split(',')]
-            if len(parts) >= 28:
-                data = {
-                    'id': parts[0],
-                    'mission_time': f"{parts[1]}:{parts[2]}:{parts[3]}",
-                    'pkt_no': parts[4],
-                    'mode': parts[5],
-                    'state': parts[6],
-                    'altitude': float(parts[7]),
-                    'temperature': float(parts[8]),
-                    'pressure': float(parts[9]),
-                    'voltage': float(parts[10]),
-                    'gyro_r': float(parts[11]),
-                    'gyro_p': float(parts[12]),
-                    'gyro_y': float(parts[13]),
-                    'accel_r': float(parts[14]),
-                    'accel_p': float(parts[15]),
-                    'accel_y': float(parts[16]),
-                    'mag_r': float(parts[17]),
-                    'mag_p': float(parts[18]),
-                    'mag_y': float(parts[19]),
-                    'rotation_rate': parts[20],
-                    'gps_time': f"{parts[21]}:{parts[22]}:{parts[23]}",
-                    'gps_altitude': parts[24],
-                    'latitude': parts[25],
-                    'longitude': parts[26],
-                    'gps_stats': parts[27]
-                }
-                
-                self.current_data = data
-                
-                # CSV logging
-                if self.logging_enabled and self.csv_writer:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                    row = [timestamp, data['id'], data['mission_time'], data['pkt_no'],
-                          data['mode'], data['state'], data['altitude'], data['temperature'],
-                          data['pressure'], data['voltage'], data['gyro_r'], data['gyro_p'],
-                          data['gyro_y'], data['accel_r'], data['accel_p'], data['accel_y'],
-                          data['mag_r'], data['mag_p'], data['mag_y'], data['rotation_rate'],
-                          data['gps_time'], data['gps_altitude'], data['latitude'],
-                          data['longitude'], data['gps_stats']]
-                    self.csv_writer.writerow(row)
-                    self.csv_file.flush()
-                
-                self.root.after(0, self.update_display)
+            analytics.write_summary(path)
+        except OSError as e:
+            print(f"Link summary not written: {e}")
+            return
+        summary = analytics.summary()
+        print(f"Link summary: {summary['packets']} packets, {summary['loss'] * 100:.2f}% lost, "
+              f"{summary['duplicates']} duplicates, largest gap {summary['largest_gap']} -> {path}")
+        
+    def update_stats(self):
+        if self.connected and self.reader:
+            byte_rate, line_rate = self.reader.meter.sample()
+            if self.serial_port:
+                load = link_utilisation(byte_rate, self.serial_port.baudrate) * 100
+                self.link_stats.config(text=f"RX: {byte_rate:.0f} B/s | {line_rate:.1f} PKT/s | {load:.0f}% LINK")
+            else:
+                state = "FEED" if self.reader.connected else "FEED LOST"
+                self.link_stats.config(text=f"RX: {byte_rate:.0f} B/s | {line_rate:.1f} PKT/s | {state}")
+            
+        merger = self.runtime.merger if self.runtime else None
+        if merger:
+            self.merge_stats.config(text=merger.status_line())
+            
+        if self.runtime:
+            self.quality_stats.config(text=self.analytics.status_line())
+            
+        if self.fanout:
+            self.fanout_stats.config(text=self.fanout.status_line())
+            
+        replay = self.replay
+        if replay:
+            byte_rate, line_rate = replay.meter.sample()
+            self.link_stats.config(text=f"REPLAY: {replay.position}/{len(replay)} | "
+                                        f"{line_rate:.1f} PKT/s | AVG {replay.packet_rate():.0f}")
+            if replay.finished:
+                self.conn_status.config(text="REPLAY COMPLETE", fg=self.accent_green)
+                self.replay_btn.config(text="REPLAY FLIGHT", fg=self.accent_purple)
+                self.replay = None
+                self.stop_runtime()
                 
-        except Exception as e:
-            print(f"Parse error: {e}")
+        self.tcl_rate = self.panel.call_rate()
+        
+        parse_stats = self.parser.stats
+        worst = parse_stats.worst_field()
+        if worst:
+            self.parse_stats.config(text=f"PARSE ERR: {parse_stats.error_total} "
+                                         f"(WORST: {worst[0]} x{worst[1]})", fg=self.accent_orange)
             
-    def update_display(self):
-        for key, label in self.telem_labels.items():
-            if key in self.current_data:
-                value = self.current_data[key]
-                if isinstance(value, float):
-                    label.config(text=f"{value:.2f}")
+        if self.uplink:
+            self.uplink_stats.config(text=f"UPLINK: {self.uplink.status_line()}")
+            
+        if self.render_process and not self.render_process.alive():
+            self.graph_loading.config(text="RENDER PROCESS EXITED", fg=self.accent_red)
+            
+        logger = self.logger
+        if logger:
+            text = (f"QUEUE: {logger.queue_depth()} | "
+                    f"WRITE: {logger.last_write_ms:.1f}/{logger.max_write_ms:.1f} ms | "
+                    f"ROWS: {logger.rows_written}")
+            if logger.rows_dropped:
+                # Storage fell behind and the logger's queue filled: rows were lost
+                text += f" | DROPPED: {logger.rows_dropped}"
+            self.log_stats.config(text=text,
+                                  fg=self.accent_red if logger.error or logger.rows_dropped
+                                  else self.text_gray)
+        self.root.after(1000, self.update_stats)
+        
+    # Runtime callbacks, all called on the runtime's loop thread
+    
+    def reject_line(self, line):
+        self.analytics.parse_failed()
+        recording = self.recording_analytics
+        if recording:
+            recording.parse_failed()
+            
+    def account_packet(self, data):
+        self.analytics.packet(data)
+        recording = self.recording_analytics
+        if recording:
+            recording.packet(data)
+            
+    def log_packet(self, data):
+        # Written and flushed on the logger thread
+        logger = self.logger
+        if self.logging_enabled and logger:
+            logger.log(data)
+            
+    def record_event(self, event):
+        # Runtime thread: straight into the recording; the display sink brings
+        # the packet (and its events) to the label and the graph markers
+        event_log = self.event_log
+        if event_log:
+            event_log.write(event)
+            
+    def confirm_commands(self, data):
+        # Telemetry is how the firmware confirms commands
+        uplink = self.uplink
+        if uplink:
+            uplink.observe(data)
+            
+    def queue_for_display(self, data):
+        packet_queue = self.packet_queue
+        try:
+            packet_queue.put_nowait(data)
+        except queue.Full:
+            # The UI has stalled: keep the newest packets
+            try:
+                packet_queue.get_nowait()
+            except queue.Empty:
+                pass
+            packet_queue.put_nowait(data)
+            self.display_dropped += 1
+        
+    def frame_period(self):
+        try:
+            fps = float(self.frame_rate_var.get())
+        except ValueError:
+            fps = 20
+        return 1.0 / min(max(fps, 1), 60)
+        
+    def render_frame(self):
+        """Fixed-rate UI frame: drain every pending packet, repaint once"""
+        packets = []
+        try:
+            while True:
+                packets.append(self.packet_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if packets:
+            if self.history is not None:
+                for data in packets:
+                    self.history.append(data)
+                    if 'events' in data:
+                        self.show_events(data['events'], self.history.total)
+            else:
+                if self.render_process:
+                    self.render_process.append(packets)
                 else:
-                    label.config(text=str(value))
-                    
-        self.data_counter += 1
-        self.time_points.append(self.data_counter)
-        
-        if 'altitude' in self.current_data:
-            self.data_points['altitude'].append(self.current_data['altitude'])
-            self.data_points['voltage'].append(self.current_data['voltage'])
-            self.data_points['pressure'].append(self.current_data['pressure'])
-            self.data_points['temperature'].append(self.current_data['temperature'])
-            self.data_points['gyro_roll'].append(self.current_data['gyro_r'])
-            self.data_points['gyro_pitch'].append(self.current_data['gyro_p'])
-            self.data_points['gyro_yaw'].append(self.current_data['gyro_y'])
-            self.data_points['accel_roll'].append(self.current_data['accel_r'])
+                    self.pending_history.extend(packets)
+                for data in packets:
+                    if 'events' in data:
+                        self.show_events(data['events'])
+            self.current_data = packets[-1]
+            self.update_display()
             
+            self.frames_rendered += 1
+            self.packets_coalesced += len(packets) - 1
+            self.render_stats.config(text=f"FRAMES: {self.frames_rendered} | "
+                                          f"COALESCED: {self.packets_coalesced} | "
+                                          f"DROPPED: {self.frames_dropped} | "
+                                          f"TCL: {self.tcl_rate:.0f}/s")
+        else:
+            self.panel.flush(self.current_data)
+        
+        # Schedule against a fixed timeline so slow frames don't accumulate drift;
+        # frame slots that were overrun are skipped and counted as dropped
+        period = self.frame_period()
+        now = time.perf_counter()
+        if self.next_frame_at is None:
+            self.next_frame_at = now
+        self.next_frame_at += period
+        if now > self.next_frame_at:
+            missed = int((now - self.next_frame_at) / period) + 1
+            self.frames_dropped += missed
+            self.next_frame_at += missed * period
+        self.root.after(max(1, int((self.next_frame_at - now) * 1000)), self.render_frame)
+        
+    def show_events(self, events, sample=None):
+        colors = {APOGEE: self.accent_red, PAYLOAD_RELEASE: self.accent_orange,
+                  CONTAINER_RELEASE: self.accent_orange, VOLTAGE_SAG: self.accent_yellow,
+                  COUNTER_STALLED: self.accent_purple}
+        for event in events:
+            color = colors.get(event.kind, self.accent_cyan)
+            self.event_label.config(text=f"EVENT: {event}", fg=color)
+            if sample is not None:
+                # Drawn by the frame's blit, no full redraw
+                full = len(self.event_marks) == self.event_marks.maxlen
+                self.event_marks.append((sample, event.kind, color))
+                if self.graphs and full:
+                    # The oldest marker fell out: redraw the ones still kept
+                    self.graphs.clear_marks()
+                    for mark in self.event_marks:
+                        self.graphs.mark(*mark)
+                elif self.graphs:
+                    self.graphs.mark(sample, event.kind, color)
+        
+    def update_display(self):
+        self.panel.render(self.current_data)
+        
+        if self.graphs:
             self.update_graphs()
             
+    def set_history_depth(self):
+        try:
+            depth = int(self.history_depth_var.get())
+        except ValueError:
+            depth = 0
+        if self.history is None:
+            self.history_depth = depth or None
+            return
+        if depth < PLOT_WINDOW:
+            self.history_depth_var.set(str(self.history.capacity))
+            return
+        self.history.resize(depth)
+        
+    def toggle_graph_view(self):
+        self.full_flight_view = not self.full_flight_view
+        text = "VIEW: FULL FLIGHT" if self.full_flight_view else f"VIEW: LAST {PLOT_WINDOW}"
+        self.view_btn.config(text=text)
+        if self.render_process:
+            self.render_process.set_view(self.full_flight_view)
+        if self.graphs:
+            self.graphs.reset_limits()
+            self.update_graphs()
+        
+    def toggle_graph_channels(self):
+        self.derived_view = not self.derived_view
+        self.channels_btn.config(text="CHANNELS: DERIVED" if self.derived_view else "CHANNELS: RAW")
+        if self.graphs:
+            self.build_graph_grid()
+            self.update_graphs()
+        
     def update_graphs(self):
-        self.ax_altitude.clear()
-        self.ax_voltage.clear()
-        self.ax_pressure.clear()
-        self.ax_temperature.clear()
-        self.ax_gyro_roll.clear()
-        self.ax_gyro_pitch.clear()
-        self.ax_gyro_yaw.clear()
-        self.ax_accel_roll.clear()
-        
-        time_list = list(self.time_points)
-        
-        # Plot with different colors
-        self.ax_altitude.plot(time_list, list(self.data_points['altitude']), '#ff0055', linewidth=2)
-        self.ax_voltage.plot(time_list, list(self.data_points['voltage']), '#ffff00', linewidth=2)
-        self.ax_pressure.plot(time_list, list(self.data_points['pressure']), '#00ffff', linewidth=2)
-        self.ax_temperature.plot(time_list, list(self.data_points['temperature']), '#ff8800', linewidth=2)
-        self.ax_gyro_roll.plot(time_list, list(self.data_points['gyro_roll']), '#ff00ff', linewidth=2)
-        self.ax_gyro_pitch.plot(time_list, list(self.data_points['gyro_pitch']), '#00ff41', linewidth=2)
-        self.ax_gyro_yaw.plot(time_list, list(self.data_points['gyro_yaw']), '#00ffff', linewidth=2)
-        self.ax_accel_roll.plot(time_list, list(self.data_points['accel_roll']), '#ff0055', linewidth=2)
-        
-        axes = [self.ax_altitude, self.ax_voltage, self.ax_pressure, self.ax_temperature,
-                self.ax_gyro_roll, self.ax_gyro_pitch, self.ax_gyro_yaw, self.ax_accel_roll]
-        
-        titles = ["ALTITUDE (m)", "VOLTAGE (V)", "PRESSURE (kPa)", "TEMPERATURE (°C)",
-                 "GYRO ROLL", "GYRO PITCH", "GYRO YAW", "ACCEL ROLL"]
-        
-        for ax, title in zip(axes, titles):
-            ax.set_title(title, color=self.accent_cyan, fontsize=9, fontweight='bold', family='monospace')
-            ax.tick_params(colors=self.accent_green, labelsize=7)
-            ax.spines['bottom'].set_color(self.accent_cyan)
-            ax.spines['left'].set_color(self.accent_cyan)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.grid(True, alpha=0.2, color=self.accent_cyan, linestyle=':')
-            ax.set_facecolor('#0d1117')
-        
-        self.fig.tight_layout()
-        self.canvas.draw()
+        if self.full_flight_view:
+            # Per-pixel min/max buckets: constant cost however long the flight
+            window = self.history.flight_overview(self.graph_keys)
+        else:
+            # Zero-copy views of the latest samples straight out of the ring buffer
+            window = self.history.window(self.graph_keys, PLOT_WINDOW)
+        self.graphs.update(window['sample'], window)
         
-    def send_command(self, cmd):
-        if not self.connected:
-            messagebox.showwarning("No Connection", "Establish uplink first")
+    def open_diagnostics(self):
+        if self.diagnostics and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
             return
             
+        dialog = tk.Toplevel(self.root)
+        dialog.title("DIAGNOSTICS")
+        dialog.geometry("620x520")
+        dialog.configure(bg=self.bg_dark)
+        self.diagnostics = dialog
+        
+        controls = tk.Frame(dialog, bg=self.bg_dark)
+        controls.pack(fill=tk.X, padx=10, pady=10)
+        
+        enabled_var = tk.BooleanVar(value=self.probes.enabled)
+        tk.Checkbutton(controls, text="PROBES ENABLED", variable=enabled_var,
+                       command=lambda: self.probes.set_enabled(enabled_var.get()),
+                       bg=self.bg_dark, fg=self.accent_green, selectcolor=self.bg_panel,
+                       activebackground=self.bg_dark, font=('Consolas', 9, 'bold')).pack(side=tk.LEFT)
+        
+        tk.Button(controls, text="RESET", command=self.probes.reset,
+                  bg=self.bg_panel, fg=self.accent_orange, font=('Consolas', 9, 'bold'),
+                  borderwidth=1, relief='solid').pack(side=tk.RIGHT, padx=2)
+        tk.Button(controls, text="DUMP", command=self.dump_probes,
+                  bg=self.bg_panel, fg=self.accent_cyan, font=('Consolas', 9, 'bold'),
+                  borderwidth=1, relief='solid').pack(side=tk.RIGHT, padx=2)
+        
+        report = tk.Text(dialog, bg='#000000', fg=self.accent_green, font=('Consolas', 9),
+                         borderwidth=0, state=tk.DISABLED)
+        report.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            lines = self.probes.report_lines() + [""] + self.probes.histogram_lines()
+            if self.runtime:
+                lines += ["", self.runtime.status_line(), f"DISPLAY QUEUE DROPPED: {self.display_dropped}"]
+            if not self.probes.enabled:
+                lines.append("Probes are disabled: enable them to collect timings.")
+            report.config(state=tk.NORMAL)
+            report.delete("1.0", tk.END)
+            report.insert(tk.END, "\n".join(lines))
+            report.config(state=tk.DISABLED)
+            dialog.after(1000, refresh)
+            
+        refresh()
+        
+    def dump_probes(self):
+        path = filedialog.asksaveasfilename(
+            title="Save Probe Timings", defaultextension=".json",
+            initialdir=self.save_path or None,
+            initialfile=f"probes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
         try:
-            self.serial_port.write(f"{cmd}\n".encode())
-            print(f"TX → {cmd}")
-        except Exception as e:
-            messagebox.showerror("TX Error", str(e))
+            self.probes.dump(path)
+        except OSError as e:
+            messagebox.showerror("Dump Failed", str(e))
+            
+    def send_command(self, cmd, wait=True):
+        """Queue a command on the uplink; returns its Command, or None"""
+        if not self.connected or not self.uplink:
+            messagebox.showwarning("No Connection", "Establish uplink first")
+            return None
+        return self.uplink.send(cmd, wait)
+            
+    def stop_simp_stream(self):
+        if self.simp_streamer:
+            self.simp_streamer.stop()
             
     def send_set_time(self):
         if not self.connected:
             messagebox.showwarning("No Connection", "Establish uplink first")
             return
             
-        now = datetime.now()
-        cmd = f"CMD,1001,ST,{now.hour:02d}:{now.minute:02d}:{now.second:02d}"
-        self.send_command(cmd)
+        def set_time():
+            # Rendered at transmit time, so the time is not stale after waiting in the queue
+            now = datetime.now()
+            return f"CMD,{self.team_id},ST,{now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+        self.send_command(set_time)
         
     def open_simp_dialog(self):
         if not self.connected:
@@ -712,12 +1369,12 @@ class CanSatGroundStation:
             return
         
         # Activate simulation mode
-        self.send_command("CMD,1001,SIM,ACTIVATE")
+        self.send_command(f"CMD,{self.team_id},SIM,ACTIVATE")
         
         # Terminal window
         dialog = tk.Toplevel(self.root)
         dialog.title("SIMP TERMINAL")
-        dialog.geometry("750x550")
+        dialog.geometry("750x700")
         dialog.configure(bg=self.bg_dark)
         dialog.transient(self.root)
         
@@ -775,18 +1432,36 @@ class CanSatGroundStation:
         cmd_entry.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=10)
         cmd_entry.focus()
         
+        def show_result(command):
+            if not dialog.winfo_exists():
+                return
+            if not command.finished:
+                dialog.after(100, show_result, command)
+                return
+            history.config(state=tk.NORMAL)
+            if command.state == ACKED:
+                history.insert(tk.END, f"[ACK] {command.text} ({command.rtt * 1000:.0f} ms, "
+                                       f"attempt {command.attempts})\n\n", "sent")
+            elif command.state == DONE:
+                history.insert(tk.END, f"[OK] Command transmitted\n\n", "sent")
+            else:
+                history.insert(tk.END, f"[FAIL] {command.text}: "
+                                       f"{command.error or 'no confirmation in telemetry'}\n\n", "error")
+            history.see(tk.END)
+            history.config(state=tk.DISABLED)
+            
         def send_simp_cmd():
             cmd = cmd_var.get().strip()
             if cmd:
                 history.config(state=tk.NORMAL)
                 history.insert(tk.END, f"[TX] {cmd}\n", "command")
-                
-                self.send_command(cmd)
-                
-                history.insert(tk.END, f"[OK] Command transmitted\n\n", "sent")
                 history.see(tk.END)
                 history.config(state=tk.DISABLED)
                 
+                command = self.send_command(cmd)
+                if command:
+                    show_result(command)
+                
                 cmd_var.set("")
             else:
                 history.config(state=tk.NORMAL)
@@ -813,9 +1488,9 @@ class CanSatGroundStation:
         btn_frame.pack(pady=5)
         
         quick_cmds = [
-            ("ALT", "CMD,1001,SIMP,ALT,"),
-            ("PRES", "CMD,1001,SIMP,PRES,"),
-            ("TEMP", "CMD,1001,SIMP,TEMP,")
+            ("ALT", f"CMD,{self.team_id},SIMP,ALT,"),
+            ("PRES", f"CMD,{self.team_id},SIMP,PRES,"),
+            ("TEMP", f"CMD,{self.team_id},SIMP,TEMP,")
         ]
         
         for text, cmd_prefix in quick_cmds:
@@ -824,13 +1499,119 @@ class CanSatGroundStation:
                      font=('Consolas', 9, 'bold'), borderwidth=1,
                      relief='solid', width=8).pack(side=tk.LEFT, padx=5)
         
+        # Pressure profile streaming
+        stream_frame = tk.Frame(dialog, bg=self.bg_panel, borderwidth=2, relief='solid')
+        stream_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+        
+        tk.Label(stream_frame, text="PROFILE STREAM:", bg=self.bg_panel,
+                fg=self.accent_cyan, font=('Consolas', 9, 'bold')).pack(pady=5)
+        
+        stream_controls = tk.Frame(stream_frame, bg=self.bg_panel)
+        stream_controls.pack(pady=5)
+        
+        profile = []
+        profile_var = tk.StringVar(value="NO PROFILE")
+        rate_var = tk.StringVar(value="1")
+        
+        def load_profile():
+            path = filedialog.askopenfilename(title="Select Pressure Profile",
+                                              filetypes=[("Profiles and flights", "*.csv *.txt *.cfr"),
+                                                         ("All files", "*.*")])
+            if not path:
+                return
+            try:
+                profile[:] = load_pressure_profile(path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Profile Error", str(e), parent=dialog)
+                return
+            profile_var.set(f"{os.path.basename(path)}: {len(profile)} VALUES")
+            
+        def toggle_stream():
+            if self.simp_streamer and self.simp_streamer.running:
+                self.stop_simp_stream()
+                return
+            if not profile:
+                messagebox.showwarning("No Profile", "Load a pressure profile first", parent=dialog)
+                return
+            try:
+                rate = float(rate_var.get())
+            except ValueError:
+                rate = 0
+            if not 0 < rate <= 100:
+                messagebox.showwarning("Rate", "Rate must be between 0 and 100 Hz", parent=dialog)
+                return
+            if not self.connected or not self.uplink:
+                messagebox.showwarning("No Connection", "Establish uplink first", parent=dialog)
+                return
+            self.simp_streamer = SimpStreamer(self.uplink, list(profile), rate,
+                                              team_id=self.team_id)
+            self.simp_streamer.start()
+            
+        tk.Button(stream_controls, text="LOAD", command=load_profile,
+                 bg=self.bg_panel, fg=self.accent_cyan, font=('Consolas', 9, 'bold'),
+                 borderwidth=1, relief='solid', width=8).pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(stream_controls, text="HZ:", bg=self.bg_panel, fg=self.accent_cyan,
+                font=('Consolas', 9, 'bold')).pack(side=tk.LEFT)
+        tk.Entry(stream_controls, textvariable=rate_var, width=6, bg='#000000',
+                fg=self.accent_green, font=('Consolas', 9),
+                insertbackground=self.accent_cyan).pack(side=tk.LEFT, padx=5)
+        
+        stream_btn = tk.Button(stream_controls, text="START", command=toggle_stream,
+                              bg=self.bg_panel, fg=self.accent_green, font=('Consolas', 9, 'bold'),
+                              borderwidth=1, relief='solid', width=8)
+        stream_btn.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(stream_frame, textvariable=profile_var, bg=self.bg_panel,
+                fg=self.text_gray, font=('Consolas', 8)).pack()
+        stream_status = tk.Label(stream_frame, text="", bg=self.bg_panel,
+                                fg=self.text_gray, font=('Consolas', 8))
+        stream_status.pack(pady=(0, 5))
+        
+        def refresh_stream():
+            if not dialog.winfo_exists():
+                return
+            streamer = self.simp_streamer
+            if streamer:
+                stream_btn.config(text="STOP" if streamer.running else "START",
+                                  fg=self.accent_red if streamer.running else self.accent_green)
+                backlog = streamer.backlog()
+                stream_status.config(
+                    text=f"SENT {streamer.written}/{len(streamer)} | "
+                         f"{streamer.achieved_rate():.2f} HZ OF {streamer.rate:g} | "
+                         f"BACKLOG {backlog}" + (f" | FAILED {streamer.failed}" if streamer.failed else ""),
+                    fg=self.accent_orange if backlog > streamer.rate else self.text_gray)
+            dialog.after(250, refresh_stream)
+            
+        refresh_stream()
+        
+        def close_terminal():
+            self.stop_simp_stream()
+            dialog.destroy()
+            
+        dialog.protocol("WM_DELETE_WINDOW", close_terminal)
+        
         # Close
-        tk.Button(dialog, text="CLOSE TERMINAL", command=dialog.destroy,
+        tk.Button(dialog, text="CLOSE TERMINAL", command=close_terminal,
                  bg=self.bg_dark, fg=self.accent_red,
                  font=('Consolas', 11, 'bold'), borderwidth=2,
                  relief='solid').pack(pady=(0, 15))
 
 if __name__ == "__main__":
+    from headless import build_arg_parser
+    args = build_arg_parser().parse_args()
+    
     root = tk.Tk()
-    app = CanSatGroundStation(root)
+    app = CanSatGroundStation(root, history_depth=args.history_depth,
+                              profile_startup=args.profile_startup, probes=args.probes,
+                              render_process=args.render_process, serve=args.serve,
+                              team_id=args.team_id)
+    if args.port:
+        app.port_var.set(args.port)
+    if args.connect:
+        app.port_var.set(FEED_PREFIX + args.connect)
+    app.baud_var.set(str(args.baud))
+    if args.replay:
+        app.replay_speed_var.set("MAX" if args.speed is None else f"{args.speed:g}x")
+        app.open_replay(args.replay)
     root.mainloop()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The station modules live at the top of the repository, next to test.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import FirmwareModel  # noqa: E402
+from telemetry import TelemetryParser  # noqa: E402
+
+
+def flight_lines(n, seed=0, period=0.1):
+    """n downlink lines of a simulated flight, as xBee_send prints them"""
+    model = FirmwareModel(seed=seed)
+    lines = []
+    for _ in range(n):
+        model.advance(period)
+        lines.append(model.next_line().decode().strip())
+    return lines
+
+
+@pytest.fixture
+def flight():
+    """1200 parsed packets (two minutes at 10 Hz): climb, apogee and descent"""
+    parser = TelemetryParser()
+    return [parser.parse(line) for line in flight_lines(1200)]
@@ -0,0 +1,57 @@
+from analytics import LinkAnalytics
+
+
+def feed(analytics, pkt_nos, start=0.0, period=0.1):
+    for i, n in enumerate(pkt_nos):
+        analytics.packet({'pkt_no': n}, now=start + i * period)
+
+
+def test_missing_late_and_duplicates():
+    a = LinkAnalytics()
+    feed(a, [0, 1, 2, 5, 3, 3, 6])
+    totals = a.totals
+    # The late packet still counts as received
+    assert totals['packets'] == 6
+    assert totals['missing'] == 1
+    assert totals['late'] == 1
+    assert totals['duplicates'] == 1
+    assert totals['restarts'] == 0
+    assert a.largest_gap == 2
+
+
+def test_restart_is_not_counted_as_late():
+    a = LinkAnalytics()
+    feed(a, range(300))
+    feed(a, range(10), start=30.0)
+    assert a.totals['restarts'] == 1
+    assert a.totals['late'] == 0
+    assert a.totals['duplicates'] == 0
+    assert a.totals['packets'] == 310
+
+
+def test_parse_failure_rate():
+    a = LinkAnalytics()
+    feed(a, range(9))
+    a.parse_failed(now=1.0)
+    assert a.windowed(now=1.0)['parse_failure_rate'] == 0.1
+
+
+def test_window_expires_old_buckets():
+    a = LinkAnalytics(window=20)
+    # A lossy first second, then a clean stream
+    feed(a, [0, 5], start=0.0)
+    feed(a, range(6, 106), start=1.0)
+    assert a.windowed(now=11.0)['loss'] > 0
+    w = a.windowed(now=21.0)
+    assert w['loss'] == 0.0
+    # Seconds 2..10 are still in the window
+    assert w['rate'] == 90 / 20
+    # The totals keep the whole session
+    assert a.summary()['missing'] == 4
+
+
+def test_jitter_of_steady_stream_is_zero():
+    a = LinkAnalytics()
+    feed(a, range(50), period=0.25)
+    assert a.windowed(now=12.5)['jitter_ms'] < 1e-6
+    assert abs(a.summary()['mean_interval_ms'] - 250) < 1e-6
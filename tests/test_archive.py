@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from archive import FlightArchive
+from flight_log import open_flight_logger
+
+
+def record(directory, packets, log_format="CSV+BIN"):
+    logger = open_flight_logger(str(directory), log_format, batch_size=100)
+    for i, packet in enumerate(packets):
+        logger.log(packet, 1.7e9 + i * 0.1)
+    logger.stop()
+    assert logger.error is None
+    return logger.paths
+
+
+@pytest.fixture(params=['.csv', '.cfr'])
+def archive(request, tmp_path, flight):
+    path = next(p for p in record(tmp_path, flight) if p.endswith(request.param))
+    with FlightArchive(path) as archive:
+        yield archive
+
+
+def clock_seconds(clock):
+    hh, mm, ss = clock.split(':')
+    return int(hh) * 3600 + int(mm) * 60 + int(ss)
+
+
+def brute_force(values, low, high):
+    return np.flatnonzero((values >= low) & (values <= high))
+
+
+def test_index(archive, flight):
+    assert archive.index_built
+    assert len(archive) == len(flight)
+    assert list(archive.pkt_no) == [packet['pkt_no'] for packet in flight]
+    assert archive.t[0] == 0.0
+    assert archive.duration == 119.0
+
+
+def test_time_range_matches_scan(archive, flight):
+    for start, end in [(0, 0), (10.0, 20.0), (59.5, 61.5), (-5, 3), (110, 500), (30, 10)]:
+        rows = archive.rows_between(start, end)
+        np.testing.assert_array_equal(rows, brute_force(archive.t, start, end))
+    columns = archive.time_range(10, 20, keys=['t', 'pkt_no', 'altitude', 'state'])
+    expected = [packet for packet in flight if 10 <= clock_seconds(packet['mission_time']) <= 20]
+    assert list(columns['pkt_no']) == [packet['pkt_no'] for packet in expected]
+    np.testing.assert_allclose(columns['altitude'], [packet['altitude'] for packet in expected],
+                               atol=1e-4)
+    assert list(columns['state']) == [packet['state'] for packet in expected]
+
+
+def test_packets_matches_scan(archive):
+    for first, last in [(0, 9), (500, 520), (1199, 5000), (-3, -1)]:
+        rows = archive.rows_for_packets(first, last)
+        np.testing.assert_array_equal(rows, brute_force(archive.pkt_no, first, last))
+
+
+def test_unsorted_pkt_no(tmp_path, flight):
+    # A CanSat restart halfway: pkt_no goes back to 0
+    packets = flight[:600] + [dict(packet) for packet in flight[:300]]
+    for path in record(tmp_path, packets):
+        with FlightArchive(path) as archive:
+            rows = archive.rows_for_packets(100, 199)
+            np.testing.assert_array_equal(rows, brute_force(archive.pkt_no, 100, 199))
+            assert len(rows) == 200
+            assert list(archive.packets(100, 101, keys=['pkt_no'])['pkt_no']) == [100, 101, 100, 101]
+
+
+def test_index_is_reused(tmp_path, flight):
+    path = record(tmp_path, flight[:100], "BIN")[0]
+    with FlightArchive(path) as first:
+        assert first.index_built
+    with FlightArchive(path) as second:
+        assert not second.index_built
+        np.testing.assert_array_equal(second.pkt_no, first.pkt_no)
@@ -0,0 +1,81 @@
+import copy
+
+import numpy as np
+import pytest
+
+from derived import DERIVED_KEYS, DerivedState, derive_columns, pressure_altitude
+from telemetry import packets_to_columns
+
+
+def incremental(packets):
+    state = DerivedState()
+    return [state.update(dict(packet)) for packet in packets]
+
+
+def assert_matches_batch(packets):
+    updated = incremental(packets)
+    derived = derive_columns(packets_to_columns(copy.deepcopy(packets)))
+    for key in DERIVED_KEYS:
+        expected = np.array([packet[key] for packet in updated])
+        if key == 'heading':
+            # The same angle may land either side of 0/360
+            diff = (derived[key] - expected + 180) % 360 - 180
+            np.testing.assert_allclose(diff, 0, atol=1e-9, err_msg=key)
+        else:
+            np.testing.assert_allclose(derived[key], expected, rtol=1e-9, atol=1e-9, err_msg=key)
+
+
+def test_incremental_matches_batch(flight):
+    assert_matches_batch(flight)
+
+
+def test_incremental_matches_batch_with_restart_late_and_repeated(flight):
+    packets = flight[:400]
+    packets[100], packets[101] = packets[101], packets[100]
+    packets.insert(200, dict(packets[199]))
+    restarted = [dict(packet) for packet in flight[:150]]
+    assert_matches_batch(packets + restarted)
+
+
+def test_restart_resets_filters(flight):
+    state = DerivedState()
+    for packet in flight[:300]:
+        state.update(dict(packet))
+    assert state.vertical_speed != 0.0
+    restarted = state.update(dict(flight[0]))
+    assert restarted['vertical_speed'] == 0.0
+    assert restarted == DerivedState().update(dict(flight[0]))
+
+
+def test_late_packet_leaves_filters_alone(flight):
+    state = DerivedState()
+    for packet in flight[:300]:
+        state.update(dict(packet))
+    before = (state.roll, state.pitch, state.yaw, state.vertical_speed)
+    late = state.update(dict(flight[290]))
+    assert (state.roll, state.pitch, state.yaw, state.vertical_speed) == before
+    assert late['vertical_speed'] == before[3]
+    assert late['altitude_error'] == flight[290]['altitude'] - late['pressure_altitude']
+
+
+def test_pressure_altitude():
+    assert pressure_altitude(101.325) == 0.0
+    assert 990 < pressure_altitude(89.9) < 1000
+    with pytest.raises(ValueError):
+        pressure_altitude(0.0)
+    with pytest.raises(ValueError):
+        pressure_altitude(-3)
+    altitudes = pressure_altitude(np.array([101.325, 0.0, -1.0, 89.9]))
+    assert altitudes[0] == 0.0
+    assert np.isnan(altitudes[1]) and np.isnan(altitudes[2])
+    assert altitudes[3] == pressure_altitude(89.9)
+
+
+def test_corrupt_pressure_leaves_state_alone(flight):
+    state = DerivedState()
+    for packet in flight[:100]:
+        state.update(dict(packet))
+    corrupt = dict(flight[100], pressure=0.0)
+    with pytest.raises(ValueError):
+        state.update(corrupt)
+    assert state.update(dict(flight[100])) == incremental(flight[:101])[-1]
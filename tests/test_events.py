@@ -0,0 +1,92 @@
+import csv
+
+from derived import DerivedState
+from events import (APOGEE, CONTAINER_RELEASE, COUNTER_STALLED, EVENT_LOG_HEADER, PAYLOAD_RELEASE,
+                    STATE, VOLTAGE_SAG, EventDetector, EventLog)
+
+
+def run(packets, detector=None):
+    state = DerivedState()
+    detector = detector or EventDetector()
+    fired = []
+    for packet in packets:
+        fired.extend(detector.update(state.update(dict(packet))))
+    return detector, fired
+
+
+def test_flight_events_in_order(flight):
+    detector, fired = run(flight)
+    kinds = [event.kind for event in fired]
+    assert kinds.count(APOGEE) == 1
+    assert kinds.count(PAYLOAD_RELEASE) == 1
+    assert kinds.count(CONTAINER_RELEASE) == 1
+    assert kinds.index(APOGEE) < kinds.index(PAYLOAD_RELEASE) < kinds.index(CONTAINER_RELEASE)
+    assert any(event.kind == STATE and event.detail == "ASCEND -> DESCEND" for event in fired)
+    assert VOLTAGE_SAG not in kinds and COUNTER_STALLED not in kinds
+    assert detector.events == fired
+
+    peak = max(packet['altitude'] for packet in flight)
+    assert detector.apogee.altitude == peak
+    payload = fired[kinds.index(PAYLOAD_RELEASE)]
+    assert payload.altitude <= 0.8 * peak
+
+
+def test_events_are_attached_and_reported(flight):
+    reported = []
+    state = DerivedState()
+    detector = EventDetector(on_event=reported.append)
+    attached = []
+    for packet in flight:
+        packet = state.update(dict(packet))
+        fired = detector.update(packet)
+        if fired:
+            assert packet['events'] == fired
+            attached.extend(fired)
+        else:
+            assert 'events' not in packet
+    assert reported == attached == detector.events
+    assert len(reported) >= 4
+
+
+def test_voltage_sag_fires_once_until_recovered(flight):
+    packets = [dict(packet) for packet in flight[:200]]
+    for packet in packets[100:110]:
+        packet['voltage'] = 3.0
+    _, fired = run(packets)
+    sags = [event for event in fired if event.kind == VOLTAGE_SAG]
+    assert len(sags) == 1
+    assert sags[0].pkt_no == packets[100]['pkt_no']
+
+
+def test_counter_stalled(flight):
+    packets = [dict(packet) for packet in flight[:50]]
+    stuck = [dict(packet, pkt_no=packets[-1]['pkt_no']) for packet in flight[50:60]]
+    _, fired = run(packets + stuck)
+    stalls = [event for event in fired if event.kind == COUNTER_STALLED]
+    assert len(stalls) == 1
+
+
+def test_radio_duplicate_and_late_packet_fire_nothing(flight):
+    packets = [dict(packet) for packet in flight[:50]]
+    detector, _ = run(packets)
+    assert detector.update(dict(packets[-1], vertical_speed=0.0)) == []
+    assert detector.update(dict(packets[20], voltage=0.0)) == []
+
+
+def test_restart_starts_a_new_flight(flight):
+    detector, fired = run(flight)
+    assert detector.events
+    assert detector.update(dict(flight[0], vertical_speed=0.0)) == []
+    assert detector.events == []
+    assert detector.apogee is None
+
+
+def test_event_log(tmp_path, flight):
+    log = EventLog(str(tmp_path / "flight_events.csv"))
+    detector, fired = run(flight, EventDetector(on_event=log.write))
+    log.close()
+    with open(log.path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == EVENT_LOG_HEADER
+    assert [row[3] for row in rows[1:]] == [event.kind for event in fired]
+    assert [int(row[1]) for row in rows[1:]] == [event.pkt_no for event in fired]
@@ -0,0 +1,139 @@
+import csv
+import time
+
+import pytest
+
+from flight_log import (CSV_FIELDS, CSV_HEADER, RECORD_FLOATS, BinarySink, CsvSink, FlightLogger,
+                        export_csv, read_chunk_index, read_records)
+
+FLOAT_KEYS = set(RECORD_FLOATS) | {'gps_altitude', 'latitude', 'longitude'}
+
+
+def write(sink, packets, batch=100):
+    records = [(1.7e9 + i * 0.1, packet) for i, packet in enumerate(packets)]
+    for start in range(0, len(records), batch):
+        sink.write_batch(records[start:start + batch])
+    return records
+
+
+def assert_same_packet(read, written):
+    assert set(read) == set(written)
+    for key, value in written.items():
+        if key in FLOAT_KEYS:
+            # float32 on disk, like the firmware's floats
+            assert read[key] == pytest.approx(value, rel=1e-6, abs=1e-6), key
+        else:
+            assert read[key] == value, key
+
+
+def test_cfr_round_trip(tmp_path, flight):
+    sink = BinarySink(str(tmp_path / "flight.cfr"))
+    records = write(sink, flight)
+    sink.close()
+    read = list(read_records(sink.path))
+    assert len(read) == len(records)
+    for (recv_time, packet), (written_time, written) in zip(read, records):
+        assert recv_time == written_time
+        assert_same_packet(packet, written)
+    index = read_chunk_index(open(sink.path, 'rb').read())
+    assert [entry[1] for entry in index] == [100] * 12
+    assert index[-1][5] == flight[-1]['pkt_no']
+
+
+def test_cfr_without_footer_is_recovered(tmp_path, flight):
+    sink = BinarySink(str(tmp_path / "flight.cfr"))
+    write(sink, flight[:250])
+    sink.sync()
+    sink.file.close()
+    with open(sink.path, 'ab') as f:
+        # A chunk torn by the power going out
+        f.write(b'CHNK\x10')
+    assert [packet['pkt_no'] for _, packet in read_records(sink.path)] == list(range(250))
+
+
+def test_export_csv_matches_csv_sink(tmp_path, flight):
+    packets = flight[:300]
+    binary = BinarySink(str(tmp_path / "flight.cfr"))
+    write(binary, packets)
+    binary.close()
+    text = CsvSink(str(tmp_path / "direct.csv"))
+    write(text, packets)
+    text.close()
+
+    exported = export_csv(binary.path)
+    assert exported == str(tmp_path / "flight.csv")
+    with open(exported, newline='') as f:
+        rows = list(csv.reader(f))
+    with open(text.path, newline='') as f:
+        direct = list(csv.reader(f))
+    assert rows[0] == direct[0] == CSV_HEADER
+    assert len(rows) == len(direct) == len(packets) + 1
+    for row, expected in zip(rows[1:], direct[1:]):
+        for field, value, other in zip(['timestamp'] + CSV_FIELDS, row, expected):
+            if field in FLOAT_KEYS:
+                assert float(value) == pytest.approx(float(other), rel=1e-6, abs=1e-6)
+            else:
+                assert value == other
+
+
+class BrokenSink:
+    def __init__(self):
+        self.closed = False
+
+    def write_batch(self, records):
+        raise OSError("disk full")
+
+    def flush(self):
+        pass
+
+    def sync(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_logger_counts_failed_batches(flight):
+    sink = BrokenSink()
+    logger = FlightLogger(sink, batch_size=10, flush_interval=0.01)
+    logger.start()
+    for packet in flight[:100]:
+        logger.log(packet)
+    logger.stop(timeout=5)
+    assert logger.rows_written == 0
+    assert logger.rows_dropped == 100
+    assert isinstance(logger.error, OSError)
+    assert sink.closed
+
+
+class CountingSink(BrokenSink):
+    def __init__(self):
+        super().__init__()
+        self.rows = 0
+        self.syncs = 0
+
+    def write_batch(self, records):
+        self.rows += len(records)
+
+    def sync(self):
+        self.syncs += 1
+
+
+def test_logger_syncs_when_downlink_goes_quiet(flight):
+    sink = CountingSink()
+    logger = FlightLogger(sink, batch_size=10, flush_interval=0.01, fsync_interval=0.2)
+    logger.start()
+    try:
+        for packet in flight[:5]:
+            logger.log(packet)
+        # No more packets: the last batch must still be synced, once
+        deadline = time.monotonic() + 2
+        while sink.syncs == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sink.rows == 5
+        assert sink.syncs == 1
+        time.sleep(0.5)
+        assert sink.syncs == 1
+    finally:
+        logger.stop(timeout=5)
+    assert sink.closed
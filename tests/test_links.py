@@ -0,0 +1,81 @@
+from links import PacketMerger
+
+
+def pkt(pkt_no, team_id=1001):
+    return {'id': team_id, 'pkt_no': pkt_no}
+
+
+def merger(*links, hold=0.2):
+    out = []
+    m = PacketMerger(lambda p: out.append(p['pkt_no']), hold=hold)
+    for name in links:
+        m.add_link(name)
+    return m, out
+
+
+def test_single_link_passes_through_in_arrival_order():
+    m, out = merger('a')
+    for n in (0, 1, 3, 2, 4):
+        m.offer('a', pkt(n), now=0.0)
+    # Nothing is held with one link: 3 gives up the gap, 2 comes late
+    assert out == [0, 1, 3, 2, 4]
+    assert m.late == 1
+    assert m.gaps == 1
+    assert m.held() == 0
+
+
+def test_second_link_fills_gap_and_duplicates_are_dropped():
+    m, out = merger('a', 'b')
+    m.offer('a', pkt(0), now=0.0)
+    m.offer('a', pkt(2), now=0.01)
+    m.offer('a', pkt(3), now=0.02)
+    assert out == [0]
+    assert m.held() == 2
+    m.offer('b', pkt(0), now=0.03)
+    m.offer('b', pkt(1), now=0.04)
+    m.offer('b', pkt(2), now=0.05)
+    m.offer('b', pkt(3), now=0.06)
+    assert out == [0, 1, 2, 3]
+    assert m.gaps == 0
+    assert m.released == 4
+    assert m.links['a'].first_copies == 3
+    assert m.links['b'].first_copies == 1
+    assert m.links['b'].duplicates == 3
+    assert m.links['b'].lag_ms() is not None
+
+
+def test_held_packets_released_after_hold():
+    m, out = merger('a', 'b', hold=0.2)
+    m.offer('a', pkt(0), now=0.0)
+    m.offer('a', pkt(2), now=0.1)
+    m.flush(now=0.2)
+    assert out == [0]
+    m.flush(now=0.31)
+    assert out == [0, 2]
+    assert m.gaps == 1
+    # The missing one turns up after its gap was given up on
+    m.offer('b', pkt(1), now=0.4)
+    assert out == [0, 2, 1]
+    assert m.late == 1
+
+
+def test_loss_per_link():
+    m, _ = merger('a', 'b')
+    for n in range(10):
+        m.offer('a', pkt(n), now=n * 0.1)
+        if n % 2 == 0:
+            m.offer('b', pkt(n), now=n * 0.1)
+    assert m.links['a'].loss() == 0.0
+    assert m.links['b'].loss() == 4 / 9
+
+
+def test_counter_restart_starts_over():
+    m, out = merger('a', 'b')
+    for n in range(100):
+        m.offer('a', pkt(n), now=0.0)
+    m.offer('a', pkt(0), now=1.0)
+    m.offer('a', pkt(1), now=1.1)
+    # The restarted counts are new packets, not duplicates
+    assert out == list(range(100)) + [0, 1]
+    assert m.links['a'].duplicates == 0
+    assert m.links['a'].first_pkt == 0
@@ -0,0 +1,51 @@
+import json
+import threading
+
+from probes import HISTOGRAM_EDGES_MS, Probe, ProbeSet
+
+
+def test_percentiles_and_histogram():
+    probe = Probe('parse', window=100)
+    for i in range(200):
+        probe.record(i / 1e6)
+    # Only the last 100 samples are in the window, the totals keep everything
+    assert probe.count == 200
+    assert probe.percentile(0) == 100 / 1e6
+    assert probe.percentile(50) == 150 / 1e6
+    assert probe.max == 199 / 1e6
+    counts = probe.histogram()
+    assert len(counts) == len(HISTOGRAM_EDGES_MS) + 1
+    assert sum(counts) == 100
+    # 0.1 to 0.199 ms: all but the first land in the <=0.3 ms bucket
+    assert counts[3] >= 99
+
+
+def test_reading_while_recording():
+    probes = ProbeSet(enabled=True)
+    probe = probes.probe('log')
+    done = threading.Event()
+
+    def record():
+        while not done.is_set():
+            probe.record(0.001)
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    try:
+        for _ in range(500):
+            probe.histogram()
+            probes.histogram_lines()
+            probe.summary()
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_dump(tmp_path):
+    probes = ProbeSet()
+    probes.probe('frame').record(0.002)
+    path = probes.dump(str(tmp_path / "probes.json"))
+    with open(path) as f:
+        report = json.load(f)
+    assert report['probes']['frame']['samples_ms'] == [2.0]
+    assert report['probes']['frame']['count'] == 1
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+import runtime as runtime_module
+from conftest import flight_lines
+from runtime import StationRuntime
+from telemetry import TelemetryParser
+
+
+def test_stages_run_before_sinks_and_errors_are_counted():
+    runtime = StationRuntime({"PRI": TelemetryParser()})
+    seen = []
+
+    def tag(packet):
+        if packet['pkt_no'] == 3:
+            raise ValueError("bad packet")
+        packet['tagged'] = True
+
+    stage = runtime.add_stage("tag", tag)
+    runtime.add_sink("collect", lambda packet: seen.append(packet))
+    runtime.start()
+    try:
+        runtime.submit_lines("PRI", flight_lines(10))
+    finally:
+        runtime.stop()
+    assert [packet['pkt_no'] for packet in seen] == list(range(10))
+    assert all(packet.get('tagged') for packet in seen if packet['pkt_no'] != 3)
+    assert stage.errors == 1
+    assert "STAGE ERRORS: tag 1" in runtime.status_line()
+
+
+def test_stop_releases_a_blocked_submit(monkeypatch):
+    monkeypatch.setattr(runtime_module, 'DRAIN_TIMEOUT', 0.1)
+    runtime = StationRuntime({"PRI": TelemetryParser()})
+    sink = runtime.add_sink("stuck", lambda packet: None, maxsize=1)
+
+    async def never_reads():
+        await asyncio.Event().wait()
+    sink.run = never_reads
+    runtime.start()
+    returned = threading.Event()
+
+    def submit():
+        for line in flight_lines(5):
+            runtime.submit_lines("PRI", [line])
+        returned.set()
+
+    threading.Thread(target=submit, daemon=True).start()
+    time.sleep(0.2)
+    # Blocked behind the full sink
+    assert not returned.is_set()
+    runtime.stop()
+    assert returned.wait(2)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from conftest import flight_lines
+from telemetry import (FIELD_KEYS, MAX_REORDER, TelemetryParser, counter_restarted, format_line,
+                       packets_to_columns)
+
+LINE = ("1001, 0:1:5, 42, FLIGHT, ASCEND, 12.500000, 24.900000, 101.100000, 4.100000, "
+        "0.1, -0.2, 0.3, 0.01, -0.02, 9.81, 30.0, -5.0, 40.0, 6, 0:1:4, 11.0, "
+        "23.777176, 90.399452, 7")
+
+
+def test_parse_line():
+    data = TelemetryParser().parse(LINE)
+    assert set(data) == set(FIELD_KEYS)
+    assert data['id'] == 1001
+    assert data['mission_time'] == "00:01:05"
+    assert data['pkt_no'] == 42
+    assert data['mode'] == 'FLIGHT'
+    assert data['state'] == 'ASCEND'
+    assert data['altitude'] == 12.5
+    assert data['gps_time'] == "00:01:04"
+    assert data['gps_stats'] == 7
+
+
+def test_format_line_round_trip():
+    parser = TelemetryParser()
+    for line in flight_lines(50):
+        data = parser.parse(line)
+        assert parser.parse(format_line(data)) == data
+
+
+def test_malformed_lines_are_counted():
+    parser = TelemetryParser()
+    assert parser.parse(LINE.rsplit(',', 1)[0]) is None
+    assert parser.parse(LINE.replace("12.500000", "12.5x")) is None
+    assert parser.stats.lines == 2
+    assert parser.stats.packets == 0
+    assert parser.stats.errors['field_count'] == 1
+    assert parser.stats.errors['altitude'] == 1
+    assert parser.stats.worst_field() in (('field_count', 1), ('altitude', 1))
+
+
+def test_parse_batch_matches_parse():
+    lines = flight_lines(200)
+    expected = packets_to_columns([TelemetryParser().parse(line) for line in lines])
+    columns = TelemetryParser().parse_batch(lines)
+    for key in FIELD_KEYS:
+        if expected[key].dtype.kind == 'U':
+            assert list(columns[key]) == list(expected[key])
+        else:
+            np.testing.assert_allclose(columns[key], expected[key])
+
+
+def test_parse_batch_skips_bad_lines():
+    lines = flight_lines(20)
+    lines[3] = lines[3][:40]
+    fields = lines[7].split(',')
+    fields[5] = ' x'
+    lines[7] = ','.join(fields)
+    parser = TelemetryParser()
+    columns = parser.parse_batch(lines)
+    assert len(columns['pkt_no']) == 18
+    assert 3 not in columns['pkt_no'] and 7 not in columns['pkt_no']
+    assert parser.stats.packets == 18
+    assert parser.stats.error_total == 2
+
+
+def test_counter_restarted():
+    assert not counter_restarted(5, None)
+    assert not counter_restarted(11, 10)
+    assert not counter_restarted(10, 10)
+    # Late packets and duplicates are not restarts
+    assert not counter_restarted(10 - MAX_REORDER, 10 + 0)
+    assert not counter_restarted(500, 500 + MAX_REORDER)
+    # Back to the firmware's first count, however early, or too far back
+    assert counter_restarted(0, 3)
+    assert counter_restarted(100, 101 + MAX_REORDER)
@@ -0,0 +1,37 @@
+from simulator import FirmwareModel
+from telemetry import TelemetryParser
+from uplink import expectation_for
+
+
+def packet(**fields):
+    data = {'mode': 'FLIGHT', 'pressure': 101.3, 'mission_time': '00:00:10', 'gps_time': '00:00:10'}
+    data.update(fields)
+    return data
+
+
+def test_sim_mode_expectations():
+    enable = expectation_for("CMD,1001,SIM,ENABLE")
+    disable = expectation_for("CMD,1001,SIM,DISABLE")
+    assert enable(packet(mode='SIMULATION')) and not enable(packet())
+    assert disable(packet()) and not disable(packet(mode='SIMULATION'))
+
+
+def test_unconfirmable_commands():
+    for text in ["CMD,1001,CX,ON", "CMD,1001,CX,OFF", "CMD,1001,SIM,ACTIVATE", "CMD,1001,MX,ON",
+                 "CMD,1001,CAL", "CMD,1001,ST,12:00:00", "CMD,1001,ST,GPS", "CMD,1001,SIMP,x"]:
+        assert expectation_for(text) is None, text
+
+
+def test_simp_confirmed_by_simulated_firmware():
+    model = FirmwareModel(seed=1)
+    for text in ["CMD,1001,SIM,ENABLE", "CMD,1001,SIM,ACTIVATE"]:
+        assert model.handle_command(text)
+    command = "CMD,1001,SIMP,95000"
+    assert model.handle_command(command)
+    model.advance(0.1)
+    reported = TelemetryParser().parse(model.next_line().decode())
+    # Pascals, as main/xBee.c copies them into the packet
+    assert reported['pressure'] == 95000
+    assert expectation_for(command)(reported)
+    assert not expectation_for("CMD,1001,SIMP,95")(reported)
+    assert not expectation_for(command)(packet(pressure=95.0))
@@ -0,0 +1,291 @@
+"""Command uplink.
+
+Commands are queued by the UI and written by a dedicated thread, so a slow
+XBee never blocks Tk and all writes to the port come from one place.
+
+The firmware sends no explicit acknowledgements, so a command is confirmed
+by the telemetry field it changes: SIM ENABLE and DISABLE by the mode, SIMP
+by the reported pressure. Commands with such an expectation are retried
+when nothing confirms them in time, and the round-trip time of the attempt
+that got confirmed is recorded per command type. Commands the telemetry
+cannot confirm are done once written and kept out of the RTT figures: MX,
+CAL, CX (packets arriving after CX ON look the same as telemetry that was
+never off), SIM ACTIVATE (it only drives a GPIO; the mode already reads
+SIMULATION after ENABLE) and ST (main/xBee.c has no handler for it, so the
+mission clock only matches the time sent by coincidence).
+
+Confirmable commands go out one at a time by default, so an ENABLE that is
+lost cannot let the ACTIVATE behind it fail too; send(..., wait=False) lets
+streamed commands (SIMP) overlap.
+
+The uplink runs either on its own thread (start/stop) or as a task on the
+station runtime's event loop (serve), which writes the port on an executor
+thread like SerialSource reads it.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+QUEUED = 'queued'
+SENT = 'sent'
+ACKED = 'acked'
+DONE = 'done'         # written, nothing in the telemetry can confirm it
+FAILED = 'failed'     # retries exhausted or write error
+FINAL_STATES = (ACKED, DONE, FAILED)
+
+COMMAND_TYPES = ['CX', 'MX', 'SIM', 'CAL', 'ST', 'SIMP']
+
+# Seconds between queue checks while there is nothing to send
+POLL_INTERVAL = 0.02
+
+
+def _simp_expectation(pascals):
+    # xBee_command_handler copies the pascals into the packet unconverted
+    return lambda p: abs(p['pressure'] - pascals) < 1
+
+
+def expectation_for(text):
+    """Telemetry predicate that confirms a command, or None if none exists"""
+    parts = [part.strip() for part in text.split(',')]
+    kind = parts[2] if len(parts) > 2 else ''
+    arg = parts[3] if len(parts) > 3 else ''
+    if kind == 'SIM' and arg == 'ENABLE':
+        return lambda p: p['mode'] == 'SIMULATION'
+    if kind == 'SIM' and arg == 'DISABLE':
+        return lambda p: p['mode'] == 'FLIGHT'
+    if kind == 'SIMP':
+        try:
+            return _simp_expectation(int(arg))
+        except ValueError:
+            return None
+    return None
+
+
+class Command:
+    """One uplink command and its delivery state.
+
+    text may be a callable returning the text, rendered afresh for every
+    attempt (so a retry carries current values, not stale ones).
+    """
+
+    def __init__(self, text, wait=True, on_done=None, confirm=True):
+        self.render = text if callable(text) else (lambda: text)
+        self.text = self.render()
+        parts = self.text.split(',')
+        self.kind = parts[2].strip() if len(parts) > 2 else '?'
+        self.wait = wait
+        self.on_done = on_done
+        self.confirm = confirm
+        self.expect = None
+        self.state = QUEUED
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+        self.sent_at = None
+        self.finished_at = None
+        self.rtt = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.state in FINAL_STATES
+
+
+class CommandStats:
+    """Outcomes and round-trip times for one command type"""
+
+    def __init__(self, window=50):
+        self.counts = Counter()
+        self.rtts = deque(maxlen=window)
+
+    def summary(self):
+        rtts = sorted(self.rtts)
+        return {
+            'sent': self.counts['sent'],
+            'acked': self.counts[ACKED],
+            'failed': self.counts[FAILED],
+            'retries': self.counts['retries'],
+            'rtt_p50_ms': rtts[len(rtts) // 2] * 1000 if rtts else None,
+            'rtt_max_ms': rtts[-1] * 1000 if rtts else None,
+        }
+
+
+class CommandUplink:
+    def __init__(self, port, timeout=3.0, retries=2, name="command-uplink"):
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.name = name
+        self.queue = queue.Queue()
+        self.stats = {kind: CommandStats() for kind in COMMAND_TYPES}
+        self.in_flight = []
+        self.last_command = None
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def send(self, text, wait=True, on_done=None, confirm=True):
+        """Queue a command; returns its Command to follow its progress.
+
+        on_done(command) is called once it is final, from the uplink thread
+        or, for a confirmation, from the thread that called observe().
+        With confirm=False the command is done once written (streamed values
+        that the next one supersedes must not be retried).
+        """
+        command = Command(text, wait, on_done, confirm)
+        self.last_command = command
+        self.queue.put(command)
+        return command
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def observe(self, packet):
+        """Check a received packet against the commands awaiting confirmation"""
+        if not self.in_flight:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for command in list(self.in_flight):
+                if command.expect(packet):
+                    command.rtt = now - command.sent_at
+                    self.stats_for(command).rtts.append(command.rtt)
+                    self._finish(command, ACKED, now)
+
+    def stats_for(self, command):
+        if command.kind not in self.stats:
+            self.stats[command.kind] = CommandStats()
+        return self.stats[command.kind]
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        with self._lock:
+            for command in list(self.in_flight):
+                self._finish(command, FAILED, time.monotonic())
+
+    def run(self):
+        while self.running:
+            due = self._due()
+            for command in due:
+                self._written(command, self._write(command))
+            if not due:
+                time.sleep(POLL_INTERVAL)
+
+    async def serve(self):
+        """The run loop as an asyncio task; stop() ends it like the thread.
+
+        The port is written on an executor thread of its own, so a slow or
+        wedged XBee holds up the uplink but never the loop it shares.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(1, thread_name_prefix=self.name)
+        self.running = True
+        try:
+            while self.running:
+                due = self._due()
+                for command in due:
+                    self._written(command, await loop.run_in_executor(executor, self._write, command))
+                if not due:
+                    await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            executor.shutdown(wait=False)
+
+    def _due(self):
+        """Handle timeouts; returns the commands to write now (retries first)"""
+        due = self._check_timeouts()
+        if any(command.wait for command in self.in_flight):
+            # A confirmable command is outstanding: hold the rest back
+            return due
+        try:
+            due.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return due
+
+    def _write(self, command):
+        """Write one attempt of command; returns the write error, or None"""
+        command.text = command.render()
+        command.expect = expectation_for(command.text) if command.confirm else None
+        try:
+            self.port.write(f"{command.text}\n".encode())
+        except (serial.SerialException, OSError) as e:
+            return e
+        return None
+
+    def _written(self, command, error):
+        if error is not None:
+            command.error = error
+            with self._lock:
+                if not command.finished:
+                    self._finish(command, FAILED, time.monotonic())
+            print(f"TX error: {error}")
+            return
+
+        print(f"TX → {command.text}")
+        command.attempts += 1
+        command.sent_at = time.monotonic()
+        stats = self.stats_for(command)
+        stats.counts['sent'] += 1
+        if command.attempts > 1:
+            stats.counts['retries'] += 1
+
+        with self._lock:
+            if command.finished:
+                # Confirmed by an earlier attempt while this one was written
+                return
+            if command.expect is None:
+                self._finish(command, DONE, command.sent_at)
+            else:
+                command.state = SENT
+                if command not in self.in_flight:
+                    self.in_flight.append(command)
+
+    def _check_timeouts(self):
+        """Fail expired commands out of retries; returns those to retry"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [command for command in self.in_flight
+                       if now - command.sent_at > self.timeout]
+        retry = []
+        for command in expired:
+            if command.attempts <= self.retries:
+                retry.append(command)
+                continue
+            with self._lock:
+                if not command.finished:
+                    self._finish(command, FAILED, now)
+        return retry
+
+    def _finish(self, command, state, now):
+        # Called with the lock held
+        if command in self.in_flight:
+            self.in_flight.remove(command)
+        command.state = state
+        command.finished_at = now
+        self.stats_for(command).counts[state] += 1
+        if command.on_done:
+            command.on_done(command)
+
+    def status_line(self):
+        parts = [f"Q {self.queue_depth() + len(self.in_flight)}"]
+        for kind in COMMAND_TYPES:
+            summary = self.stats[kind].summary()
+            if summary['rtt_p50_ms'] is not None:
+                parts.append(f"{kind} {summary['rtt_p50_ms']:.0f}ms")
+        failed = sum(stats.counts[FAILED] for stats in self.stats.values())
+        if failed:
+            parts.append(f"FAILED {failed}")
+        return " | ".join(parts)